@@ -1,32 +1,129 @@
-from fastapi import APIRouter, Depends
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from app.models.request import RecommendationRequest
-from app.models.response import RecommendationResponse
+from app.models.response import RecommendationResponse, SimilarMovie, SimilarMoviesResponse
 from app.services.query_understanding import QueryUnderstandingService
-from app.services.embeddings import EmbeddingService
+from app.services.embeddings import get_embedding_service
 from app.services.recommender import RecommenderService
-from app.services.embeddings import EmbeddingService
+from app.budget import request_budget
+from app.config import REQUEST_BUDGET_MS
+from app.metrics import current_trace, render_prometheus, span
+from app.query_log import get_query_logger
+from app.db.profiling import collect_profiles, dump_profiles, profiling_requested
+from app.recsys.similar import similar_movies
+from app.warmup import is_ready, warmup_report
 
 router = APIRouter()
 
 # Dependency injection
 def get_recommender():
-    embedding_service = EmbeddingService()
-    return RecommenderService(embedding_service)
+    return RecommenderService(get_embedding_service())
 
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@router.get("/ready")
+def readiness_check():
+    # 503 until the startup cache warm-up is done; /health stays a liveness probe
+    if not is_ready():
+        return JSONResponse({"status": "warming_up"}, status_code=503)
+    return {"status": "ready", "warmup": warmup_report()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @router.post("/recommend", response_model=RecommendationResponse)
-def recommend(request: RecommendationRequest, service: RecommenderService = Depends(get_recommender)):
-    # 1. Parse Query
-    parsed_query = QueryUnderstandingService.parse(request.query)
-    
-    # 2. Get Recommendations
-    results, debug_info = service.recommend(parsed_query, limit=request.limit, debug=request.debug)
-    
-    return RecommendationResponse(
-        parsed_query=parsed_query,
-        debug=debug_info,
-        results=results
+def recommend(
+    request: RecommendationRequest,
+    service: RecommenderService = Depends(get_recommender),
+    x_profile_token: str | None = Header(default=None),
+):
+    with request_budget(REQUEST_BUDGET_MS / 1000) as deadline:
+        # 1. Parse Query
+        with span("parse"):
+            parsed_query = QueryUnderstandingService.parse(request.query)
+
+        # 2. Get Recommendations
+        if profiling_requested(request.debug, x_profile_token):
+            # Every Cypher statement of this request runs with PROFILE
+            with collect_profiles() as profiles:
+                results, debug_info = service.recommend(
+                    parsed_query, limit=request.limit, debug=request.debug, diversity=request.diversity,
+                    query=request.query,
+                )
+            debug_info = debug_info or {}
+            debug_info["cypher_profile"] = profiles
+            dump_path = dump_profiles(profiles, label=request.query)
+            if dump_path:
+                debug_info["cypher_profile_path"] = dump_path
+        else:
+            results, debug_info = service.recommend(
+                parsed_query, limit=request.limit, debug=request.debug, diversity=request.diversity,
+                query=request.query,
+            )
+
+    # Rendered here so the span covers model validation and JSON encoding:
+    # a returned Response skips FastAPI's response_model pass (which would
+    # otherwise run after the handler, outside any span)
+    with span("serialize"):
+        response = Response(
+            RecommendationResponse(
+                parsed_query=parsed_query,
+                debug=debug_info,
+                results=results,
+                degraded=bool(deadline.degraded),
+                degraded_reasons=deadline.degraded,
+            ).model_dump_json(),
+            media_type="application/json",
+        )
+
+    query_log = get_query_logger()
+    if query_log is not None:
+        trace = current_trace()
+        # Only references and small copies here; serialization happens on the writer thread
+        query_log.log({
+            "ts": time.time(),
+            "query": request.query,
+            "limit": request.limit,
+            "debug": request.debug,
+            "diversity": request.diversity,
+            "parsed_query": parsed_query,
+            "results": results,
+            "degraded_reasons": list(deadline.degraded),
+            "total_ms": round(trace.elapsed() * 1000, 2) if trace else None,
+            "trace": {
+                "stages": dict(trace.stages),
+                "neo4j_queries": trace.neo4j_queries,
+                "cache_hits": dict(trace.cache_hits),
+                "cache_misses": dict(trace.cache_misses),
+            } if trace else None,
+        })
+
+    return response
+
+@router.get("/movies/{tmdb_id}/similar", response_model=SimilarMoviesResponse)
+def similar(tmdb_id: int, limit: int = Query(default=10, ge=1, le=50)):
+    # Precomputed neighbors (scripts/build_similar.py): no embedding, no vector query
+    with span("similar_lookup"):
+        rows = similar_movies(tmdb_id, limit=limit)
+    if rows is None:
+        raise HTTPException(status_code=404, detail=f"No precomputed neighbors for movie {tmdb_id}")
+
+    return SimilarMoviesResponse(
+        tmdb_id=tmdb_id,
+        results=[
+            SimilarMovie(
+                tmdb_id=r["tmdb_id"],
+                title=r["title"],
+                original_title=r["original_title"],
+                release_year=int(r["release_date"][:4]) if r.get("release_date") else None,
+                score=round(r["score"], 4),
+                similarity_score=round(r["similarity"], 4),
+            )
+            for r in rows
+        ],
     )
@@ -0,0 +1,78 @@
+"""
+Per-request latency budgets.
+
+- request_budget(seconds) opens a deadline for the current request
+- stage_timeout(cap) is what a stage may spend: its own cap, clipped to
+  what is left of the request budget
+- The deadline lives in a ContextVar, so it follows the request into
+  FastAPI's threadpool and into app.db.neo4j (transaction timeouts)
+- Stages that fall back to a cheaper answer call mark_degraded(reason);
+  the route reports it on the response
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.metrics import DEGRADED_RESPONSES
+
+
+class Deadline:
+    __slots__ = ("expires_at", "degraded")
+
+    def __init__(self, seconds: float | None):
+        # No budget still gets a Deadline so degradations are recorded
+        self.expires_at = time.perf_counter() + seconds if seconds and seconds > 0 else None
+        self.degraded = []
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.perf_counter(), 0.0)
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.perf_counter() >= self.expires_at
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar("promptcorn_deadline", default=None)
+
+
+@contextmanager
+def request_budget(seconds: float | None):
+    """Bound everything inside the block by `seconds` (None or <= 0 = unbounded)."""
+    deadline = Deadline(seconds)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Deadline | None:
+    return _current_deadline.get()
+
+
+def remaining() -> float | None:
+    """Seconds left in the request budget, or None when unbounded."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def stage_timeout(cap: float | None) -> float | None:
+    """A stage's time allowance: min(cap, remaining request budget)."""
+    left = remaining()
+    if cap is None or cap <= 0:
+        return left
+    return cap if left is None else min(cap, left)
+
+
+def budget_exhausted() -> bool:
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.expired()
+
+
+def mark_degraded(reason: str) -> None:
+    DEGRADED_RESPONSES.inc(reason)
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.degraded.append(reason)
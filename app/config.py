@@ -6,9 +6,86 @@ load_dotenv()
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE")
+
+# Connection pool (use a neo4j:// URI to route reads across cluster members)
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+NEO4J_MAX_RETRY_TIME = float(os.getenv("NEO4J_MAX_RETRY_TIME", "15"))
+NEO4J_FETCH_SIZE = int(os.getenv("NEO4J_FETCH_SIZE", "1000"))
+NEO4J_WARMUP_CONNECTIONS = int(os.getenv("NEO4J_WARMUP_CONNECTIONS", "10"))
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+TMDB_CONCURRENCY = int(os.getenv("TMDB_CONCURRENCY", "8"))
+# Response cache under TMDBClient (empty = disabled); offline = cache only, no network
+TMDB_CACHE_PATH = os.getenv("TMDB_CACHE_PATH", "data/cache/tmdb.sqlite")
+TMDB_OFFLINE = os.getenv("TMDB_OFFLINE", "false").lower() == "true"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
+# Shortened embeddings (text-embedding-3 "dimensions"); unset = full width.
+# Must match between corpus (generate / load scripts) and queries. The corpus
+# is stored at this width only: every rescoring pass (quantized, matryoshka,
+# IVF) then works on the shortened vectors, never the full 3072 dims.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS")) if os.getenv("EMBEDDING_DIMENSIONS") else None
+
+# In-process retrieval: "neo4j" keeps recall in the vector index,
+# "exact" / "float16" / "int8" / "binary" / "matryoshka" score the embedding matrix in memory
+EMBEDDINGS_PATH = os.getenv("EMBEDDINGS_PATH", "data/embeddings/films_embeddings.parquet")
+EMBEDDING_ARTIFACT = os.getenv("EMBEDDING_ARTIFACT", "data/embeddings/films_embeddings")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "neo4j")
+VECTOR_RESCORE_DEPTH = int(os.getenv("VECTOR_RESCORE_DEPTH", "300"))
+VECTOR_PREFIX_DIM = int(os.getenv("VECTOR_PREFIX_DIM", "256"))
+VECTOR_IVF_PATH = os.getenv("VECTOR_IVF_PATH", "data/embeddings/ivf")
+VECTOR_IVF_LISTS = int(os.getenv("VECTOR_IVF_LISTS", "0"))
+VECTOR_IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "16"))
+VECTOR_WARM_ENABLED = os.getenv("VECTOR_WARM_ENABLED", "true").lower() == "true"
+SIMILAR_PATH = os.getenv("SIMILAR_PATH", "data/embeddings/similar.npz")
+SIMILAR_K = int(os.getenv("SIMILAR_K", "20"))
+MMR_ENABLED = os.getenv("MMR_ENABLED", "false").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_POOL = int(os.getenv("MMR_POOL", "30"))
+GRAPH_EXPANSION_ENABLED = os.getenv("GRAPH_EXPANSION_ENABLED", "true").lower() == "true"
+GRAPH_SEEDS = int(os.getenv("GRAPH_SEEDS", "10"))
+GRAPH_K = int(os.getenv("GRAPH_K", "30"))
+GRAPH_PERSON_WEIGHT = float(os.getenv("GRAPH_PERSON_WEIGHT", "1.0"))
+GRAPH_KEYWORD_WEIGHT = float(os.getenv("GRAPH_KEYWORD_WEIGHT", "0.5"))
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "60"))
+LEXICAL_ENABLED = os.getenv("LEXICAL_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "data/normalized/films_core.parquet")
+LEXICAL_K = int(os.getenv("LEXICAL_K", "20"))
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "0.1"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+REQUEST_BUDGET_MS = int(os.getenv("REQUEST_BUDGET_MS", "3000"))
+EMBED_BUDGET_MS = int(os.getenv("EMBED_BUDGET_MS", "1200"))
+EMBED_HEDGE_ENABLED = os.getenv("EMBED_HEDGE_ENABLED", "false").lower() == "true"
+EMBED_HEDGE_DEFAULT_MS = int(os.getenv("EMBED_HEDGE_DEFAULT_MS", "400"))
+# Embedding calls in flight per process: 2 per request thread (FastAPI runs sync
+# routes on anyio's 40-thread pool), so a hedge never queues behind other requests
+EMBED_POOL_SIZE = int(os.getenv("EMBED_POOL_SIZE", "80"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+QUERY_CACHE_MIN_OVERLAP = float(os.getenv("QUERY_CACHE_MIN_OVERLAP", "0.5"))
+POPULAR_POOL = int(os.getenv("POPULAR_POOL", "1000"))
+CANDIDATE_CACHE_SIZE = int(os.getenv("CANDIDATE_CACHE_SIZE", "2048"))
+
+# Cache warm-up at startup from the most frequent queries of a query log
+# (file or QUERY_LOG_DIR); /ready answers 503 until it is done
+WARMUP_QUERY_LOG = os.getenv("WARMUP_QUERY_LOG", "")
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "500"))
+WARMUP_BUDGET_SECONDS = float(os.getenv("WARMUP_BUDGET_SECONDS", "60"))
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", "256"))
+
+# /recommend query log (gzip'd JSONL, written off the request path)
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "false").lower() == "true"
+QUERY_LOG_DIR = os.getenv("QUERY_LOG_DIR", "data/query_logs")
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "1.0"))
+QUERY_LOG_MAX_MB = float(os.getenv("QUERY_LOG_MAX_MB", "64"))
+QUERY_LOG_ROTATE_SECONDS = float(os.getenv("QUERY_LOG_ROTATE_SECONDS", "3600"))
+QUERY_LOG_QUEUE_SIZE = int(os.getenv("QUERY_LOG_QUEUE_SIZE", "10000"))
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
-print("🍿 PromptCorn 🤖 API started")
+CYPHER_PROFILE_ENABLED = os.getenv("CYPHER_PROFILE_ENABLED", "false").lower() == "true"
+CYPHER_PROFILE_ADMIN_TOKEN = os.getenv("CYPHER_PROFILE_ADMIN_TOKEN")
+CYPHER_PROFILE_DIR = os.getenv("CYPHER_PROFILE_DIR")
@@ -0,0 +1,55 @@
+"""
+Graph data version: a counter on a single (:DataVersion {name: "graph"}) node.
+
+Scripts that mutate the graph bump it when they finish; the serving
+process polls it to know when its in-memory snapshots are stale.
+
+Sync watermarks (e.g. the last TMDB changes-feed date applied) live on
+(:SyncState {name}) nodes next to it.
+"""
+
+from app.db.neo4j import read, write
+
+VERSION_QUERY = """
+OPTIONAL MATCH (v:DataVersion {name: "graph"})
+RETURN coalesce(v.version, 0) AS version
+"""
+
+BUMP_QUERY = """
+MERGE (v:DataVersion {name: "graph"})
+SET v.version = coalesce(v.version, 0) + 1,
+    v.source = $source,
+    v.updated_at = datetime()
+RETURN v.version AS version
+"""
+
+
+def graph_version() -> int:
+    rows = read(VERSION_QUERY)
+    return rows[0]["version"] if rows else 0
+
+
+def bump_graph_version(source: str) -> int:
+    """Mark the graph as changed by `source` (a script name); returns the new version."""
+    return write(BUMP_QUERY, {"source": source})[0]["version"]
+
+
+WATERMARK_QUERY = """
+OPTIONAL MATCH (s:SyncState {name: $name})
+RETURN s.watermark AS watermark
+"""
+
+SET_WATERMARK_QUERY = """
+MERGE (s:SyncState {name: $name})
+SET s.watermark = $watermark,
+    s.updated_at = datetime()
+"""
+
+
+def get_watermark(name: str) -> str | None:
+    rows = read(WATERMARK_QUERY, {"name": name})
+    return rows[0]["watermark"] if rows else None
+
+
+def set_watermark(name: str, watermark: str) -> None:
+    write(SET_WATERMARK_QUERY, {"name": name, "watermark": watermark})
@@ -1,5 +1,35 @@
-from neo4j import GraphDatabase
-from app.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+from app.config import (
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+    NEO4J_DATABASE,
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME,
+    NEO4J_MAX_RETRY_TIME,
+    NEO4J_FETCH_SIZE,
+    NEO4J_WARMUP_CONNECTIONS,
+)
+from app.budget import budget_exhausted, remaining
+from app.db.profiling import is_collecting, profiled_query, record_profile
+from app.metrics import NEO4J_ACQUIRE_SECONDS, NEO4J_POOL_SIZE, NEO4J_SESSIONS_IN_USE, record_neo4j_query
+
+logger = logging.getLogger(__name__)
+
+# neo4j.READ_ACCESS / WRITE_ACCESS: the driver package (which also pulls in
+# pandas) is only imported when the first connection is made
+READ_ACCESS = "READ"
+WRITE_ACCESS = "WRITE"
+
+DEFAULT_FETCH_SIZE = NEO4J_FETCH_SIZE
+STREAM_RETRIES = 3
 
 _driver = None
 
@@ -7,15 +37,228 @@ _driver = None
 def get_driver():
     global _driver
     if _driver is None:
+        from neo4j import GraphDatabase
+
         _driver = GraphDatabase.driver(
             NEO4J_URI,
             auth=(NEO4J_USER, NEO4J_PASSWORD),
+            database=NEO4J_DATABASE,
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+            max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+            max_transaction_retry_time=NEO4J_MAX_RETRY_TIME,
+            fetch_size=NEO4J_FETCH_SIZE,
         )
+        NEO4J_POOL_SIZE.set(NEO4J_MAX_POOL_SIZE)
     return _driver
 
 
-def run(query: str, params: dict | None = None):
+def close_driver() -> None:
+    global _driver
+    if _driver is not None:
+        _driver.close()
+        _driver = None
+
+
+def warm_up(connections: int = NEO4J_WARMUP_CONNECTIONS) -> float:
+    """
+    Verify connectivity and pre-fill the pool.
+
+    Opens `connections` concurrent read sessions so the first requests
+    after startup don't pay for TCP + TLS + auth handshakes.
+    Returns the seconds spent.
+    """
+    start = time.perf_counter()
     driver = get_driver()
-    with driver.session() as session:
-        result = session.run(query, params or {})
-        return result.data()
+    driver.verify_connectivity()
+
+    def ping(_):
+        with _session(READ_ACCESS) as session:
+            session.execute_read(lambda tx: tx.run("RETURN 1 AS ok").consume())
+
+    if connections > 0:
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            list(pool.map(ping, range(connections)))
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Neo4j ready: {connections} pooled connections in {elapsed:.2f}s")
+    return elapsed
+
+
+@contextmanager
+def _session(access_mode: str = WRITE_ACCESS, **config):
+    mode = "read" if access_mode == READ_ACCESS else "write"
+    NEO4J_SESSIONS_IN_USE.inc(mode)
+    try:
+        with get_driver().session(default_access_mode=access_mode, **config) as session:
+            yield session
+    finally:
+        NEO4J_SESSIONS_IN_USE.dec(mode)
+
+
+def _fetch(runner, query: str, params: dict) -> list[dict]:
+    """Run on a session or transaction, profiling when a collector is active."""
+    if is_collecting():
+        start = time.perf_counter()
+        result = runner.run(profiled_query(query), params)
+        rows = result.data()
+        summary = result.consume()
+        record_profile(query, params, summary, (time.perf_counter() - start) * 1000)
+        return rows
+
+    return runner.run(query, params).data()
+
+
+def run(query: str, params: dict | None = None):
+    """Auto-commit statement, used by ingestion scripts for writes."""
+    record_neo4j_query()
+    with _session(WRITE_ACCESS) as session:
+        return _fetch(session, query, params or {})
+
+
+# -------------------------
+# MANAGED TRANSACTIONS
+# -------------------------
+
+def _execute(access_mode: str, query: str, params: dict | None) -> list[dict]:
+    record_neo4j_query()
+    mode = "read" if access_mode == READ_ACCESS else "write"
+    opened = time.perf_counter()
+    attempts = []
+
+    def work(tx):
+        if not attempts:
+            NEO4J_ACQUIRE_SECONDS.observe(time.perf_counter() - opened, mode)
+        elif budget_exhausted():
+            # The driver retries for up to NEO4J_MAX_RETRY_TIME; a request
+            # budget ends that earlier (a non-driver error stops the retries)
+            raise TimeoutError(f"Neo4j {mode} query retried past the request budget ({len(attempts)} attempts)")
+        attempts.append(1)
+        return _fetch(tx, query, params or {})
+
+    # Inside a request budget the server aborts the transaction when it runs out
+    left = remaining()
+    if left is not None:
+        from neo4j import unit_of_work
+
+        work = unit_of_work(timeout=max(left, 0.001))(work)
+
+    with _session(access_mode) as session:
+        if access_mode == READ_ACCESS:
+            return session.execute_read(work)
+        return session.execute_write(work)
+
+
+def read(query: str, params: dict | None = None) -> list[dict]:
+    """
+    Run a read query in a managed transaction.
+
+    With a neo4j:// URI reads are routed to followers / read replicas.
+    The driver retries transient failures (leader switch, deadlock,
+    connection loss) with backoff, so the query must be idempotent.
+    """
+    return _execute(READ_ACCESS, query, params)
+
+
+def write(query: str, params: dict | None = None) -> list[dict]:
+    """Run a write query in a managed, retried transaction."""
+    return _execute(WRITE_ACCESS, query, params)
+
+
+# -------------------------
+# STREAMING
+# -------------------------
+
+def _is_retryable(exc: Exception) -> bool:
+    from neo4j.exceptions import DriverError, Neo4jError
+
+    return isinstance(exc, (Neo4jError, DriverError)) and exc.is_retryable()
+
+
+def stream(
+    query: str,
+    params: dict | None = None,
+    fetch_size: int = DEFAULT_FETCH_SIZE,
+    access_mode: str = READ_ACCESS,
+) -> Iterator[dict]:
+    """
+    Yield records one by one instead of materializing result.data().
+
+    Records are pulled from the server in batches of fetch_size, so a
+    full-graph scan runs in constant memory.
+
+    Guarantees:
+    - Runs inside an explicit transaction with the given access mode
+    - Transient failures are retried until the first record is yielded;
+      after that the consumer has seen data and the error is raised
+    """
+    record_neo4j_query()
+
+    for attempt in range(1, STREAM_RETRIES + 1):
+        yielded = False
+        try:
+            with _session(access_mode, fetch_size=fetch_size) as session:
+                with session.begin_transaction() as tx:
+                    for record in tx.run(query, params or {}):
+                        yielded = True
+                        yield record.data()
+                    tx.commit()
+            return
+        except Exception as exc:
+            if yielded or attempt == STREAM_RETRIES or not _is_retryable(exc):
+                raise
+            time.sleep(attempt * 0.5)
+
+
+def column(
+    query: str,
+    key: str,
+    params: dict | None = None,
+    dtype=np.float64,
+    fetch_size: int = DEFAULT_FETCH_SIZE,
+) -> np.ndarray:
+    """
+    Stream a single column straight into a NumPy array.
+
+    List-valued columns (e.g. embeddings) become a 2-D array whose width
+    is taken from the first row.
+    """
+    values = (row[key] for row in stream(query, params, fetch_size=fetch_size))
+
+    first = next(values, None)
+    if first is None:
+        return np.empty(0, dtype=dtype)
+
+    if isinstance(first, (list, tuple)):
+        row_dtype = np.dtype((dtype, len(first)))
+    else:
+        row_dtype = np.dtype(dtype)
+
+    def chain():
+        yield first
+        yield from values
+
+    return np.fromiter(chain(), dtype=row_dtype)
+
+
+def arrow_batches(
+    query: str,
+    params: dict | None = None,
+    batch_size: int = 10_000,
+    fetch_size: int = DEFAULT_FETCH_SIZE,
+):
+    """Stream a query as pyarrow RecordBatches of at most batch_size rows."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("arrow_batches() requires pyarrow (pip install pyarrow)") from e
+
+    batch = []
+    for row in stream(query, params, fetch_size=fetch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield pa.RecordBatch.from_pylist(batch)
+            batch = []
+
+    if batch:
+        yield pa.RecordBatch.from_pylist(batch)
@@ -0,0 +1,120 @@
+"""
+Opt-in Cypher PROFILE capture.
+
+While a collect_profiles() block is active, every statement issued
+through app.db.neo4j (run, read, write) is executed with PROFILE and
+its plan is summarized into the collector:
+- db hits and rows per operator
+- page cache hits / misses
+- which operators used an index and which scanned
+"""
+
+import json
+import os
+import textwrap
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.config import CYPHER_PROFILE_ADMIN_TOKEN, CYPHER_PROFILE_DIR, CYPHER_PROFILE_ENABLED
+
+_collector: ContextVar[list | None] = ContextVar("promptcorn_cypher_profiles", default=None)
+
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan", "DirectedRelationshipTypeScan", "UndirectedRelationshipTypeScan")
+
+
+def profiling_requested(debug: bool, admin_token: str | None = None) -> bool:
+    """
+    Profiling is only ever attached to debug requests, and needs either
+    the global flag or a matching admin token.
+    """
+    if not debug:
+        return False
+    if CYPHER_PROFILE_ENABLED:
+        return True
+    return bool(CYPHER_PROFILE_ADMIN_TOKEN) and admin_token == CYPHER_PROFILE_ADMIN_TOKEN
+
+
+def is_collecting() -> bool:
+    return _collector.get() is not None
+
+
+@contextmanager
+def collect_profiles():
+    profiles = []
+    token = _collector.set(profiles)
+    try:
+        yield profiles
+    finally:
+        _collector.reset(token)
+
+
+def profiled_query(query: str) -> str:
+    head = query.lstrip()[:8].upper()
+    if head.startswith("PROFILE") or head.startswith("EXPLAIN"):
+        return query
+    return "PROFILE " + query
+
+
+def _flatten(plan: dict, depth: int, out: list) -> None:
+    args = plan.get("args", {})
+    out.append(
+        {
+            "depth": depth,
+            "operator": plan.get("operatorType"),
+            "details": args.get("Details"),
+            "db_hits": plan.get("dbHits", 0),
+            "rows": plan.get("rows", 0),
+            "estimated_rows": args.get("EstimatedRows"),
+            "page_cache_hits": plan.get("pageCacheHits", 0),
+            "page_cache_misses": plan.get("pageCacheMisses", 0),
+        }
+    )
+    for child in plan.get("children", []):
+        _flatten(child, depth + 1, out)
+
+
+def summarize_profile(query: str, params: dict, profile: dict | None, elapsed_ms: float) -> dict:
+    operators = []
+    if profile:
+        _flatten(profile, 0, operators)
+
+    index_ops = [op for op in operators if op["operator"] and "Index" in op["operator"]]
+    scan_ops = [op for op in operators if op["operator"] and op["operator"].split("@")[0] in SCAN_OPERATORS]
+
+    return {
+        "query": textwrap.dedent(query).strip(),
+        "params": sorted(params.keys()),
+        "elapsed_ms": round(elapsed_ms, 2),
+        "total_db_hits": sum(op["db_hits"] for op in operators),
+        "total_rows": operators[0]["rows"] if operators else 0,
+        "page_cache_hits": sum(op["page_cache_hits"] for op in operators),
+        "page_cache_misses": sum(op["page_cache_misses"] for op in operators),
+        "uses_index": bool(index_ops),
+        "index_operators": [op["operator"] for op in index_ops],
+        "scan_operators": [op["operator"] for op in scan_ops],
+        "operators": operators,
+    }
+
+
+def record_profile(query: str, params: dict, summary, elapsed_ms: float) -> None:
+    profiles = _collector.get()
+    if profiles is None:
+        return
+    profiles.append(summarize_profile(query, params, summary.profile, elapsed_ms))
+
+
+def dump_profiles(profiles: list, label: str) -> str | None:
+    """Write a request's profiles to CYPHER_PROFILE_DIR, if configured."""
+    if not CYPHER_PROFILE_DIR or not profiles:
+        return None
+
+    os.makedirs(CYPHER_PROFILE_DIR, exist_ok=True)
+    path = os.path.join(
+        CYPHER_PROFILE_DIR,
+        f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.json",
+    )
+    with open(path, "w") as f:
+        json.dump({"label": label, "profiles": profiles}, f, indent=2, default=str)
+    return path
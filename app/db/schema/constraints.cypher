@@ -22,3 +22,7 @@ CREATE CONSTRAINT award_category_event_required
 IF NOT EXISTS
 FOR (c:AwardCategory)
 REQUIRE c.event IS NOT NULL;
+
+CREATE INDEX movie_updated_at IF NOT EXISTS
+FOR (m:Movie)
+ON (m.updated_at);
@@ -1,21 +1,32 @@
 import asyncio
 import logging
 import os
+from collections import Counter
 from typing import Any, Dict, Optional
 
 import httpx
 
+from app.config import TMDB_BASE_URL, TMDB_CACHE_PATH, TMDB_CONCURRENCY, TMDB_OFFLINE
+from app.ingestion.tmdb_cache import ResponseCache
+
 logger = logging.getLogger(__name__)
 
 
 class TMDBClientError(Exception):
-    pass
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        # HTTP status of an error response; None when there was none
+        self.status_code = status_code
+
+
+class TMDBConnectionError(TMDBClientError):
+    """The API could not be reached (as opposed to an error response)."""
 
 
 class TMDBClient:
-    BASE_URL = "https://api.themoviedb.org/3"
+    BASE_URL = TMDB_BASE_URL
 
-    def __init__(self):
+    def __init__(self, cache_path: str | None = TMDB_CACHE_PATH, offline: bool = TMDB_OFFLINE):
         self.api_key = os.getenv("TMDB_API_KEY")
         self.access_token = os.getenv("TMDB_READ_ACCESS_TOKEN")
 
@@ -27,24 +38,92 @@ class TMDBClient:
         if not self.access_token and self.api_key:
             self.params["api_key"] = self.api_key
 
+        # Response cache: fresh → no request, stale → conditional request,
+        # offline → cache only. hit / revalidated / miss / stale counts in cache_stats
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.offline = offline
+        self.cache_stats = Counter()
+        if offline and self.cache is None:
+            raise TMDBClientError("TMDB_OFFLINE requires TMDB_CACHE_PATH")
+
+        # One connection pool for all requests; at most TMDB_CONCURRENCY in flight
+        self._http: httpx.AsyncClient | None = None
+        self._slots = asyncio.Semaphore(TMDB_CONCURRENCY)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
     async def _request(
-        self, method: str, endpoint: str, params: Optional[Dict] = None
+        self, method: str, endpoint: str, params: Optional[Dict] = None, refresh: bool = False
     ) -> Dict[str, Any]:
+        """
+        Cached request. refresh=True revalidates even a fresh entry
+        (for data known to have changed upstream).
+        """
+        cached = self.cache.get(endpoint, params) if self.cache and method == "GET" else None
+
+        if self.offline:
+            if cached is None:
+                raise TMDBClientError(f"Offline and not cached: {endpoint} {params or ''}")
+            self.cache_stats["hit"] += 1
+            return cached.body
+        if cached is not None and cached.fresh and not refresh:
+            self.cache_stats["hit"] += 1
+            return cached.body
+
+        try:
+            response = await self._fetch(method, endpoint, params, cached.conditional_headers() if cached else {})
+        except TMDBConnectionError:
+            if cached is None:
+                raise
+            logger.warning(f"TMDB unreachable, serving stale cache for {endpoint}")
+            self.cache_stats["stale"] += 1
+            return cached.body
+
+        if response.status_code == 304:
+            self.cache.touch(endpoint, params)
+            self.cache_stats["revalidated"] += 1
+            return cached.body
+
+        body = response.json()
+        if self.cache and method == "GET":
+            self.cache.put(
+                endpoint,
+                params,
+                body,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
+        self.cache_stats["miss"] += 1
+        return body
+
+    async def _fetch(
+        self, method: str, endpoint: str, params: Optional[Dict], headers: Dict[str, str]
+    ) -> httpx.Response:
         url = f"{self.BASE_URL}{endpoint}"
         merged_params = {**self.params, **(params or {})}
 
-        async with httpx.AsyncClient() as client:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=TMDB_CONCURRENCY, max_keepalive_connections=TMDB_CONCURRENCY)
+            )
+
+        async with self._slots:
             for attempt in range(3):
                 try:
-                    response = await client.request(
+                    response = await self._http.request(
                         method,
                         url,
-                        headers=self.headers,
+                        headers={**self.headers, **headers},
                         params=merged_params,
                         timeout=10.0,
                     )
+                    if response.status_code == 304:
+                        return response
                     response.raise_for_status()
-                    return response.json()
+                    return response
                 except httpx.HTTPStatusError as e:
                     if e.response.status_code == 429:
                         retry_after = e.response.headers.get("Retry-After")
@@ -53,11 +132,12 @@ class TMDBClient:
                         await asyncio.sleep(wait_time)
                         continue
                     raise TMDBClientError(
-                        f"TMDB API Error {e.response.status_code}: {e.response.text}"
+                        f"TMDB API Error {e.response.status_code}: {e.response.text}",
+                        status_code=e.response.status_code,
                     )
                 except httpx.RequestError as e:
                     if attempt == 2:
-                        raise TMDBClientError(f"TMDB Connection Error: {e}")
+                        raise TMDBConnectionError(f"TMDB Connection Error: {e}")
                     await asyncio.sleep(1)
 
             raise TMDBClientError("Max retries exceeded")
@@ -90,22 +170,33 @@ class TMDBClient:
         return await self._request("GET", f"/trending/movie/{time_window}", params={"page": page})
 
 
-    async def get_movie_details(self, movie_id: int) -> Dict[str, Any]:
-        return await self._request("GET", f"/movie/{movie_id}")
+    async def get_movie_details(self, movie_id: int, refresh: bool = False) -> Dict[str, Any]:
+        return await self._request("GET", f"/movie/{movie_id}", refresh=refresh)
     
-    async def get_movie_credits(self, movie_id: int) -> Dict[str, Any]:
+    async def get_movie_credits(self, movie_id: int, refresh: bool = False) -> Dict[str, Any]:
         """
         Fetch cast and crew information for a movie.
         Used to create Person nodes and ACTED_IN / DIRECTED relationships.
         """
-        return await self._request("GET", f"/movie/{movie_id}/credits")
+        return await self._request("GET", f"/movie/{movie_id}/credits", refresh=refresh)
     
-    async def get_movie_keywords(self, movie_id: int) -> Dict[str, Any]:
+    async def get_movie_keywords(self, movie_id: int, refresh: bool = False) -> Dict[str, Any]:
         """
         Fetch keywords associated with a movie.
         Used for semantic enrichment without ML.
         """
-        return await self._request("GET", f"/movie/{movie_id}/keywords")
+        return await self._request("GET", f"/movie/{movie_id}/keywords", refresh=refresh)
+
+    async def get_movie_changes(self, start_date: str, end_date: str, page: int = 1) -> Dict[str, Any]:
+        """
+        Ids of movies edited between two dates (YYYY-MM-DD, at most 14 days apart).
+        Never served from cache outside offline mode (TTL 0).
+        """
+        return await self._request(
+            "GET",
+            "/movie/changes",
+            params={"start_date": start_date, "end_date": end_date, "page": page},
+        )
     
     async def discover_movies(
         self,
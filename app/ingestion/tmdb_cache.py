@@ -0,0 +1,134 @@
+"""
+On-disk cache of TMDB API responses (SQLite, zlib-compressed JSON).
+
+Keyed by endpoint + query params (credentials excluded), with:
+- per-endpoint TTLs: a fresh entry is served without touching the network
+- conditional revalidation: a stale entry is re-requested with its
+  ETag / Last-Modified; a 304 only renews fetched_at
+- offline mode (TMDB_OFFLINE=true): every request is served from the
+  cache, stale or not; a miss is an error
+
+One file, safe to share between concurrent ingestion runs (WAL mode).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+# Seconds an entry is served without revalidation, by endpoint prefix
+# (longest match wins); list endpoints move fast, film data rarely does
+TTL_SECONDS = {
+    "/movie/popular": 24 * 3600,
+    "/movie/top_rated": 24 * 3600,
+    "/movie/now_playing": 6 * 3600,
+    "/movie/upcoming": 6 * 3600,
+    "/movie/latest": 3600,
+    "/trending/": 3600,
+    "/discover/": 24 * 3600,
+    "/movie/changes": 0,
+}
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+# Film details and their sub-resources (/movie/<id>, /movie/<id>/credits, ...)
+MOVIE_DETAIL = re.compile(r"^/movie/\d+(/|$)")
+MOVIE_DETAIL_TTL_SECONDS = 7 * 24 * 3600
+
+# Request params that never change the response
+IGNORED_PARAMS = {"api_key"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+def ttl_for(endpoint: str) -> int:
+    if MOVIE_DETAIL.match(endpoint):
+        return MOVIE_DETAIL_TTL_SECONDS
+    matches = [prefix for prefix in TTL_SECONDS if endpoint.startswith(prefix)]
+    return TTL_SECONDS[max(matches, key=len)] if matches else DEFAULT_TTL_SECONDS
+
+
+def cache_key(endpoint: str, params: dict | None) -> str:
+    kept = sorted((k, str(v)) for k, v in (params or {}).items() if k not in IGNORED_PARAMS)
+    return endpoint + ("?" + "&".join(f"{k}={v}" for k, v in kept) if kept else "")
+
+
+@dataclass
+class CachedResponse:
+    body: dict
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    ttl: int
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.fetched_at < self.ttl
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, params: dict | None) -> CachedResponse | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (cache_key(endpoint, params),),
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, fetched_at = row
+        return CachedResponse(json.loads(zlib.decompress(body)), etag, last_modified, fetched_at, ttl_for(endpoint))
+
+    def put(self, endpoint: str, params: dict | None, body: dict, etag: str | None, last_modified: str | None) -> None:
+        blob = zlib.compress(json.dumps(body, separators=(",", ":")).encode(), 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(endpoint, params), endpoint, blob, etag, last_modified, time.time()),
+            )
+
+    def touch(self, endpoint: str, params: dict | None) -> None:
+        """Renew an entry the server confirmed unchanged (304)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ? WHERE key = ?",
+                (time.time(), cache_key(endpoint, params)),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT count(*), coalesce(sum(length(body)), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "compressed_bytes": size}
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,12 +1,65 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from app.api.routes import router
+from app.config import SNAPSHOT_POLL_SECONDS
+from app.db.neo4j import close_driver, warm_up
+from app.metrics import TimingMiddleware
+from app.query_log import start_query_logger, stop_query_logger
+from app.recsys.fallback import get_popular_list
+from app.recsys.filters import get_filter_bitmaps
+from app.recsys.graph_snapshot import get_graph_snapshot
+from app.recsys.lexical import get_lexical_index
+from app.recsys.snapshots import start_refresher, stop_refresher
+from app.services.embeddings import get_embedding_service
+from app.warmup import start_warmup
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    # Fail fast on a bad NEO4J_URI and pre-fill the connection pool
+    await run_in_threadpool(warm_up)
+    # Independent loads run concurrently (mostly Neo4j / disk I/O):
+    # - in-process backends: map (or build) the vector index and load the
+    #   filter bitmaps from the graph before traffic
+    # - popular list, so degraded-mode answers never wait on the graph
+    # - CSR adjacency snapshot for graph-neighborhood recall
+    # - lexical index, and the OpenAI client (imported here, not on the first request)
+    await asyncio.gather(
+        run_in_threadpool(get_filter_bitmaps),
+        run_in_threadpool(get_popular_list),
+        run_in_threadpool(get_graph_snapshot),
+        run_in_threadpool(get_lexical_index),
+        run_in_threadpool(lambda: get_embedding_service().client),
+    )
+    # Hot reload: rebuild any of the above off the request path when its
+    # artifact file or the graph data version changes
+    start_refresher(SNAPSHOT_POLL_SECONDS)
+    start_query_logger()
+    # Frequent queries' embeddings and candidates, filled before /ready says so
+    start_warmup(get_embedding_service())
+    logger.info("🍿 PromptCorn 🤖 API ready in %.2fs", time.perf_counter() - start)
+    yield
+    stop_query_logger()
+    stop_refresher()
+    close_driver()
+
 
 app = FastAPI(
     title="PromptCorn API",
     description="A learning-oriented graph-based movie recommendation system.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(TimingMiddleware)
 app.include_router(router)
 
 if __name__ == "__main__":
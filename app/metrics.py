@@ -0,0 +1,409 @@
+"""
+Lightweight in-process instrumentation.
+
+- span(name) times a pipeline stage
+- Stage timings are aggregated per request (Server-Timing header)
+  and globally (Prometheus histograms on /metrics)
+- When METRICS_ENABLED is false, span() returns a shared no-op object
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from app.config import METRICS_ENABLED
+
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+# -------------------------
+# METRIC TYPES
+# -------------------------
+
+def _format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in zip(label_names, label_values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *label_values) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "promptcorn_stage_duration_seconds",
+    "Latency of a single pipeline stage.",
+    labels=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "promptcorn_request_duration_seconds",
+    "End-to-end HTTP request latency.",
+    labels=("path",),
+)
+NEO4J_QUERIES_PER_REQUEST = Histogram(
+    "promptcorn_neo4j_queries_per_request",
+    "Number of Cypher statements issued while serving one request.",
+    labels=("path",),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+NEO4J_QUERIES = Counter(
+    "promptcorn_neo4j_queries_total",
+    "Cypher statements issued through app.db.neo4j.",
+)
+CACHE_REQUESTS = Counter(
+    "promptcorn_cache_requests_total",
+    "Cache lookups by cache name and outcome.",
+    labels=("cache", "result"),
+)
+DEGRADED_RESPONSES = Counter(
+    "promptcorn_degraded_responses_total",
+    "Requests answered by a fallback because a stage missed its budget or failed.",
+    labels=("reason",),
+)
+EMBEDDING_HEDGES = Counter(
+    "promptcorn_embedding_hedges_total",
+    "Duplicate embedding requests sent after the hedge delay.",
+)
+
+NEO4J_POOL_SIZE = Gauge(
+    "promptcorn_neo4j_pool_max_size",
+    "Configured maximum connections per server in the Neo4j pool.",
+)
+NEO4J_SESSIONS_IN_USE = Gauge(
+    "promptcorn_neo4j_sessions_in_use",
+    "Sessions currently holding a pooled connection, by access mode.",
+    labels=("mode",),
+)
+NEO4J_ACQUIRE_SECONDS = Histogram(
+    "promptcorn_neo4j_acquire_seconds",
+    "Wait between opening a session and its transaction starting (pool acquisition + BEGIN).",
+    labels=("mode",),
+)
+SNAPSHOT_GENERATION = Gauge(
+    "promptcorn_snapshot_generation",
+    "Generation of each in-memory serving snapshot (increments on every hot reload).",
+    labels=("snapshot",),
+)
+SNAPSHOT_BUILD_SECONDS = Gauge(
+    "promptcorn_snapshot_build_seconds",
+    "Time spent building (and warming) the current generation.",
+    labels=("snapshot",),
+)
+SNAPSHOT_AGE_SECONDS = Gauge(
+    "promptcorn_snapshot_age_seconds",
+    "Seconds since the current generation was swapped in (updated on every poll).",
+    labels=("snapshot",),
+)
+SNAPSHOT_BYTES = Gauge(
+    "promptcorn_snapshot_bytes",
+    "Memory held by the current generation.",
+    labels=("snapshot",),
+)
+SNAPSHOT_RELOADS = Counter(
+    "promptcorn_snapshot_reloads_total",
+    "Hot reloads by snapshot and outcome.",
+    labels=("snapshot", "result"),
+)
+QUERY_LOG_RECORDS = Counter(
+    "promptcorn_query_log_records_total",
+    "Query log records by outcome (written, dropped on a full queue, sampled_out, failed).",
+    labels=("result",),
+)
+
+REGISTRY = [
+    STAGE_SECONDS,
+    REQUEST_SECONDS,
+    NEO4J_QUERIES_PER_REQUEST,
+    NEO4J_QUERIES,
+    CACHE_REQUESTS,
+    DEGRADED_RESPONSES,
+    EMBEDDING_HEDGES,
+    NEO4J_POOL_SIZE,
+    NEO4J_SESSIONS_IN_USE,
+    NEO4J_ACQUIRE_SECONDS,
+    SNAPSHOT_GENERATION,
+    SNAPSHOT_BUILD_SECONDS,
+    SNAPSHOT_AGE_SECONDS,
+    SNAPSHOT_BYTES,
+    SNAPSHOT_RELOADS,
+    QUERY_LOG_RECORDS,
+]
+
+
+# -------------------------
+# PER-REQUEST TRACE
+# -------------------------
+
+class RequestTrace:
+    """Mutable per-request accumulator, shared by every span in the request."""
+
+    __slots__ = ("started", "stages", "neo4j_queries", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.neo4j_queries = 0
+        self.cache_hits = {}
+        self.cache_misses = {}
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        # Repeated stages (e.g. one award lookup per result) accumulate
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        entries.append(f'neo4j;desc="{self.neo4j_queries} queries"')
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar("promptcorn_trace", default=None)
+
+
+def current_trace() -> RequestTrace | None:
+    return _current_trace.get()
+
+
+# -------------------------
+# SPANS
+# -------------------------
+
+class _Span:
+    __slots__ = ("name", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        STAGE_SECONDS.observe(seconds, self.name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_stage(self.name, seconds)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """
+    Time a block as a named stage.
+
+        with span("embed"):
+            vector = service.embed_text(text)
+    """
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_neo4j_query() -> None:
+    if not METRICS_ENABLED:
+        return
+    NEO4J_QUERIES.inc()
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.neo4j_queries += 1
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    if not METRICS_ENABLED:
+        return
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+    trace = _current_trace.get()
+    if trace is not None:
+        bucket = trace.cache_hits if hit else trace.cache_misses
+        bucket[cache] = bucket.get(cache, 0) + 1
+
+
+# -------------------------
+# EXPOSITION
+# -------------------------
+
+def _render_cache_ratios() -> list[str]:
+    name = "promptcorn_cache_hit_ratio"
+    lines = [f"# HELP {name} Fraction of cache lookups that were hits.", f"# TYPE {name} gauge"]
+    caches = sorted({labels[0] for labels in CACHE_REQUESTS._values})
+    for cache in caches:
+        hits = CACHE_REQUESTS.value(cache, "hit")
+        total = hits + CACHE_REQUESTS.value(cache, "miss")
+        lines.append(f'{name}{{cache="{cache}"}} {hits / total if total else 0.0}')
+    return lines
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_render_cache_ratios())
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# ASGI MIDDLEWARE
+# -------------------------
+
+class TimingMiddleware:
+    """
+    Opens a RequestTrace per HTTP request and reports it:
+    - Server-Timing response header with one entry per stage
+    - request latency and Neo4j query count histograms
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            # Label by route template so path parameters don't explode cardinality
+            route = scope.get("route")
+            path = getattr(route, "path", scope.get("path", ""))
+            if path != "/metrics":
+                REQUEST_SECONDS.observe(trace.elapsed(), path)
+                NEO4J_QUERIES_PER_REQUEST.observe(trace.neo4j_queries, path)
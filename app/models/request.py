@@ -5,3 +5,5 @@ class RecommendationRequest(BaseModel):
     query: str = Field(..., example="funny recent movie that won an Oscar")
     limit: int = Field(default=5, ge=1, le=20)
     debug: bool = Field(default=False)
+    # MMR λ for this request (1 = pure relevance); None = MMR_ENABLED / MMR_LAMBDA
+    diversity: Optional[float] = Field(default=None, ge=0, le=1)
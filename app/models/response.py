@@ -20,9 +20,25 @@ class MovieRecommendation(BaseModel):
     recency_boost: float
     award_boost: float
     comedy_boost: float
+    lexical_boost: float = 0.0
     awards: List[str] = []
 
 class RecommendationResponse(BaseModel):
     parsed_query: ParsedQuery
     debug: Optional[dict] = None
     results: List[MovieRecommendation]
+    # Set when a stage missed its latency budget and a fallback answered
+    degraded: bool = False
+    degraded_reasons: List[str] = []
+
+class SimilarMovie(BaseModel):
+    tmdb_id: int
+    title: str
+    original_title: str
+    release_year: Optional[int]
+    score: float
+    similarity_score: float
+
+class SimilarMoviesResponse(BaseModel):
+    tmdb_id: int
+    results: List[SimilarMovie]
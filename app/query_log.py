@@ -0,0 +1,227 @@
+"""
+/recommend query log: one gzip'd JSONL record per (sampled) request.
+
+- the request thread only enqueues; a background thread serializes,
+  compresses and writes, so disk speed never shows in request latency
+- the queue is bounded (QUERY_LOG_QUEUE_SIZE): when the disk falls
+  behind, records are dropped and counted, memory stays flat
+- files rotate by size (QUERY_LOG_MAX_MB, compressed) and age
+  (QUERY_LOG_ROTATE_SECONDS); QUERY_LOG_SAMPLE_RATE keeps a fraction
+
+Records carry "query", "limit" and "debug", so a log file (or the whole
+directory) replays with scripts.bench.replay_api --log.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+
+from app.config import (
+    QUERY_LOG_DIR,
+    QUERY_LOG_ENABLED,
+    QUERY_LOG_MAX_MB,
+    QUERY_LOG_QUEUE_SIZE,
+    QUERY_LOG_ROTATE_SECONDS,
+    QUERY_LOG_SAMPLE_RATE,
+)
+from app.metrics import QUERY_LOG_RECORDS
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = 5.0
+_STOP = object()
+
+
+def _serialize(entry: dict) -> bytes:
+    """JSON line for one logged request; runs on the writer thread."""
+    parsed = entry.pop("parsed_query")
+    results = entry.pop("results")
+    trace = entry.pop("trace")
+    record = {
+        **entry,
+        "parsed": parsed.model_dump(exclude_none=True),
+        "results": [r.tmdb_id for r in results],
+    }
+    if trace is not None:
+        record["stages_ms"] = {name: round(seconds * 1000, 2) for name, seconds in trace["stages"].items()}
+        record["neo4j_queries"] = trace["neo4j_queries"]
+        record["cache_hits"] = trace["cache_hits"]
+        record["cache_misses"] = trace["cache_misses"]
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class QueryLogger:
+    def __init__(
+        self,
+        directory: str = QUERY_LOG_DIR,
+        sample_rate: float = QUERY_LOG_SAMPLE_RATE,
+        max_bytes: int = int(QUERY_LOG_MAX_MB * 1024 * 1024),
+        rotate_seconds: float = QUERY_LOG_ROTATE_SECONDS,
+        queue_size: int = QUERY_LOG_QUEUE_SIZE,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._raw = None
+        self._gzip = None
+        self._opened_at = 0.0
+        self._flushed_at = 0.0
+
+    # -------------------------
+    # REQUEST SIDE
+    # -------------------------
+
+    def log(self, entry: dict) -> None:
+        """Enqueue without blocking; sampled out or dropped when the queue is full."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            QUERY_LOG_RECORDS.inc("sampled_out")
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            QUERY_LOG_RECORDS.inc("dropped")
+
+    # -------------------------
+    # WRITER THREAD
+    # -------------------------
+
+    def start(self) -> "QueryLogger":
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="query-log", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Drain what is queued (up to timeout) and close the current file."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Query log queue still full at shutdown; unwritten records are lost")
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                entry = self._queue.get(timeout=FLUSH_SECONDS)
+            except queue.Empty:
+                entry = None
+
+            if entry is _STOP:
+                self._close()
+                return
+            if entry is not None:
+                try:
+                    self._write(_serialize(entry))
+                    QUERY_LOG_RECORDS.inc("written")
+                except Exception as exc:
+                    QUERY_LOG_RECORDS.inc("failed")
+                    logger.warning("Query log write failed: %s", exc)
+
+            now = time.monotonic()
+            if self._gzip is not None and now - self._flushed_at >= FLUSH_SECONDS:
+                # Sync flush: a crash loses at most FLUSH_SECONDS of records
+                self._gzip.flush(zlib.Z_SYNC_FLUSH)
+                self._flushed_at = now
+            if self._gzip is not None and now - self._opened_at >= self.rotate_seconds:
+                self._close()
+
+    def _write(self, line: bytes) -> None:
+        if self._gzip is not None and self._raw.tell() >= self.max_bytes:
+            self._close()
+        if self._gzip is None:
+            self._open()
+        self._gzip.write(line)
+
+    def _open(self) -> None:
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.directory, f"queries-{stamp}-{os.getpid()}.jsonl.gz")
+        self._raw = open(path, "ab")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        self._opened_at = self._flushed_at = time.monotonic()
+
+    def _close(self) -> None:
+        if self._gzip is None:
+            return
+        self._gzip.close()
+        self._raw.close()
+        self._gzip = self._raw = None
+
+
+# -------------------------
+# READING
+# -------------------------
+
+def log_files(path: str) -> list[str]:
+    """A log file, or every rotated file in a log directory (oldest first)."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.jsonl.gz")) + glob.glob(os.path.join(path, "*.jsonl")))
+    return [path]
+
+
+def read_query_log(path: str):
+    """
+    Yield records from a JSONL / gzip'd JSONL log file or directory.
+
+    A malformed line is skipped (and counted in a warning); a truncated
+    gzip tail ends that file.
+    """
+    for file in log_files(path):
+        opener = gzip.open if file.endswith(".gz") else open
+        malformed = 0
+        try:
+            with opener(file, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Includes the half-written last line of a file still being written
+                        malformed += 1
+                        continue
+                    yield record
+        except EOFError:
+            # File still being written (or cut short by a crash)
+            pass
+        if malformed:
+            logger.warning("Skipped %d malformed line(s) in %s", malformed, file)
+
+
+# -------------------------
+# SINGLETON
+# -------------------------
+
+_logger = None
+
+
+def start_query_logger() -> QueryLogger | None:
+    global _logger
+    if QUERY_LOG_ENABLED and _logger is None:
+        _logger = QueryLogger().start()
+    return _logger
+
+
+def stop_query_logger() -> None:
+    global _logger
+    if _logger is not None:
+        _logger.stop()
+        _logger = None
+
+
+def get_query_logger() -> QueryLogger | None:
+    """The process-wide logger, or None when QUERY_LOG_ENABLED is off (or before startup)."""
+    return _logger
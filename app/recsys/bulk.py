@@ -0,0 +1,212 @@
+"""
+Vectorized scoring for offline bulk recommendation.
+
+Same ranking as app.recsys.orchestration.recommend (vector recall, then
+rerank's cast / director / genre co-occurrence and popularity dampening),
+for thousands of prompts at once:
+- one blocked matrix multiplication per chunk of prompts keeps a running
+  top-`pool` per prompt, with each prompt's filter mask applied to the block
+- the co-occurrence counts inside every prompt's pool come from CSR
+  gathers and np.unique over (prompt, entity) keys, not per-film queries
+- film attributes are exported once (FEATURES_QUERY) and shipped to the
+  worker processes, so scoring issues no Neo4j queries at all
+
+Graph expansion and MMR are left out: they depend on per-prompt graph
+walks and are the online path's job.
+"""
+
+import numpy as np
+
+from app.db.neo4j import stream
+from app.models.response import QueryFilters
+from app.recsys.filters import FilterBitmaps
+from app.recsys.graph_snapshot import CSR
+from app.recsys.reason import graph_boost
+from app.recsys.vector_index import SCORE_BLOCK_ROWS
+
+# Films above this popularity lose POPULARITY_PENALTY (rerank's anti-blockbuster gravity)
+POPULARITY_CUTOFF = 80
+POPULARITY_PENALTY = 0.09
+
+FEATURES_QUERY = """
+MATCH (m:Movie)
+RETURN m.tmdb_id AS tmdb_id,
+       m.release_date AS release_date,
+       m.original_language AS language,
+       coalesce(m.popularity, 0) AS popularity,
+       [(m)-[:HAS_GENRE]->(g:Genre) | g.name] AS genres,
+       [(m)-[r:RECEIVED]->(:AwardCategory)<-[:HAS_CATEGORY]-(e:AwardEvent) | [e.name, r.result]] AS awards,
+       [(p:Person)-[:ACTED_IN]->(m) | elementId(p)] AS actor_ids,
+       [(p:Person)-[:DIRECTED]->(m) | elementId(p)] AS director_ids
+"""
+
+# rerank signal → FEATURES_QUERY column
+KINDS = {"actors": "actor_ids", "directors": "director_ids", "genres": "genres"}
+
+# graph_boost saturates at 3 shared actors / genres and any shared director,
+# so a lookup table indexed by the clipped counts applies it to whole arrays
+BOOSTS = np.array(
+    [[[graph_boost(a, d, g) for g in range(4)] for d in range(2)] for a in range(4)],
+    dtype=np.float32,
+)
+
+
+class FilmFeatures:
+    """Filter bitmaps, entity adjacency and popularity, aligned with the rows of the embedding matrix."""
+
+    def __init__(self, bitmaps: FilterBitmaps, entities: dict[str, CSR], popularity: np.ndarray):
+        self.bitmaps = bitmaps
+        self.entities = entities
+        self.popularity = popularity
+
+    @classmethod
+    def from_rows(cls, index_ids: np.ndarray, rows) -> "FilmFeatures":
+        """Build from FEATURES_QUERY records; films missing from the matrix are skipped."""
+        rows = list(rows)
+        size = index_ids.shape[0]
+        order = np.argsort(index_ids)
+        sorted_ids = index_ids[order]
+
+        popularity = np.zeros(size, dtype=np.float32)
+        edges = {kind: ([], []) for kind in KINDS}
+        interned = {kind: {} for kind in KINDS}
+        for row in rows:
+            at = np.searchsorted(sorted_ids, row["tmdb_id"])
+            if at == size or sorted_ids[at] != row["tmdb_id"]:
+                continue
+            pos = int(order[at])
+            popularity[pos] = row.get("popularity") or 0
+            for kind, column in KINDS.items():
+                src, dst = edges[kind]
+                for entity in set(row.get(column) or ()):
+                    src.append(pos)
+                    dst.append(interned[kind].setdefault(entity, len(interned[kind])))
+
+        entities = {
+            kind: CSR.from_edges(np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64), size)
+            for kind, (src, dst) in edges.items()
+        }
+        return cls(FilterBitmaps.from_rows(index_ids, rows), entities, popularity)
+
+    @classmethod
+    def load(cls, index_ids: np.ndarray) -> "FilmFeatures":
+        return cls.from_rows(index_ids, stream(FEATURES_QUERY))
+
+    def nbytes(self) -> int:
+        return self.bitmaps.nbytes() + self.popularity.nbytes + sum(csr.nbytes() for csr in self.entities.values())
+
+
+# -------------------------
+# WORKER
+# -------------------------
+
+_ids = None
+_matrix = None
+_features = None
+
+
+def init_worker(ids: np.ndarray, matrix, features: FilmFeatures) -> None:
+    """Pool initializer: an artifact path is memory-mapped, so workers share pages."""
+    global _ids, _matrix, _features
+    if isinstance(matrix, str):
+        from app.recsys.vectors import load_embeddings
+
+        matrix = load_embeddings(matrix)[1]
+    _ids, _matrix, _features = ids, matrix, features
+
+
+def _prompt_masks(filters: list[dict | None]) -> tuple[np.ndarray | None, np.ndarray]:
+    """One boolean row mask per distinct filter set, and each prompt's mask index (-1 = unfiltered)."""
+    masks, index_of, which = [], {}, np.full(len(filters), -1, dtype=np.int64)
+    for i, f in enumerate(filters):
+        mask = _features.bitmaps.for_query(QueryFilters(**f)) if f else None
+        if mask is None:
+            continue
+        key = tuple(sorted(f.items()))
+        if key not in index_of:
+            index_of[key] = len(masks)
+            masks.append(mask)
+        which[i] = index_of[key]
+    return (np.stack(masks) if masks else None), which
+
+
+def _recall(queries: np.ndarray, filters: list[dict | None], pool: int, block_rows: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-`pool` rows and cosines per prompt; -inf pads prompts whose filters leave fewer films."""
+    n_prompts, n = queries.shape[0], _matrix.shape[0]
+    pool = min(pool, n)
+    masks, which = _prompt_masks(filters)
+    filtered = np.flatnonzero(which >= 0)
+
+    best_rows = np.zeros((n_prompts, pool), dtype=np.int64)
+    best_scores = np.full((n_prompts, pool), -np.inf, dtype=np.float32)
+    for start in range(0, n, block_rows):
+        block = np.asarray(_matrix[start:start + block_rows], dtype=np.float32)
+        scores = queries @ block.T
+        if filtered.size:
+            allowed = masks[which[filtered], start:start + block.shape[0]]
+            scores[filtered] = np.where(allowed, scores[filtered], -np.inf)
+
+        # Running top-pool: merge the block into the best so far
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_rows = np.concatenate(
+            [best_rows, np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)], axis=1
+        )
+        keep = np.argpartition(-merged_scores, pool - 1, axis=1)[:, :pool]
+        best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+    return best_rows, best_scores
+
+
+def _shared_counts(kind: str, rows: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Per candidate: how many of its entities another candidate of the same
+    prompt also has (rerank's shared_actors / director_cluster / shared_genres).
+    """
+    n_prompts, pool = rows.shape
+    slots = np.flatnonzero(valid.ravel())
+    csr = _features.entities[kind]
+    entities, slot_of = csr.gather(rows.ravel()[slots], slots)
+    counts = np.zeros(n_prompts * pool, dtype=np.int64)
+    if not entities.size:
+        return counts.reshape(n_prompts, pool)
+
+    slot_of = slot_of.astype(np.int64)
+    n_entities = int(entities.max()) + 1
+    # How many candidates of the prompt hold each entity
+    keys = (slot_of // pool) * n_entities + entities
+    _, inverse, holders = np.unique(keys, return_inverse=True, return_counts=True)
+    shared = holders[inverse] > 1
+    counts += np.bincount(slot_of[shared], minlength=n_prompts * pool)
+    return counts.reshape(n_prompts, pool)
+
+
+def score_chunk(
+    queries: np.ndarray,
+    filters: list[dict | None],
+    limit: int,
+    pool: int,
+    block_rows: int = SCORE_BLOCK_ROWS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Top-`limit` films per prompt as (tmdb_ids, final scores, vector scores),
+    each (prompts × limit); rows a prompt could not fill are tmdb_id -1.
+    """
+    rows, cosines = _recall(queries, filters, pool, block_rows)
+    valid = np.isfinite(cosines)
+    # queryNodes scale, as the online candidates
+    similarity = np.where(valid, (1.0 + cosines) / 2, -np.inf).astype(np.float32)
+
+    shared = {kind: _shared_counts(kind, rows, valid) for kind in KINDS}
+    boosts = BOOSTS[
+        np.minimum(shared["actors"], 3), np.minimum(shared["directors"], 1), np.minimum(shared["genres"], 3)
+    ]
+    boosts -= np.where(_features.popularity[rows] > POPULARITY_CUTOFF, POPULARITY_PENALTY, 0.0).astype(np.float32)
+    final = np.where(valid, similarity + boosts, -np.inf)
+
+    limit = min(limit, final.shape[1])
+    order = np.argsort(-final, axis=1, kind="stable")[:, :limit]
+    final = np.take_along_axis(final, order, axis=1)
+    tmdb_ids = np.where(np.isfinite(final), _ids[np.take_along_axis(rows, order, axis=1)], -1)
+    similarity = np.take_along_axis(similarity, order, axis=1)
+    return tmdb_ids, final, similarity
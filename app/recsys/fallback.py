@@ -0,0 +1,89 @@
+"""
+Popular-and-awarded fallback list.
+
+Loaded once (at startup) from the graph, then served from memory:
+when no query vector can be had within the budget, /recommend answers
+with the best-known films that pass the parsed filters.
+
+popular_score = ln(1 + popularity) + 0.5 · award wins
+"""
+
+import logging
+import time
+
+from app.config import POPULAR_POOL
+from app.db.data_version import graph_version
+from app.db.neo4j import read
+from app.models.response import QueryFilters
+from app.recsys.snapshots import SnapshotManager
+
+logger = logging.getLogger(__name__)
+
+POPULAR_QUERY = """
+MATCH (m:Movie)
+WITH m, [(m)-[r:RECEIVED]->(:AwardCategory)<-[:HAS_CATEGORY]-(e:AwardEvent) | [e.name, r.result]] AS awards
+WITH m, awards,
+     log(1 + coalesce(m.popularity, 0.0)) + 0.5 * size([a IN awards WHERE a[1] = "won"]) AS popular_score
+ORDER BY popular_score DESC
+LIMIT $limit
+RETURN m.tmdb_id AS tmdb_id,
+       m.title AS title,
+       m.original_title AS original_title,
+       m.release_date AS release_date,
+       awards,
+       popular_score
+"""
+
+
+class PopularList:
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        top = rows[0]["popular_score"] if rows else 0.0
+        # Scores shown on a 0-1 scale, like similarity
+        self.scale = 1.0 / top if top else 1.0
+
+    @classmethod
+    def load(cls, limit: int = POPULAR_POOL) -> "PopularList":
+        start = time.perf_counter()
+        popular = cls(read(POPULAR_QUERY, {"limit": limit}))
+        logger.info("Popular fallback list: %d films in %.2fs", len(popular.rows), time.perf_counter() - start)
+        return popular
+
+    def for_filters(self, filters: QueryFilters | None, limit: int) -> list[dict]:
+        """Best films passing the parsed filters, same semantics as the ranking query's WHERE."""
+        out = []
+        for row in self.rows:
+            if filters is not None and not self._passes(row, filters):
+                continue
+            out.append({**row, "popular_score": row["popular_score"] * self.scale})
+            if len(out) == limit:
+                break
+        return out
+
+    @staticmethod
+    def _passes(row: dict, filters: QueryFilters) -> bool:
+        if filters.year_from:
+            date = row.get("release_date")
+            if not date or not date[:4].isdigit() or int(date[:4]) < filters.year_from:
+                return False
+        if filters.award_event:
+            wanted = [filters.award_event, filters.award_result or "won"]
+            if wanted not in [list(a) for a in row.get("awards") or []]:
+                return False
+        return True
+
+
+def _load_popular() -> PopularList | None:
+    try:
+        return PopularList.load()
+    except Exception as exc:
+        logger.warning("Popular fallback list unavailable: %s", exc)
+        return None
+
+
+_popular = SnapshotManager("popular", _load_popular, version=graph_version)
+
+
+def get_popular_list() -> PopularList | None:
+    """The fallback list, loaded on first use and after graph changes; None if the graph could not be read."""
+    return _popular.get()
@@ -0,0 +1,178 @@
+"""
+Filter bitmaps for pre-filtered in-process vector search.
+
+One packed bitmap (np.packbits) per attribute value, aligned with the
+rows of the serving vector index:
+- release year (ranges OR the per-year bitmaps together)
+- original_language
+- market segment: "ES" (es), "US" (en), "international" (everything else)
+- genre
+- award event × result, plus Best Picture winners
+
+Filters compile into a single boolean mask that is passed to
+index.search(), so similarity is only computed for films that pass.
+The Cypher WHERE clauses stay in place as the source of truth.
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from app.db.neo4j import stream
+from app.models.response import QueryFilters
+
+logger = logging.getLogger(__name__)
+
+BITMAP_QUERY = """
+MATCH (m:Movie)
+RETURN m.tmdb_id AS tmdb_id,
+       m.release_date AS release_date,
+       m.original_language AS language,
+       [(m)-[:HAS_GENRE]->(g:Genre) | g.name] AS genres,
+       [(m)-[r:RECEIVED]->(:AwardCategory)<-[:HAS_CATEGORY]-(e:AwardEvent) | [e.name, r.result]] AS awards,
+       EXISTS { (m)-[:WON]->(:AwardCategory {category: "Best Picture"}) } AS best_picture
+"""
+
+
+def market_segment(language: str | None) -> str:
+    if language == "es":
+        return "ES"
+    if language == "en":
+        return "US"
+    return "international"
+
+
+class FilterBitmaps:
+    def __init__(self, size: int, bitmaps: dict[tuple, np.ndarray]):
+        self.size = size
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def from_rows(cls, index_ids: np.ndarray, rows) -> "FilterBitmaps":
+        """Build from BITMAP_QUERY records; films missing from the index are skipped."""
+        size = index_ids.shape[0]
+        order = np.argsort(index_ids)
+        sorted_ids = index_ids[order]
+
+        positions = defaultdict(list)
+        for row in rows:
+            tmdb_id = row["tmdb_id"]
+            at = np.searchsorted(sorted_ids, tmdb_id)
+            if at == size or sorted_ids[at] != tmdb_id:
+                continue
+            pos = int(order[at])
+
+            date = row.get("release_date")
+            if date and len(date) >= 4 and date[:4].isdigit():
+                positions[("year", int(date[:4]))].append(pos)
+
+            language = row.get("language")
+            if language:
+                positions[("language", language)].append(pos)
+            positions[("segment", market_segment(language))].append(pos)
+
+            for genre in row.get("genres") or []:
+                positions[("genre", genre)].append(pos)
+            for event, result in row.get("awards") or []:
+                positions[("award", event, result)].append(pos)
+            if row.get("best_picture"):
+                positions[("best_picture",)].append(pos)
+
+        bitmaps = {}
+        for key, rows_for_key in positions.items():
+            bits = np.zeros(size, dtype=bool)
+            bits[rows_for_key] = True
+            bitmaps[key] = np.packbits(bits)
+
+        return cls(size, bitmaps)
+
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self.bitmaps.values())
+
+    def _get(self, *key) -> np.ndarray:
+        empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        return self.bitmaps.get(key, empty)
+
+    def _years(self, year_from: int | None, year_to: int | None) -> np.ndarray:
+        years = [
+            key[1]
+            for key in self.bitmaps
+            if key[0] == "year"
+            and (year_from is None or key[1] >= year_from)
+            and (year_to is None or key[1] <= year_to)
+        ]
+        if not years:
+            return self._get("year", None)
+        return np.bitwise_or.reduce([self.bitmaps[("year", y)] for y in years])
+
+    def compile(
+        self,
+        year_from: int | None = None,
+        year_to: int | None = None,
+        language: str | None = None,
+        segment: str | None = None,
+        genre: str | None = None,
+        award_event: str | None = None,
+        award_result: str | None = None,
+        best_picture: bool = False,
+    ) -> np.ndarray | None:
+        """AND the requested bitmaps into one boolean row mask (None = no filter)."""
+        parts = []
+        if year_from is not None or year_to is not None:
+            parts.append(self._years(year_from, year_to))
+        if language:
+            parts.append(self._get("language", language))
+        if segment:
+            parts.append(self._get("segment", segment))
+        if genre:
+            parts.append(self._get("genre", genre))
+        if award_event:
+            parts.append(self._get("award", award_event, award_result or "won"))
+        if best_picture:
+            parts.append(self._get("best_picture"))
+
+        if not parts:
+            return None
+        packed = np.bitwise_and.reduce(parts) if len(parts) > 1 else parts[0]
+        return np.unpackbits(packed, count=self.size).astype(bool)
+
+    def for_query(self, filters: QueryFilters | None) -> np.ndarray | None:
+        if filters is None:
+            return None
+        return self.compile(
+            year_from=filters.year_from,
+            award_event=filters.award_event,
+            award_result=filters.award_result,
+        )
+
+
+# -------------------------
+# SERVING SINGLETON
+# -------------------------
+
+def load_filter_bitmaps(index_ids: np.ndarray) -> FilterBitmaps:
+    start = time.perf_counter()
+    bitmaps = FilterBitmaps.from_rows(index_ids, stream(BITMAP_QUERY))
+    logger.info(
+        "Loaded %d filter bitmaps over %d films in %.2fs (%.1f KB)",
+        len(bitmaps.bitmaps), bitmaps.size, time.perf_counter() - start, bitmaps.nbytes() / 1e3,
+    )
+    return bitmaps
+
+
+def get_filter_bitmaps() -> FilterBitmaps | None:
+    """
+    Bitmaps aligned with the serving vector index.
+
+    Built with the index, in the same snapshot generation (the refresher
+    rebuilds them when the graph data version moves), so they never need
+    realigning on the request path. Callers that also search should take
+    both from one get_vector_index() result: index.bitmaps.
+    Returns None for the "neo4j" backend, where filtering stays in Cypher.
+    """
+    from app.recsys.vector_index import get_vector_index
+
+    index = get_vector_index()
+    return index.bitmaps if index is not None else None
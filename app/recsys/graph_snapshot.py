@@ -0,0 +1,191 @@
+"""
+In-memory graph snapshot for graph-neighborhood recall.
+
+One bulk export at startup (app.main lifespan) turns the movie ↔ person (ACTED_IN, DIRECTED)
+and movie ↔ keyword (HAS_KEYWORD) edges into CSR index arrays:
+
+    indptr[i] : indptr[i + 1]  → slice of `indices` holding row i's neighbors
+
+stored in both directions (movie → entity and entity → movie).
+
+2-hop expansion from seed films is then two gathers and two np.bincount
+scatters per edge kind: seeds → shared people / keywords → other films.
+Entities are weighted by 1 / log2(1 + degree), so a prolific actor or a
+generic keyword links films more weakly than a rare one.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from app.config import GRAPH_EXPANSION_ENABLED, GRAPH_KEYWORD_WEIGHT, GRAPH_PERSON_WEIGHT
+from app.db.data_version import graph_version
+from app.db.neo4j import stream
+from app.recsys.snapshots import SnapshotManager
+from app.recsys.vector_index import top_k
+
+logger = logging.getLogger(__name__)
+
+EXPORT_QUERY = """
+MATCH (p:Person)-[:ACTED_IN|DIRECTED]->(m:Movie)
+RETURN m.tmdb_id AS tmdb_id, "person" AS kind, elementId(p) AS entity
+UNION ALL
+MATCH (m:Movie)-[:HAS_KEYWORD]->(k:Keyword)
+RETURN m.tmdb_id AS tmdb_id, "keyword" AS kind, elementId(k) AS entity
+"""
+
+KINDS = ("person", "keyword")
+
+
+class CSR:
+    """Adjacency of `rows` sources as (indptr, indices)."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, src: np.ndarray, dst: np.ndarray, rows: int) -> "CSR":
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=rows), out=indptr[1:])
+        return cls(indptr, dst[order].astype(np.int32))
+
+    def degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def gather(self, rows: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Neighbors of `rows`, each carrying the weight of the row it came from."""
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        # Flat positions of every row's slice, without a Python loop
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return self.indices[offsets], np.repeat(weights, counts)
+
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes
+
+
+class GraphSnapshot:
+    def __init__(self, movie_ids: np.ndarray, forward: dict[str, CSR], backward: dict[str, CSR]):
+        self.movie_ids = movie_ids
+        self.forward = forward
+        self.backward = backward
+        # Hub dampening: an entity shared by many films says little about any pair
+        self.entity_weights = {
+            kind: (1.0 / np.log2(1 + np.maximum(csr.degree(), 1))).astype(np.float32) for kind, csr in backward.items()
+        }
+
+    @classmethod
+    def from_edges(cls, edges) -> "GraphSnapshot":
+        """Build from EXPORT_QUERY records (tmdb_id, kind, entity)."""
+        tmdb_ids = {kind: [] for kind in KINDS}
+        entities = {kind: {} for kind in KINDS}
+        entity_rows = {kind: [] for kind in KINDS}
+        for edge in edges:
+            kind = edge["kind"]
+            interned = entities[kind]
+            tmdb_ids[kind].append(edge["tmdb_id"])
+            entity_rows[kind].append(interned.setdefault(edge["entity"], len(interned)))
+
+        movie_ids = np.unique(np.concatenate([np.asarray(tmdb_ids[k], dtype=np.int64) for k in KINDS]))
+        forward, backward = {}, {}
+        for kind in KINDS:
+            movies = np.searchsorted(movie_ids, np.asarray(tmdb_ids[kind], dtype=np.int64))
+            others = np.asarray(entity_rows[kind], dtype=np.int64)
+            # An actor who also directed the film is one link, not two
+            pairs = np.unique(np.stack([movies, others], axis=1), axis=0) if movies.size else np.empty((0, 2), np.int64)
+            forward[kind] = CSR.from_edges(pairs[:, 0], pairs[:, 1], movie_ids.shape[0])
+            backward[kind] = CSR.from_edges(pairs[:, 1], pairs[:, 0], len(entities[kind]))
+        return cls(movie_ids, forward, backward)
+
+    @classmethod
+    def load(cls) -> "GraphSnapshot":
+        start = time.perf_counter()
+        snapshot = cls.from_edges(stream(EXPORT_QUERY))
+        logger.info(
+            "Graph snapshot: %d films, %d people, %d keywords (%.1f MB) in %.2fs",
+            len(snapshot),
+            snapshot.backward["person"].indptr.shape[0] - 1,
+            snapshot.backward["keyword"].indptr.shape[0] - 1,
+            snapshot.nbytes() / 1e6,
+            time.perf_counter() - start,
+        )
+        return snapshot
+
+    def __len__(self) -> int:
+        return self.movie_ids.shape[0]
+
+    def nbytes(self) -> int:
+        return self.movie_ids.nbytes + sum(csr.nbytes() for csr in (*self.forward.values(), *self.backward.values()))
+
+    def rows_of(self, tmdb_ids) -> np.ndarray:
+        """Snapshot rows of the given films; films without edges are dropped."""
+        ids = np.asarray(tmdb_ids, dtype=np.int64)
+        at = np.minimum(np.searchsorted(self.movie_ids, ids), len(self) - 1)
+        return at[self.movie_ids[at] == ids]
+
+    def expand(
+        self,
+        seed_ids,
+        seed_weights=None,
+        k: int = 30,
+        exclude_ids=(),
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        2-hop neighbors of the seed films, top k by connection weight.
+
+        score(film) = Σ_kind  kind_weight · Σ_shared entity  entity_weight · seed_weight
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        seed_ids = np.asarray(seed_ids, dtype=np.int64)
+        weights = np.ones(seed_ids.shape[0], dtype=np.float32) if seed_weights is None else np.asarray(seed_weights, dtype=np.float32)
+        present = np.isin(seed_ids, self.movie_ids)
+        rows, weights = self.rows_of(seed_ids), weights[present]
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        for kind, kind_weight in (("person", GRAPH_PERSON_WEIGHT), ("keyword", GRAPH_KEYWORD_WEIGHT)):
+            if not kind_weight:
+                continue
+            # Hop 1: seeds → entities, summing the weight of every seed that links to one
+            entities, w = self.forward[kind].gather(rows, weights)
+            if not entities.size:
+                continue
+            entity_scores = np.bincount(entities, weights=w, minlength=self.backward[kind].indptr.shape[0] - 1)
+            active = np.flatnonzero(entity_scores)
+            # Hop 2: entities → films
+            films, w = self.backward[kind].gather(active, entity_scores[active] * self.entity_weights[kind][active])
+            scores += kind_weight * np.bincount(films, weights=w, minlength=len(self)).astype(np.float32)
+
+        scores[rows] = 0
+        scores[self.rows_of(list(exclude_ids))] = 0
+        hits = np.flatnonzero(scores > 0)
+        best = hits[top_k(scores[hits], k)]
+        return self.movie_ids[best], scores[best]
+
+
+# -------------------------
+# SERVING SINGLETON
+# -------------------------
+
+def _load_snapshot() -> GraphSnapshot | None:
+    if not GRAPH_EXPANSION_ENABLED:
+        return None
+    try:
+        return GraphSnapshot.load()
+    except Exception as exc:
+        logger.warning("Graph expansion disabled: snapshot export failed (%s)", exc)
+        return None
+
+
+_snapshot = SnapshotManager("graph", _load_snapshot, version=graph_version)
+
+
+def get_graph_snapshot() -> GraphSnapshot | None:
+    """The snapshot, exported at startup and after graph changes; None when disabled or the export failed."""
+    return _snapshot.get()
@@ -0,0 +1,281 @@
+"""
+IVF (inverted file) approximate nearest-neighbor index in NumPy.
+
+- Spherical k-means splits the catalog into `nlist` cells
+- Vectors are stored contiguously cell by cell, so probing a cell is
+  one slice and one matrix-vector product
+- search() probes the `nprobe` cells closest to the query
+- Filters (a boolean row mask) are applied inside each probed cell;
+  when too few rows pass, more cells are probed until k are found
+- New films go to a delta segment (searched with the same probes)
+  until the next save() compacts them into their cells
+
+On disk the index is a directory of .npy files loaded with mmap_mode="r",
+so every worker process shares one copy through the OS page cache.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from app.recsys.vector_index import SCORE_BLOCK_ROWS, top_k
+from app.recsys.vectors import normalize_rows
+
+FILES = ("centroids", "offsets", "ids", "vectors")
+
+
+# -------------------------
+# K-MEANS
+# -------------------------
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (max cosine) per row, in blocks to bound memory."""
+    out = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], SCORE_BLOCK_ROWS):
+        block = vectors[start:start + SCORE_BLOCK_ROWS]
+        out[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    nlist: int,
+    iterations: int = 10,
+    sample_size: int = 100_000,
+    seed: int = 0,
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+
+    sample = vectors
+    if n > sample_size:
+        sample = vectors[np.sort(rng.choice(n, size=sample_size, replace=False))]
+
+    # More cells than rows would leave some permanently empty (and rng.choice raise)
+    nlist = max(1, min(nlist, sample.shape[0]))
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = _assign(sample, centroids)
+        counts = np.bincount(assignment, minlength=nlist)
+
+        # Per-cell sums with one sort + reduceat (np.add.at is far slower)
+        order = np.argsort(assignment, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        occupied = counts > 0
+        sums[occupied] = np.add.reduceat(sample[order], starts[occupied], axis=0)
+
+        # Re-seed empty cells with random sample rows
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = sample[rng.choice(sample.shape[0], size=empty.size, replace=False)]
+
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+def default_nlist(n: int) -> int:
+    return max(1, min(n, int(4 * np.sqrt(n))))
+
+
+# -------------------------
+# INDEX
+# -------------------------
+
+class IVFIndex:
+    name = "ivf"
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        nprobe: int = 16,
+    ):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.main_ids = ids
+        self.vectors = vectors
+        self.nprobe = nprobe
+
+        dims = centroids.shape[1]
+        self.delta_ids = np.empty(0, dtype=np.int64)
+        self.delta_vectors = np.empty((0, dims), dtype=np.float32)
+        self.delta_lists = np.empty(0, dtype=np.int32)
+        self._ids_cache = None
+
+    @classmethod
+    def build(cls, ids: np.ndarray, matrix: np.ndarray, nlist: int | None = None, nprobe: int = 16, seed: int = 0) -> "IVFIndex":
+        nlist = min(nlist or default_nlist(matrix.shape[0]), matrix.shape[0])
+        centroids = spherical_kmeans(matrix, nlist, seed=seed)
+        nlist = centroids.shape[0]
+        assignment = _assign(matrix, centroids)
+
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=nlist)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(centroids, offsets, ids[order], np.ascontiguousarray(matrix[order]), nprobe=nprobe)
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Row order for masks: cell-ordered main rows, then the delta segment."""
+        if self._ids_cache is None:
+            self._ids_cache = np.concatenate([self.main_ids, self.delta_ids])
+        return self._ids_cache
+
+    def __len__(self) -> int:
+        return self.main_ids.shape[0] + self.delta_ids.shape[0]
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.centroids, self.offsets, self.main_ids, self.vectors, self.delta_ids, self.delta_vectors))
+
+    # -------------------------
+    # INCREMENTAL INSERTS
+    # -------------------------
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Insert new films without re-clustering; they join the delta segment."""
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        self.delta_ids = np.concatenate([self.delta_ids, np.asarray(ids, dtype=np.int64)])
+        self.delta_vectors = np.concatenate([self.delta_vectors, vectors])
+        self.delta_lists = np.concatenate([self.delta_lists, _assign(vectors, self.centroids)])
+        self._ids_cache = None
+
+    def remove(self, ids: np.ndarray) -> "IVFIndex":
+        """Drop films (deleted, or about to be re-added with a new vector); same centroids."""
+        index = self.compact()
+        keep = ~np.isin(index.main_ids, ids)
+        if keep.all():
+            return index
+
+        cells = np.repeat(np.arange(index.nlist, dtype=np.int32), np.diff(index.offsets))[keep]
+        offsets = np.zeros(index.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=index.nlist), out=offsets[1:])
+        return IVFIndex(index.centroids, offsets, index.main_ids[keep], np.asarray(index.vectors)[keep], nprobe=index.nprobe)
+
+    def compact(self) -> "IVFIndex":
+        """Fold the delta segment into the cells (same centroids)."""
+        if not self.delta_ids.size:
+            return self
+
+        cell_of_main = np.repeat(np.arange(self.nlist, dtype=np.int32), np.diff(self.offsets))
+        cells = np.concatenate([cell_of_main, self.delta_lists])
+        order = np.argsort(cells, kind="stable")
+
+        offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.nlist), out=offsets[1:])
+        vectors = np.concatenate([np.asarray(self.vectors), self.delta_vectors])[order]
+
+        return IVFIndex(self.centroids, offsets, self.ids[order], vectors, nprobe=self.nprobe)
+
+    # -------------------------
+    # SEARCH
+    # -------------------------
+
+    def _scan(self, query: np.ndarray, cells: np.ndarray, mask: np.ndarray | None, rows_out: list, scores_out: list) -> int:
+        found = 0
+        for cell in cells:
+            start, stop = int(self.offsets[cell]), int(self.offsets[cell + 1])
+            if start == stop:
+                continue
+
+            if mask is None:
+                rows = np.arange(start, stop)
+                scores = self.vectors[start:stop] @ query
+            else:
+                rows = start + np.flatnonzero(mask[start:stop])
+                if not rows.size:
+                    continue
+                scores = self.vectors[rows] @ query
+
+            rows_out.append(rows)
+            scores_out.append(scores)
+            found += rows.size
+
+        if self.delta_ids.size:
+            in_cells = np.isin(self.delta_lists, cells)
+            if mask is not None:
+                in_cells &= mask[self.main_ids.shape[0]:]
+            delta_rows = np.flatnonzero(in_cells)
+            if delta_rows.size:
+                rows_out.append(self.main_ids.shape[0] + delta_rows)
+                scores_out.append(self.delta_vectors[delta_rows] @ query)
+                found += delta_rows.size
+
+        return found
+
+    def search(self, query: np.ndarray, k: int, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        cell_order = np.argsort(-(self.centroids @ query))
+
+        rows_out, scores_out = [], []
+        probed, nprobe, found = 0, min(self.nprobe, self.nlist), 0
+
+        # Selective filters: keep widening the probe until k rows pass
+        while True:
+            found += self._scan(query, cell_order[probed:nprobe], mask, rows_out, scores_out)
+            probed = nprobe
+            if found >= k or probed >= self.nlist:
+                break
+            nprobe = min(nprobe * 2, self.nlist)
+
+        if not rows_out:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows = np.concatenate(rows_out)
+        scores = np.concatenate(scores_out)
+        best = top_k(scores, k)
+        return self.ids[rows[best]], scores[best]
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+
+    def save(self, path: str) -> None:
+        index = self.compact()
+        os.makedirs(path, exist_ok=True)
+        for name, array in zip(FILES, (index.centroids, index.offsets, index.main_ids, index.vectors)):
+            # Write-then-rename so readers never see a half-written file
+            tmp = os.path.join(path, f".{name}.npy.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, np.asarray(array))
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+
+        # meta.json last, also renamed into place: its version is what the
+        # hot-reload poll watches, so it only moves once every array is in place
+        tmp = os.path.join(path, ".meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "nlist": index.nlist,
+                    "count": len(index),
+                    "dims": int(index.centroids.shape[1]),
+                    "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                f,
+                indent=2,
+            )
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = 16, mmap: bool = True) -> "IVFIndex":
+        mode = "r" if mmap else None
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in FILES]
+        centroids, offsets, ids, vectors = arrays
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        # Loaded mid-save, the arrays can belong to different builds
+        if not (offsets.shape[0] == centroids.shape[0] + 1 and int(offsets[-1]) == ids.shape[0] == vectors.shape[0] == meta["count"]):
+            raise ValueError(f"IVF index {path} is incomplete or being rewritten")
+        # Small arrays are read fully; the vector block stays memory-mapped
+        return cls(np.asarray(centroids), np.asarray(offsets), np.asarray(ids), vectors, nprobe=nprobe)
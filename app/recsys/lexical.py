@@ -0,0 +1,271 @@
+"""
+In-process lexical retrieval over titles, people, keywords and genres.
+
+Built from data/normalized/films_core.parquet (scripts/export_films_core.py):
+- Names are normalized accent- and case-insensitively ("Almodóvar" ==
+  "almodovar"); people are also indexed by surname
+- The raw request is scanned (not the parsed semantic query, which has
+  lost the stopwords and years titles are made of) for the longest known
+  names (n-grams); matched names give a ranked list of films, unmatched
+  words are the residual. Words the query parser turns into filters
+  (years, "recent", "oscar winners") are neither
+- Queries made only of unambiguous titles and full person names ("movies
+  like Parasite", "Pedro Almodóvar dramas") are entity-only: the
+  recommender skips the embedding API for them and seeds on those films.
+  A one-word name counts only after "like" ("heist thriller" is a genre
+  query, "movies like Heist" is not); keyword and bare-surname matches
+  ("young love", "dystopia") never do and only boost the fused score
+
+Ranks are fused into the recommender score as a reciprocal-rank boost.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.config import LEXICAL_ENABLED, LEXICAL_INDEX_PATH
+from app.recsys.snapshots import SnapshotManager, file_version
+from app.recsys.vector_index import top_k
+
+logger = logging.getLogger(__name__)
+
+KIND_WEIGHTS = {"title": 3.0, "person": 2.0, "surname": 2.0, "keyword": 1.0}
+# Matches precise enough to stand in for the query embedding
+ENTITY_KINDS = {"title", "person"}
+MAX_NGRAM = 6
+MIN_SURNAME = 4
+MAX_SEEDS = 10
+
+# Words that carry no entity information (English + Spanish)
+STOPWORDS = set(
+    """
+    a an the and or of to for by from with in on about like similar movie movies film films
+    show me find recommend some any starring directed director directors actor actors
+    de del la el las los lo un una y o con en por para sobre como tipo pelicula peliculas
+    parecida parecidas parecido parecidos similares dirigida dirigidas protagonizada
+    """.split()
+)
+SIMILAR_WORDS = {"like", "similar", "como", "tipo", "parecida", "parecidas", "parecido", "parecidos", "similares"}
+# Words QueryUnderstandingService.parse turns into filters, plus years and decades
+FILTER_WORDS = set(
+    """
+    recent last years ago oscar oscars bafta baftas goya goyas
+    winner winners won nominee nominees nominated
+    """.split()
+)
+FILTER_TOKEN = re.compile(r"\d{4}s?|\d0s")
+
+
+def _is_filler(token: str) -> bool:
+    """Stopwords and filter words: never a name on their own, never residual."""
+    return token in STOPWORDS or token in FILTER_WORDS or bool(FILTER_TOKEN.fullmatch(token))
+
+
+def normalize_text(text: str) -> str:
+    """Casefold, strip accents, collapse punctuation to single spaces."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.split(r"[\W_]+", text.casefold())).strip()
+
+
+def _genre_forms(name: str) -> set[str]:
+    """'Comedy' → {'comedy', 'comedies'}; 'Drama' → {'drama', 'dramas'}."""
+    base = normalize_text(name)
+    forms = {base}
+    if base.endswith("y"):
+        forms.add(base[:-1] + "ies")
+    elif not base.endswith("s"):
+        forms.add(base + "s")
+    return forms
+
+
+@dataclass
+class LexicalMatch:
+    tmdb_ids: np.ndarray
+    scores: np.ndarray
+    entities: list[tuple[str, str]] = field(default_factory=list)
+    residual: list[str] = field(default_factory=list)
+    seed_ids: list[int] = field(default_factory=list)
+    exclude_ids: list[int] = field(default_factory=list)
+    similar_intent: bool = False
+
+    @property
+    def entity_only(self) -> bool:
+        """
+        Every content word is a genre or an unambiguous title / full person
+        name, and not only genres. A one-word name ("Heist", "Love") is also
+        a common word, so it only counts with an explicit "like" intent.
+        """
+        names = {name for kind, name in self.entities if kind != "genre"}
+        precise = {
+            name for kind, name in self.entities
+            if kind in ENTITY_KINDS and (" " in name or self.similar_intent)
+        }
+        return not self.residual and bool(names) and names <= precise
+
+    def summary(self) -> dict:
+        return {
+            "entities": [f"{kind}:{name}" for kind, name in self.entities],
+            "residual": self.residual,
+            "entity_only": self.entity_only,
+            "hits": int(self.tmdb_ids.shape[0]),
+        }
+
+
+class LexicalIndex:
+    def __init__(self, ids: np.ndarray, names: dict[str, dict[str, np.ndarray]]):
+        self.ids = ids
+        self.names = names
+
+    @classmethod
+    def from_films(cls, films) -> "LexicalIndex":
+        """Build from films_core records (title, original_title, directors, actors, keywords, genres)."""
+        postings = defaultdict(lambda: defaultdict(set))
+        ids = []
+
+        for row, film in enumerate(films):
+            ids.append(int(film["tmdb_id"]))
+            for key in ("title", "original_title"):
+                if film.get(key):
+                    postings[normalize_text(film[key])]["title"].add(row)
+
+            for key in ("directors", "actors"):
+                for person in film.get(key) or []:
+                    name = normalize_text(person)
+                    postings[name]["person"].add(row)
+                    surname = name.rsplit(" ", 1)[-1]
+                    if surname != name and len(surname) >= MIN_SURNAME:
+                        postings[surname]["surname"].add(row)
+
+            for keyword in film.get("keywords") or []:
+                postings[normalize_text(keyword)]["keyword"].add(row)
+            for genre in film.get("genres") or []:
+                for form in _genre_forms(genre):
+                    postings[form]["genre"].add(row)
+
+        names = {
+            name: {kind: np.fromiter(sorted(rows), dtype=np.int64) for kind, rows in kinds.items()}
+            for name, kinds in postings.items()
+            if name
+        }
+        return cls(np.asarray(ids, dtype=np.int64), names)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "LexicalIndex":
+        import pyarrow.parquet as pq
+
+        columns = ["tmdb_id", "title", "original_title", "directors", "actors", "keywords", "genres"]
+        table = pq.read_table(path)
+        films = table.select([c for c in columns if c in table.column_names]).to_pylist()
+        return cls.from_films(films)
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def nbytes(self) -> int:
+        """Bytes of the posting arrays (dict overhead not counted)."""
+        return self.ids.nbytes + sum(rows.nbytes for kinds in self.names.values() for rows in kinds.values())
+
+    def _scan(self, tokens: list[str]) -> tuple[list[tuple[str, str]], list[str]]:
+        """Greedy longest-name match over the query tokens."""
+        entities, residual = [], []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(MAX_NGRAM, len(tokens) - i), 0, -1):
+                phrase = " ".join(tokens[i:i + n])
+                # A lone stopword is never a name ("up", "her" would be)
+                if phrase in self.names and not (n == 1 and _is_filler(phrase)):
+                    entities.extend((kind, phrase) for kind in self.names[phrase])
+                    i += n
+                    break
+            else:
+                if not _is_filler(tokens[i]):
+                    residual.append(tokens[i])
+                i += 1
+        return entities, residual
+
+    def search(self, query: str, k: int = 20) -> LexicalMatch:
+        """Match the raw request text (normalized like the indexed names)."""
+        tokens = normalize_text(query).split()
+        entities, residual = self._scan(tokens)
+        similar_intent = any(t in SIMILAR_WORDS for t in tokens)
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        genre_mask = None
+        titles, people = [], []
+        for kind, name in entities:
+            rows = self.names[name][kind]
+            if kind == "genre":
+                # Genres narrow the other matches; on their own they are no lexical signal
+                if genre_mask is None:
+                    genre_mask = np.zeros(len(self), dtype=bool)
+                genre_mask[rows] = True
+                continue
+            if kind == "title":
+                titles.extend(rows.tolist())
+            elif kind == "person":
+                people.extend(rows.tolist())
+            # Names shared by many films weigh less per film
+            scores[rows] += KIND_WEIGHTS[kind] / np.log2(1 + rows.shape[0])
+
+        if genre_mask is not None:
+            scores[~genre_mask] = 0
+
+        seeds = titles[:MAX_SEEDS]
+        excluded = titles if similar_intent else []
+        if excluded:
+            # "movies like Parasite": Parasite seeds the search but is not a result
+            scores[excluded] = 0
+
+        hits = np.flatnonzero(scores > 0)
+        best = hits[top_k(scores[hits], k)]
+        if not seeds and people:
+            # Films of the named people, best fused score first; keyword and
+            # surname hits never seed
+            people = np.unique(np.asarray(people, dtype=np.int64))
+            people = people[scores[people] > 0]
+            seeds = people[top_k(scores[people], MAX_SEEDS)].tolist()
+
+        return LexicalMatch(
+            tmdb_ids=self.ids[best],
+            scores=scores[best],
+            entities=entities,
+            residual=residual,
+            seed_ids=[int(self.ids[r]) for r in seeds],
+            exclude_ids=[int(self.ids[r]) for r in excluded],
+            similar_intent=similar_intent,
+        )
+
+
+# -------------------------
+# SERVING SINGLETON
+# -------------------------
+
+def _load_lexical() -> LexicalIndex | None:
+    if not LEXICAL_ENABLED or not os.path.exists(LEXICAL_INDEX_PATH):
+        return None
+    try:
+        index = LexicalIndex.load(LEXICAL_INDEX_PATH)
+    except Exception as exc:
+        logger.warning("Lexical index disabled: cannot read %s (%s)", LEXICAL_INDEX_PATH, exc)
+        return None
+    logger.info("Lexical index: %d films, %d names", len(index), len(index.names))
+    return index
+
+
+_lexical = SnapshotManager("lexical", _load_lexical, version=lambda: file_version(LEXICAL_INDEX_PATH))
+
+
+def get_lexical_index() -> LexicalIndex | None:
+    """
+    The index over LEXICAL_INDEX_PATH, built on first use and rebuilt
+    when the file is re-exported.
+
+    None when disabled, missing or unreadable: retrieval is then vector-only.
+    """
+    return _lexical.get()
@@ -0,0 +1,64 @@
+"""
+Two-stage Matryoshka retrieval.
+
+Stage 1 scores a truncated, renormalized prefix of every embedding
+(256 or 512 of 3072 dims), stage 2 rescores the shortlist with the full
+vectors. Stage 1 touches 6-12x fewer bytes than exact search.
+
+The prefix matrix is written into the embedding artifact by
+write_artifact(codes=...) and memory-mapped from there when present.
+"""
+
+import numpy as np
+
+from app.recsys.vector_index import candidate_rows, top_k
+from app.recsys.vectors import normalize_query, truncate_rows
+
+
+def encode(matrix: np.ndarray, prefix_dim: int) -> dict[str, np.ndarray]:
+    """The stage 1 array: "prefix", the renormalized first prefix_dim dims."""
+    if prefix_dim >= matrix.shape[1]:
+        raise ValueError(f"prefix_dim {prefix_dim} must be smaller than the embedding width {matrix.shape[1]}")
+    return {"prefix": truncate_rows(matrix, prefix_dim)}
+
+
+class MatryoshkaIndex:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        matrix: np.ndarray,
+        prefix_dim: int = 256,
+        rescore_depth: int = 300,
+        codes: dict[str, np.ndarray] | None = None,
+    ):
+        if prefix_dim >= matrix.shape[1]:
+            raise ValueError(f"prefix_dim {prefix_dim} must be smaller than the embedding width {matrix.shape[1]}")
+
+        self.ids = ids
+        self.matrix = matrix
+        self.prefix_dim = prefix_dim
+        self.rescore_depth = rescore_depth
+        self.name = f"matryoshka-{prefix_dim}"
+        self.prefix = (codes if codes is not None else encode(matrix, prefix_dim))["prefix"]
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def nbytes(self) -> int:
+        """Bytes of the prefix index (the full rescoring matrix is not counted)."""
+        return self.prefix.nbytes + self.ids.nbytes
+
+    def search(self, query: np.ndarray, k: int, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        rows = candidate_rows(len(self), mask)
+        q_prefix = normalize_query(query[: self.prefix_dim])
+
+        coarse = self.prefix @ q_prefix if rows is None else self.prefix[rows] @ q_prefix
+        shortlist = top_k(coarse, max(k, self.rescore_depth))
+        if rows is not None:
+            shortlist = rows[shortlist]
+
+        # Full-dimension rescoring of the shortlist
+        shortlist = np.sort(shortlist)
+        exact = self.matrix[shortlist] @ query
+        order = top_k(exact, k)
+        return self.ids[shortlist[order]], exact[order]
@@ -1,3 +1,7 @@
+from app.config import GRAPH_K, GRAPH_SEEDS, MMR_ENABLED, MMR_LAMBDA, MMR_POOL
+from app.metrics import span
+from app.recsys.diversity import diversify
+from app.recsys.graph_snapshot import get_graph_snapshot
 from app.recsys.query_embedding import embed_query
 from app.recsys.retrieve import retrieve_candidates
 from app.recsys.reason import rerank
@@ -8,6 +12,7 @@ def recommend(
     query: str,
     limit: int = 5,
     must_have_oscar: bool = False,
+    diversity: float | None = None,
 ):
     embedding = embed_query(query)
     
@@ -25,4 +30,39 @@ def recommend(
         max_year=max_year,
     )
 
-    return rerank(candidates, limit=limit)
+    # Graph-first recall: films sharing people / keywords with the top hits,
+    # expanded in memory, then filtered and scored like the vector hits
+    snapshot = get_graph_snapshot()
+    if snapshot is not None and candidates:
+        seeds = candidates[:GRAPH_SEEDS]
+        with span("graph_expand"):
+            graph_ids, _ = snapshot.expand(
+                [c["node"]["tmdb_id"] for c in seeds],
+                [c["score"] for c in seeds],
+                k=GRAPH_K,
+                exclude_ids=[c["node"]["tmdb_id"] for c in candidates],
+            )
+        if graph_ids.size:
+            candidates = candidates + retrieve_candidates(
+                embedding=embedding,
+                must_have_oscar=must_have_oscar,
+                min_year=min_year,
+                max_year=max_year,
+                tmdb_ids=graph_ids.tolist(),
+            )
+
+    if diversity is None and MMR_ENABLED:
+        diversity = MMR_LAMBDA
+    if diversity is None:
+        return rerank(candidates, limit=limit)
+
+    # Diversity: MMR picks `limit` out of the top of the reranked pool
+    ranked = rerank(candidates, limit=max(limit, MMR_POOL))
+    embeddings = {c["node"]["tmdb_id"]: c["node"].get("embedding") for c in candidates}
+    return diversify(
+        ranked,
+        [embeddings[r["tmdb_id"]] for r in ranked],
+        [r["score"] for r in ranked],
+        k=limit,
+        lambda_=diversity,
+    )
@@ -0,0 +1,120 @@
+"""
+Quantized embedding indexes with exact float32 rescoring.
+
+A first pass scores every (allowed) row on a compressed copy of the
+matrix, then the top `rescore_depth` rows are rescored exactly against
+the float32 matrix.
+
+Bytes per 3072-dim film:
+- float32 : 12288 (reference, only touched for the shortlist)
+- float16 :  6144
+- int8    :  3072 (per-dimension scale)
+- binary  :   384 (sign bits, Hamming distance)
+
+The compressed arrays are written into the embedding artifact by
+write_artifact(codes=...) and memory-mapped from there, so workers share
+them like the float32 matrix; without them each worker encodes its own.
+"""
+
+import numpy as np
+
+from app.recsys.vector_index import SCORE_BLOCK_ROWS, candidate_rows, top_k
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[x]
+
+
+def encode(matrix: np.ndarray, mode: str) -> dict[str, np.ndarray]:
+    """The compressed arrays of `mode`: "codes", plus "scale" for int8."""
+    if mode == "float16":
+        return {"codes": matrix.astype(np.float16)}
+    if mode == "int8":
+        # Per-dimension symmetric scale: each column uses the full int8 range
+        max_abs = np.abs(matrix).max(axis=0)
+        max_abs[max_abs == 0] = 1.0
+        scale = (max_abs / 127.0).astype(np.float32)
+        return {"codes": np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8), "scale": scale}
+    if mode == "binary":
+        return {"codes": np.packbits(matrix > 0, axis=1)}
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+class QuantizedIndex:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        matrix: np.ndarray,
+        mode: str = "int8",
+        rescore_depth: int = 300,
+        codes: dict[str, np.ndarray] | None = None,
+    ):
+        """`codes` are encode()'s arrays (e.g. memory-mapped from the artifact); encoded here when None."""
+        self.ids = ids
+        self.matrix = matrix
+        self.mode = mode
+        self.name = mode
+        self.rescore_depth = rescore_depth
+        self.dims = matrix.shape[1]
+
+        if codes is None:
+            codes = encode(matrix, mode)
+        elif mode not in ("float16", "int8", "binary"):
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.codes = codes["codes"]
+        if mode == "int8":
+            self.scale = np.asarray(codes["scale"])
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def nbytes(self) -> int:
+        """Bytes of the compressed index (the float32 rescoring matrix is not counted)."""
+        extra = self.scale.nbytes if self.mode == "int8" else 0
+        return self.codes.nbytes + self.ids.nbytes + extra
+
+    # -------------------------
+    # FIRST PASS
+    # -------------------------
+
+    def _coarse_block(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self.mode == "float16":
+            return codes.astype(np.float32) @ query
+        if self.mode == "int8":
+            return codes.astype(np.float32) @ (query * self.scale)
+        # binary: higher is better, so negate the Hamming distance
+        query_bits = np.packbits(query > 0)
+        distances = _popcount(np.bitwise_xor(codes, query_bits)).sum(axis=1, dtype=np.int32)
+        return (self.dims - 2 * distances).astype(np.float32)
+
+    def coarse_scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Approximate scores, computed in blocks to bound the float32 temporaries."""
+        n = len(self) if rows is None else rows.shape[0]
+        out = np.empty(n, dtype=np.float32)
+        for start in range(0, n, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, n)
+            block = self.codes[start:stop] if rows is None else self.codes[rows[start:stop]]
+            out[start:stop] = self._coarse_block(block, query)
+        return out
+
+    # -------------------------
+    # SEARCH
+    # -------------------------
+
+    def search(self, query: np.ndarray, k: int, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        rows = candidate_rows(len(self), mask)
+        coarse = self.coarse_scores(query, rows)
+
+        shortlist = top_k(coarse, max(k, self.rescore_depth))
+        if rows is not None:
+            shortlist = rows[shortlist]
+
+        # Exact float32 rescoring of the shortlist only (sorted rows read sequentially)
+        shortlist = np.sort(shortlist)
+        exact = self.matrix[shortlist] @ query
+        order = top_k(exact, k)
+        return self.ids[shortlist[order]], exact[order]
@@ -0,0 +1,131 @@
+"""
+In-process LRUs of per-query work.
+
+Query embeddings:
+- Keyed by the normalized semantic query (accent- and case-insensitive)
+- A hit skips the embedding API entirely
+- When the API is slow or down, nearest() reuses the embedding of the
+  cached query with the largest word overlap (Jaccard), if it is close enough
+
+Candidate lists (top-K vector hits as [{tmdb_id, score}]):
+- Keyed by normalized query + filters + K + the serving snapshots'
+  generations, so any hot reload retires every entry
+- A hit skips vector recall (in-process search or the queryNodes scan)
+"""
+
+import threading
+from collections import OrderedDict
+
+from app.config import CANDIDATE_CACHE_SIZE, QUERY_CACHE_MIN_OVERLAP, QUERY_CACHE_SIZE
+from app.metrics import record_cache
+from app.models.response import QueryFilters
+from app.recsys.lexical import STOPWORDS, normalize_text
+from app.recsys.snapshots import generations
+
+
+def _words(key: str) -> frozenset[str]:
+    return frozenset(w for w in key.split() if w not in STOPWORDS)
+
+
+class QueryEmbeddingCache:
+    def __init__(self, size: int = QUERY_CACHE_SIZE):
+        self.size = size
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, text: str) -> bool:
+        # No LRU bump or hit/miss metric: for warm-up, not request lookups
+        return normalize_text(text) in self._entries
+
+    def get(self, text: str) -> list[float] | None:
+        key = normalize_text(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+        record_cache("query_embedding", vector is not None)
+        return vector
+
+    def put(self, text: str, vector: list[float]) -> None:
+        if self.size <= 0:
+            return
+        key = normalize_text(text)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def nearest(self, text: str, min_overlap: float = QUERY_CACHE_MIN_OVERLAP) -> list[float] | None:
+        """Embedding of the cached query sharing the most words with `text` (None below min_overlap)."""
+        words = _words(normalize_text(text))
+        if not words:
+            return None
+        with self._lock:
+            entries = list(self._entries.items())
+
+        best, best_overlap = None, min_overlap
+        for key, vector in entries:
+            other = _words(key)
+            overlap = len(words & other) / len(words | other) if other else 0.0
+            if overlap >= best_overlap:
+                best, best_overlap = vector, overlap
+        return best
+
+
+class CandidateCache:
+    def __init__(self, size: int = CANDIDATE_CACHE_SIZE):
+        self.size = size
+        self._entries: OrderedDict[tuple, list[dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(text: str, filters: QueryFilters | None, k: int) -> tuple:
+        filter_key = tuple(filters.model_dump().values()) if filters is not None else None
+        return normalize_text(text), filter_key, k, generations()
+
+    def get(self, key: tuple) -> list[dict] | None:
+        with self._lock:
+            candidates = self._entries.get(key)
+            if candidates is not None:
+                self._entries.move_to_end(key)
+        record_cache("candidates", candidates is not None)
+        return candidates
+
+    def put(self, key: tuple, candidates: list[dict]) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = candidates
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+_cache = None
+_candidates = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryEmbeddingCache()
+    return _cache
+
+
+def get_candidate_cache() -> CandidateCache:
+    global _candidates
+    if _candidates is None:
+        with _cache_lock:
+            if _candidates is None:
+                _candidates = CandidateCache()
+    return _candidates
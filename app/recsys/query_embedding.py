@@ -1,9 +1,28 @@
-from openai import OpenAI
+import threading
 
-client = OpenAI()
+from app.config import EMBEDDING_DIMENSIONS
+from app.metrics import timed
 
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The OpenAI client, created (and the openai package imported) on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+
+                _client = OpenAI()
+    return _client
+
+
+@timed("embed")
 def embed_query(text: str) -> list[float]:
-    return client.embeddings.create(
+    return get_client().embeddings.create(
         model="text-embedding-3-large",
         input=text,
+        **({"dimensions": EMBEDDING_DIMENSIONS} if EMBEDDING_DIMENSIONS else {}),
     ).data[0].embedding
@@ -1,6 +1,20 @@
-from app.db.neo4j import run
+from app.db.neo4j import read
+from app.metrics import timed
 from collections import defaultdict
 
+def graph_boost(shared_actors: int, director_cluster: int, shared_genres: int) -> float:
+    """Score added for cast, director and genre connections (also used by app.recsys.similar)."""
+    score = 0.0
+    if shared_actors > 0:
+        score += min(shared_actors, 3) * 0.05
+    if director_cluster > 0:
+        score += 0.001
+    if shared_genres > 0:
+        score += min(shared_genres, 3) * 0.04
+    return score
+
+
+@timed("rerank")
 def rerank(candidates: list[dict], limit: int = 5):
     if not candidates:
         return []
@@ -44,29 +58,26 @@ def rerank(candidates: list[dict], limit: int = 5):
         coalesce(m.popularity, 0) AS popularity
     """
 
-    rows = run(cypher, {"movie_ids": movie_ids})
+    rows = read(cypher, {"movie_ids": movie_ids})
 
     # Build lookup
     boost_map = {}
     explanation_map = defaultdict(list)
 
     for r in rows:
-        score = 0.0
+        score = graph_boost(r["shared_actors"], r["director_cluster"], r["shared_genres"])
 
         if r["shared_actors"] > 0:
-            score += min(r["shared_actors"], 3) * 0.05
             explanation_map[r["id"]].append(
                 "Shares cast connections with other closely related results"
             )
 
         if r["director_cluster"] > 0:
-            score += 0.001
             explanation_map[r["id"]].append(
                 "Directed by the same filmmaker as other strong matches"
             )
 
         if r["shared_genres"] > 0:
-            score += min(r["shared_genres"], 3) * 0.04
             explanation_map[r["id"]].append(
                 "Part of a tightly connected genre cluster"
             )
@@ -85,6 +96,7 @@ def rerank(candidates: list[dict], limit: int = 5):
         final_score = c["score"] + boost_map.get(tmdb_id, 0.0)
 
         ranked.append({
+            "tmdb_id": tmdb_id,
             "title": m["title"],
             "score": final_score,
             "explanation": explanation_map.get(tmdb_id, [])[:2]  # cap explanations
@@ -1,5 +1,114 @@
-from app.db.neo4j import run
+from app.db.neo4j import read
+from app.metrics import span, timed
+from app.recsys.vector_index import get_vector_index
+from app.recsys.vectors import normalize_query
 
+RECALL_QUERY = """
+CALL db.index.vector.queryNodes("movie_embedding_index", $k, $embedding)
+YIELD node, score
+RETURN node.tmdb_id AS tmdb_id, score
+"""
+
+
+def vector_candidates(embedding: list[float], k: int, mask=None, index=None) -> list[dict]:
+    """
+    The top-k vector hits alone, as [{tmdb_id, score}] on the queryNodes
+    scale: searched in-process (pre-filtered by `mask`), or a standalone
+    queryNodes call for the neo4j backend (unfiltered, like inline recall).
+
+    `index` is the one `mask` was compiled against (default: the serving index).
+    """
+    index = index if index is not None else get_vector_index()
+    if index is None:
+        return read(RECALL_QUERY, {"k": k, "embedding": embedding})
+    with span("vector_search"):
+        ids, scores = index.search(normalize_query(embedding), k, mask)
+    return [{"tmdb_id": int(i), "score": (1.0 + float(s)) / 2} for i, s in zip(ids, scores)]
+
+
+def candidate_source(
+    embedding: list[float],
+    k: int,
+    score_alias: str = "score",
+    mask=None,
+    lexical_ids: list[int] | None = None,
+    candidates: list[dict] | None = None,
+    index=None,
+) -> tuple[str, dict]:
+    """
+    Opening Cypher clause that yields `node` and `<score_alias>` for the
+    top-k vector candidates, plus its parameters.
+
+    - VECTOR_BACKEND=neo4j → db.index.vector.queryNodes
+    - in-process backends  → search here, then UNWIND the (tmdb_id, score)
+      pairs and MATCH them by the unique tmdb_id constraint
+
+    Scores are on the queryNodes scale for cosine indexes, (1 + cos) / 2.
+
+    `mask` (from app.recsys.filters) restricts in-process search to films
+    that pass the filters; the neo4j backend ignores it. Pass the `index`
+    whose bitmaps compiled it, so a reload in between cannot misalign rows.
+
+    `lexical_ids` (from app.recsys.lexical) are added to the pool with
+    their similarity computed in Cypher, so exact title / name matches
+    are ranked even when the vector search missed them.
+
+    `candidates` (from vector_candidates, e.g. cached) replace the search:
+    with any backend they are MATCHed by tmdb_id.
+    """
+    alias = "score" if lexical_ids else score_alias
+    index = index if index is not None else get_vector_index()
+    if candidates is None and index is not None:
+        candidates = vector_candidates(embedding, k, mask, index)
+    if candidates is None:
+        cypher = f"""
+    CALL db.index.vector.queryNodes(
+      "movie_embedding_index",
+      $k,
+      $embedding
+    )
+    YIELD node, score AS {alias}
+    """
+        params = {"k": k, "embedding": embedding}
+    else:
+        cypher = f"""
+    UNWIND $candidates AS candidate
+    MATCH (node:Movie {{tmdb_id: candidate.tmdb_id}})
+    WITH node, candidate.score AS {alias}
+    """
+        params = {"candidates": candidates}
+
+    if not lexical_ids:
+        return cypher, params
+
+    cypher = f"""
+    CALL {{
+    {cypher}
+      RETURN node, score
+      UNION
+      MATCH (node:Movie) WHERE node.tmdb_id IN $lexical_ids
+      RETURN node, coalesce(vector.similarity.cosine(node.embedding, $embedding), 0.0) AS score
+    }}
+    WITH node, max(score) AS {score_alias}
+    """
+    return cypher, {**params, "embedding": embedding, "lexical_ids": [int(i) for i in lexical_ids]}
+
+
+def id_source(embedding: list[float], tmdb_ids: list[int], score_alias: str = "score") -> tuple[str, dict]:
+    """
+    Opening Cypher clause for a fixed set of films (e.g. graph expansion),
+    scored by cosine to `embedding` on the queryNodes scale.
+
+    Only tmdb_id index lookups: no traversal, no vector index.
+    """
+    cypher = f"""
+    MATCH (node:Movie) WHERE node.tmdb_id IN $source_ids
+    WITH node, coalesce(vector.similarity.cosine(node.embedding, $embedding), 0.0) AS {score_alias}
+    """
+    return cypher, {"embedding": embedding, "source_ids": [int(i) for i in tmdb_ids]}
+
+
+@timed("retrieve")
 def retrieve_candidates(
     embedding: list[float],
     limit: int = 50,
@@ -8,15 +117,30 @@ def retrieve_candidates(
     language: str | None = None,
     min_year: int | None = None,
     max_year: int | None = None,
+    tmdb_ids: list[int] | None = None,
 ):
-    cypher = """
-    CALL db.index.vector.queryNodes(
-      "movie_embedding_index",
-      $k,
-      $embedding
-    )
-    YIELD node, score
-    
+    """
+    Filtered candidates as {node, score}, best first.
+
+    With `tmdb_ids`, the candidates are those films (filtered and scored
+    the same way) instead of the top `limit` vector hits.
+    """
+    if tmdb_ids is not None:
+        source, params = id_source(embedding, tmdb_ids)
+    else:
+        mask = None
+        index = get_vector_index()
+        if index is not None:
+            mask = index.bitmaps.compile(
+                year_from=min_year,
+                year_to=max_year,
+                language=language,
+                genre=genre,
+                best_picture=must_have_oscar,
+            )
+        source, params = candidate_source(embedding, limit, mask=mask, index=index)
+
+    cypher = source + """
     WITH node, score,
          CASE
            WHEN node.release_date IS NOT NULL AND size(node.release_date) >= 4
@@ -27,12 +151,8 @@ def retrieve_candidates(
     WHERE 1 = 1
     """
 
-    params = {
-        "embedding": embedding,
-        "k": limit,
-        "min_year": min_year,
-        "max_year": max_year,
-    }
+    params["min_year"] = min_year
+    params["max_year"] = max_year
 
     if must_have_oscar:
         cypher += """
@@ -64,4 +184,4 @@ def retrieve_candidates(
     ORDER BY score DESC
     """
 
-    return run(cypher, params)
+    return read(cypher, params)
@@ -0,0 +1,362 @@
+"""
+Precomputed "more like this" neighbors.
+
+Offline (scripts/build_similar.py):
+- Blocked matrix multiplication over the embedding matrix gives each
+  film's top cosine candidates, block by block across a process pool
+- Candidates are blended with the cast / director / genre signals the
+  reranker uses (app.recsys.reason.graph_boost) and cut to the top K
+- The result is a compact neighbor array (.npz) plus SIMILAR_TO
+  relationships carrying the blended score. The .npz also holds each
+  film's display fields and a fingerprint of its vector, for incremental
+  rebuilds
+
+Online, SimilarIndex answers a film's neighbors and their display fields
+with a dict lookup, without touching Neo4j.
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.config import SIMILAR_K, SIMILAR_PATH
+from app.db.neo4j import read, stream, write
+from app.recsys.reason import graph_boost
+from app.recsys.snapshots import SnapshotManager, file_version
+from app.recsys.vector_index import top_k
+
+# Largest boost a pair can get; bounds which pairs can enter a top K
+MAX_BOOST = graph_boost(3, 1, 3)
+PAIR_BATCH = 5000
+
+PAIR_SIGNALS_QUERY = """
+UNWIND $pairs AS pair
+MATCH (m:Movie {tmdb_id: pair.source})
+MATCH (n:Movie {tmdb_id: pair.target})
+RETURN pair.source AS source,
+       pair.target AS target,
+       COUNT { (m)<-[:ACTED_IN]-(:Person)-[:ACTED_IN]->(n) } AS shared_actors,
+       COUNT { (m)<-[:DIRECTED]-(:Person)-[:DIRECTED]->(n) } AS director_cluster,
+       COUNT { (m)-[:HAS_GENRE]->(:Genre)<-[:HAS_GENRE]-(n) } AS shared_genres
+"""
+
+DISPLAY_QUERY = """
+UNWIND $ids AS id
+MATCH (m:Movie {tmdb_id: id})
+RETURN m.tmdb_id AS tmdb_id, m.title AS title, m.original_title AS original_title, m.release_date AS release_date
+"""
+
+# Fields served with each neighbor, stored in the .npz as string arrays
+DISPLAY_FIELDS = ("title", "original_title", "release_date")
+
+WRITE_SIMILAR_QUERY = """
+UNWIND $rows AS row
+MATCH (m:Movie {tmdb_id: row.source})
+OPTIONAL MATCH (m)-[old:SIMILAR_TO]->()
+DELETE old
+WITH DISTINCT m, row
+UNWIND row.neighbors AS neighbor
+MATCH (n:Movie {tmdb_id: neighbor.tmdb_id})
+CREATE (m)-[:SIMILAR_TO {score: neighbor.score, similarity: neighbor.similarity, rank: neighbor.rank}]->(n)
+"""
+
+
+# -------------------------
+# VECTOR CANDIDATES
+# -------------------------
+
+_matrix = None
+
+
+def _init_worker(matrix) -> None:
+    """Pool initializer: an artifact path is memory-mapped, so workers share pages."""
+    global _matrix
+    if isinstance(matrix, str):
+        from app.recsys.vectors import load_embeddings
+
+        matrix = load_embeddings(matrix)[1]
+    _matrix = matrix
+
+
+def _block_candidates(rows: np.ndarray, depth: int, targets: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Top-`depth` cosine neighbors of `rows` (self excluded), as row positions."""
+    targets_matrix = _matrix if targets is None else _matrix[targets]
+    scores = _matrix[rows] @ targets_matrix.T
+
+    if targets is None:
+        scores[np.arange(rows.shape[0]), rows] = -np.inf
+    else:
+        scores[rows[:, None] == targets[None, :]] = -np.inf
+
+    depth = min(depth, scores.shape[1])
+    out_rows = np.empty((rows.shape[0], depth), dtype=np.int64)
+    out_scores = np.empty((rows.shape[0], depth), dtype=np.float32)
+    for i, row_scores in enumerate(scores):
+        best = top_k(row_scores, depth)
+        out_rows[i] = best if targets is None else targets[best]
+        out_scores[i] = row_scores[best]
+    return out_rows, out_scores
+
+
+def vector_candidates(
+    matrix,
+    rows: np.ndarray,
+    depth: int,
+    targets: np.ndarray | None = None,
+    workers: int = 1,
+    block_rows: int = 1024,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cosine top-`depth` for every row in `rows`, one block of rows per task.
+
+    `matrix` may be an artifact path (workers memory-map it) or an array
+    (pickled once per worker by the pool initializer).
+    """
+    blocks = [rows[start:start + block_rows] for start in range(0, rows.shape[0], block_rows)]
+
+    if workers <= 1:
+        _init_worker(matrix)
+        results = [_block_candidates(block, depth, targets) for block in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matrix,)) as pool:
+            results = list(pool.map(_block_candidates, blocks, [depth] * len(blocks), [targets] * len(blocks)))
+
+    if not results:
+        return np.empty((0, depth), dtype=np.int64), np.empty((0, depth), dtype=np.float32)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+# -------------------------
+# GRAPH BLEND
+# -------------------------
+
+def pair_boosts(pairs: list[tuple[int, int]]) -> dict[tuple[int, int], float]:
+    """graph_boost for (source, target) tmdb_id pairs, in batches of PAIR_BATCH."""
+    boosts = {}
+    for start in range(0, len(pairs), PAIR_BATCH):
+        batch = [{"source": s, "target": t} for s, t in pairs[start:start + PAIR_BATCH]]
+        for r in read(PAIR_SIGNALS_QUERY, {"pairs": batch}):
+            boosts[(r["source"], r["target"])] = graph_boost(r["shared_actors"], r["director_cluster"], r["shared_genres"])
+    return boosts
+
+
+def blend(
+    ids: np.ndarray,
+    sources: np.ndarray,
+    cand_rows: np.ndarray,
+    cand_scores: np.ndarray,
+    k: int,
+    use_graph: bool = True,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Re-rank each source's vector candidates by similarity + graph boost.
+
+    Returns (neighbor tmdb_ids, blended scores, cosine similarities),
+    each shaped (len(sources), k); short rows are padded with -1 / NaN.
+    """
+    boosts = {}
+    if use_graph:
+        pairs = [
+            (int(ids[s]), int(ids[c]))
+            for s, row in zip(sources, cand_rows)
+            for c in row
+        ]
+        boosts = pair_boosts(pairs)
+
+    neighbors = np.full((len(sources), k), -1, dtype=np.int64)
+    scores = np.full((len(sources), k), np.nan, dtype=np.float32)
+    similarity = np.full((len(sources), k), np.nan, dtype=np.float32)
+
+    for i, (s, row, cos) in enumerate(zip(sources, cand_rows, cand_scores)):
+        valid = np.isfinite(cos)
+        row, cos = row[valid], cos[valid]
+        source_id = int(ids[s])
+        blended = cos + np.array([boosts.get((source_id, int(ids[c])), 0.0) for c in row], dtype=np.float32)
+        best = top_k(blended, k)
+        neighbors[i, :best.shape[0]] = ids[row[best]]
+        scores[i, :best.shape[0]] = blended[best]
+        similarity[i, :best.shape[0]] = cos[best]
+
+    return neighbors, scores, similarity
+
+
+# -------------------------
+# PERSISTENCE
+# -------------------------
+
+def fingerprints(matrix: np.ndarray) -> np.ndarray:
+    """64-bit hash of each embedding row: tells a re-embedded film from an unchanged one."""
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(np.asarray(row, dtype=np.float32).tobytes(), digest_size=8).digest(), "little")
+            for row in matrix
+        ),
+        dtype=np.uint64,
+        count=matrix.shape[0],
+    )
+
+
+def display_fields(ids: np.ndarray, batch_size: int = 5000) -> dict[str, np.ndarray]:
+    """DISPLAY_FIELDS per film as string arrays aligned with `ids` ("" when missing)."""
+    found = {}
+    for start in range(0, len(ids), batch_size):
+        for r in stream(DISPLAY_QUERY, {"ids": [int(i) for i in ids[start:start + batch_size]]}):
+            found[r["tmdb_id"]] = r
+    return {
+        field: np.array([str((found.get(int(i)) or {}).get(field) or "") for i in ids], dtype=str)
+        for field in DISPLAY_FIELDS
+    }
+
+
+def save_neighbors(
+    path: str,
+    ids: np.ndarray,
+    neighbors: np.ndarray,
+    scores: np.ndarray,
+    similarity: np.ndarray,
+    fingerprint: np.ndarray,
+    display: dict[str, np.ndarray],
+) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez(
+        tmp,
+        ids=ids,
+        neighbors=neighbors,
+        scores=scores,
+        similarity=similarity,
+        fingerprints=fingerprint,
+        built_at=time.time(),
+        **{f"display_{field}": display[field] for field in DISPLAY_FIELDS},
+    )
+    os.replace(tmp, path)
+
+
+def write_similar_to(sources: np.ndarray, neighbors: np.ndarray, scores: np.ndarray, similarity: np.ndarray, batch_size: int = 500) -> None:
+    """Replace the SIMILAR_TO relationships of `sources` with the given neighbors."""
+    rows = []
+    for source, ids_row, score_row, cos_row in zip(sources, neighbors, scores, similarity):
+        rows.append(
+            {
+                "source": int(source),
+                "neighbors": [
+                    {"tmdb_id": int(t), "score": float(sc), "similarity": float(c), "rank": rank}
+                    for rank, (t, sc, c) in enumerate(zip(ids_row, score_row, cos_row), start=1)
+                    if t >= 0
+                ],
+            }
+        )
+
+    for start in range(0, len(rows), batch_size):
+        write(WRITE_SIMILAR_QUERY, {"rows": rows[start:start + batch_size]})
+
+
+# -------------------------
+# SERVING
+# -------------------------
+
+class SimilarIndex:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        neighbors: np.ndarray,
+        scores: np.ndarray,
+        similarity: np.ndarray,
+        fingerprint: np.ndarray | None = None,
+        display: dict[str, np.ndarray] | None = None,
+    ):
+        self.ids = ids
+        self.neighbors = neighbors
+        self.scores = scores
+        self.similarity = similarity
+        # Absent in files built before they were stored
+        self.fingerprints = fingerprint
+        self.display = display
+        self.row_of = {int(i): row for row, i in enumerate(ids)}
+
+    @classmethod
+    def load(cls, path: str = SIMILAR_PATH) -> "SimilarIndex":
+        with np.load(path) as data:
+            display = None
+            if all(f"display_{field}" in data for field in DISPLAY_FIELDS):
+                display = {field: data[f"display_{field}"] for field in DISPLAY_FIELDS}
+            fingerprint = data["fingerprints"] if "fingerprints" in data else None
+            return cls(data["ids"], data["neighbors"], data["scores"], data["similarity"], fingerprint, display)
+
+    def nbytes(self) -> int:
+        display = sum(a.nbytes for a in self.display.values()) if self.display else 0
+        return self.ids.nbytes + self.neighbors.nbytes + self.scores.nbytes + self.similarity.nbytes + display
+
+    def fields(self, tmdb_id: int) -> dict | None:
+        """Stored display fields of a film; None when unknown or not stored."""
+        row = self.row_of.get(tmdb_id)
+        if row is None or self.display is None:
+            return None
+        return {field: str(values[row]) for field, values in self.display.items()}
+
+    def __contains__(self, tmdb_id: int) -> bool:
+        return tmdb_id in self.row_of
+
+    def get(self, tmdb_id: int, limit: int = SIMILAR_K) -> list[dict]:
+        row = self.row_of.get(tmdb_id)
+        if row is None:
+            return []
+        return [
+            {"tmdb_id": int(t), "score": float(s), "similarity": float(c)}
+            for t, s, c in zip(self.neighbors[row, :limit], self.scores[row, :limit], self.similarity[row, :limit])
+            if t >= 0
+        ]
+
+
+def _load_similar() -> SimilarIndex | None:
+    return SimilarIndex.load(SIMILAR_PATH) if os.path.exists(SIMILAR_PATH) else None
+
+
+_similar = SnapshotManager("similar", _load_similar, version=lambda: file_version(SIMILAR_PATH))
+
+
+def get_similar_index() -> SimilarIndex | None:
+    """The neighbor array at SIMILAR_PATH, reloaded when the file is rebuilt (None if not built)."""
+    return _similar.get()
+
+
+def similar_movies(tmdb_id: int, limit: int = 10) -> list[dict] | None:
+    """
+    Neighbors of a film with their display fields, best first.
+
+    Served from the neighbor array (display fields included) when it
+    exists, else from SIMILAR_TO. None when the film has no precomputed
+    neighbors.
+    """
+    index = get_similar_index()
+    if index is not None:
+        if tmdb_id not in index:
+            return None
+        hits = index.get(tmdb_id, limit)
+        if index.display is not None:
+            return [{"tmdb_id": h["tmdb_id"], **index.fields(h["tmdb_id"]), **h} for h in hits if h["tmdb_id"] in index]
+        # Built before display fields were stored
+        nodes = read(
+            """
+            MATCH (n:Movie) WHERE n.tmdb_id IN $ids
+            RETURN n.tmdb_id AS tmdb_id, n.title AS title, n.original_title AS original_title, n.release_date AS release_date
+            """,
+            {"ids": [h["tmdb_id"] for h in hits]},
+        )
+        by_id = {n["tmdb_id"]: n for n in nodes}
+        return [{**by_id[h["tmdb_id"]], **h} for h in hits if h["tmdb_id"] in by_id]
+
+    rows = read(
+        """
+        MATCH (:Movie {tmdb_id: $tmdb_id})-[r:SIMILAR_TO]->(n:Movie)
+        RETURN n.tmdb_id AS tmdb_id, n.title AS title, n.original_title AS original_title, n.release_date AS release_date,
+               r.score AS score, r.similarity AS similarity
+        ORDER BY r.score DESC
+        LIMIT $limit
+        """,
+        {"tmdb_id": tmdb_id, "limit": limit},
+    )
+    return rows or None
@@ -0,0 +1,202 @@
+"""
+Double-buffered, hot-reloadable serving state.
+
+Every in-process structure (vector index with its filter bitmaps, graph snapshot,
+lexical index, neighbor array, popular list) is held by a SnapshotManager:
+
+- get() returns the current generation; the first call builds it
+- A background refresher polls each manager's version (an artifact file's
+  mtime, or the graph data version bumped by ingestion scripts) and, when
+  it moved, builds the next generation off the request path
+- The new generation is warmed, then swapped in with one reference
+  assignment: requests already holding the old one finish on it, and its
+  buffers are released when the last of them drops it
+- Build time, age and memory per generation are exported as gauges
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from app.metrics import SNAPSHOT_AGE_SECONDS, SNAPSHOT_BUILD_SECONDS, SNAPSHOT_BYTES, SNAPSHOT_GENERATION, SNAPSHOT_RELOADS
+
+logger = logging.getLogger(__name__)
+
+
+def file_version(*paths: str):
+    """(mtime_ns, size) of each path, None for missing ones: changes when a file is replaced."""
+    out = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            out.append(None)
+            continue
+        out.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(out)
+
+
+def _nbytes(value) -> int:
+    nbytes = getattr(value, "nbytes", None)
+    return int(nbytes()) if callable(nbytes) else 0
+
+
+class Snapshot:
+    __slots__ = ("value", "version", "generation", "loaded_at", "build_seconds", "nbytes")
+
+    def __init__(self, value, version, generation: int, build_seconds: float):
+        self.value = value
+        self.version = version
+        self.generation = generation
+        self.loaded_at = time.time()
+        self.build_seconds = build_seconds
+        self.nbytes = _nbytes(value)
+
+
+class SnapshotManager:
+    def __init__(
+        self,
+        name: str,
+        build: Callable[[], object],
+        version: Callable[[], object] | None = None,
+        warm: Callable[[object], None] | None = None,
+        order: int = 1,
+    ):
+        self.name = name
+        self.order = order
+        self._build = build
+        self._version = version or (lambda: None)
+        self._warm = warm
+        self._current: Snapshot | None = None
+        # Serializes builds; readers never take it once a generation exists
+        self._build_lock = threading.Lock()
+        MANAGERS.append(self)
+
+    def get(self):
+        current = self._current
+        if current is None:
+            with self._build_lock:
+                if self._current is None:
+                    self._install(self._make(self._read_version()))
+            current = self._current
+        return current.value
+
+    def snapshot(self) -> Snapshot:
+        self.get()
+        return self._current
+
+    @property
+    def generation(self) -> int:
+        return self._current.generation if self._current is not None else 0
+
+    def refresh(self, force: bool = False) -> bool:
+        """Build and swap in a new generation if the version moved (or `force`); True if swapped."""
+        if self._current is None:
+            return False
+        version = self._read_version()
+        if version is None and self._current.version is not None:
+            return False
+        if not force and version == self._current.version:
+            return False
+
+        with self._build_lock:
+            if not force and version == self._current.version:
+                return False
+            try:
+                snapshot = self._make(version)
+            except Exception as exc:
+                # Keep serving the old generation
+                SNAPSHOT_RELOADS.inc(self.name, "failed")
+                logger.warning("Snapshot %s: rebuild failed, keeping generation %d (%s)", self.name, self.generation, exc)
+                return False
+            self._install(snapshot)
+        SNAPSHOT_RELOADS.inc(self.name, "ok")
+        return True
+
+    def _read_version(self):
+        try:
+            return self._version()
+        except Exception as exc:
+            logger.warning("Snapshot %s: cannot read version (%s)", self.name, exc)
+            return None
+
+    def _make(self, version) -> Snapshot:
+        start = time.perf_counter()
+        value = self._build()
+        if value is not None and self._warm is not None:
+            # Fault pages in / fill caches before the first request sees it
+            self._warm(value)
+        return Snapshot(value, version, self.generation + 1, time.perf_counter() - start)
+
+    def _install(self, snapshot: Snapshot) -> None:
+        old = self._current
+        self._current = snapshot
+        SNAPSHOT_GENERATION.set(snapshot.generation, self.name)
+        SNAPSHOT_BUILD_SECONDS.set(snapshot.build_seconds, self.name)
+        SNAPSHOT_BYTES.set(snapshot.nbytes, self.name)
+        SNAPSHOT_AGE_SECONDS.set(0.0, self.name)
+        if old is not None:
+            logger.info(
+                "Snapshot %s: generation %d → %d in %.2fs (%.1f MB → %.1f MB)",
+                self.name, old.generation, snapshot.generation, snapshot.build_seconds,
+                old.nbytes / 1e6, snapshot.nbytes / 1e6,
+            )
+
+    def report_age(self) -> None:
+        if self._current is not None:
+            SNAPSHOT_AGE_SECONDS.set(time.time() - self._current.loaded_at, self.name)
+
+
+MANAGERS: list[SnapshotManager] = []
+
+
+def generations() -> tuple[int, ...]:
+    """Current generation of every manager: changes whenever any serving snapshot reloads."""
+    return tuple(manager.generation for manager in MANAGERS)
+
+
+# -------------------------
+# BACKGROUND REFRESHER
+# -------------------------
+
+_stop = threading.Event()
+_thread = None
+
+
+def refresh_all() -> list[str]:
+    """One polling pass over every manager that has been loaded; names of the swapped ones."""
+    swapped = []
+    # Lower order first: what others are aligned with (the vector index) reloads before them
+    for manager in sorted(MANAGERS, key=lambda m: m.order):
+        if manager.refresh():
+            swapped.append(manager.name)
+        manager.report_age()
+    return swapped
+
+
+def start_refresher(interval: float) -> None:
+    """Poll versions every `interval` seconds on a daemon thread (interval <= 0: never)."""
+    global _thread
+    if interval <= 0 or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+
+    def loop():
+        while not _stop.wait(interval):
+            try:
+                refresh_all()
+            except Exception:
+                logger.exception("Snapshot refresh pass failed")
+
+    _thread = threading.Thread(target=loop, name="snapshot-refresher", daemon=True)
+    _thread.start()
+
+
+def stop_refresher() -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
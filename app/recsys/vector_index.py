@@ -0,0 +1,250 @@
+"""
+In-process vector retrieval backends.
+
+VECTOR_BACKEND selects where candidate recall happens:
+- "neo4j"   → db.index.vector.queryNodes (default, no in-process state)
+- "exact"   → brute-force float32 dot products
+- "float16" / "int8" / "binary" → compressed first pass + exact rescoring
+- "matryoshka" → truncated-prefix first pass + full-dimension rescoring
+- "ivf"     → k-means cells, only the nprobe closest cells are scanned
+
+Every backend answers search(query, k, mask) with (tmdb_ids, scores)
+sorted by descending cosine similarity. `mask` is an optional boolean
+array over the index rows; rows outside it are never scored.
+"""
+
+import copy
+import logging
+import os
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_ARTIFACT,
+    EMBEDDINGS_PATH,
+    VECTOR_BACKEND,
+    VECTOR_IVF_LISTS,
+    VECTOR_IVF_NPROBE,
+    VECTOR_IVF_PATH,
+    VECTOR_PREFIX_DIM,
+    VECTOR_RESCORE_DEPTH,
+    VECTOR_WARM_ENABLED,
+)
+from app.recsys.snapshots import SnapshotManager, file_version
+
+logger = logging.getLogger(__name__)
+
+SCORE_BLOCK_ROWS = 8192
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def candidate_rows(n: int, mask: np.ndarray | None) -> np.ndarray | None:
+    """Row positions allowed by mask, or None when every row is allowed."""
+    if mask is None:
+        return None
+    return np.flatnonzero(mask[:n])
+
+
+class ExactIndex:
+    """Brute-force cosine search over the float32 matrix."""
+
+    name = "exact"
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray):
+        self.ids = ids
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.ids.nbytes
+
+    def score_rows(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return self.matrix[rows] @ query
+
+    def search(self, query: np.ndarray, k: int, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        rows = candidate_rows(len(self), mask)
+        if rows is None:
+            scores = self.matrix @ query
+            best = top_k(scores, k)
+            return self.ids[best], scores[best]
+
+        scores = self.score_rows(query, rows)
+        best = top_k(scores, k)
+        return self.ids[rows[best]], scores[best]
+
+
+def codes_key(backend: str, prefix_dim: int = VECTOR_PREFIX_DIM) -> str | None:
+    """Name of the derived arrays a backend stores in the embedding artifact; None if it has none."""
+    if backend in ("float16", "int8", "binary"):
+        return backend
+    if backend == "matryoshka":
+        return f"matryoshka-{prefix_dim}"
+    return None
+
+
+def encode_codes(backend: str, matrix: np.ndarray, prefix_dim: int = VECTOR_PREFIX_DIM) -> dict[str, np.ndarray]:
+    """The derived arrays codes_key(backend) names, computed from the normalized matrix."""
+    if backend == "matryoshka":
+        from app.recsys.matryoshka import encode
+
+        return encode(matrix, prefix_dim)
+
+    from app.recsys.quantization import encode
+
+    return encode(matrix, backend)
+
+
+def build_index(backend: str, ids: np.ndarray, matrix: np.ndarray, codes: dict[str, np.ndarray] | None = None, **options):
+    """`codes` (quantized / matryoshka backends) are used as is instead of being encoded per process."""
+    if backend == "exact":
+        return ExactIndex(ids, matrix)
+
+    if backend in ("float16", "int8", "binary"):
+        from app.recsys.quantization import QuantizedIndex
+
+        return QuantizedIndex(
+            ids,
+            matrix,
+            mode=backend,
+            rescore_depth=options.get("rescore_depth", VECTOR_RESCORE_DEPTH),
+            codes=codes,
+        )
+
+    if backend == "matryoshka":
+        from app.recsys.matryoshka import MatryoshkaIndex
+
+        return MatryoshkaIndex(
+            ids,
+            matrix,
+            prefix_dim=options.get("prefix_dim", VECTOR_PREFIX_DIM),
+            rescore_depth=options.get("rescore_depth", VECTOR_RESCORE_DEPTH),
+            codes=codes,
+        )
+
+    if backend == "ivf":
+        from app.recsys.ivf import IVFIndex
+
+        return IVFIndex.build(
+            ids,
+            matrix,
+            nlist=options.get("nlist", VECTOR_IVF_LISTS) or None,
+            nprobe=options.get("nprobe", VECTOR_IVF_NPROBE),
+        )
+
+    raise ValueError(f"Unknown vector backend: {backend}")
+
+
+# -------------------------
+# SERVING SINGLETON
+# -------------------------
+
+# (file version, index) of the last load, so a graph-only change keeps the arrays
+_loaded = None
+
+
+def _load_index():
+    """
+    The index and its filter bitmaps, built together so every generation
+    publishes an aligned pair. When only the graph data moved, the index
+    arrays are reused and just the bitmaps are rebuilt.
+    """
+    global _loaded
+    from app.recsys.filters import load_filter_bitmaps
+
+    files = _files_version()
+    if _loaded is not None and _loaded[0] == files:
+        index = copy.copy(_loaded[1])
+    elif VECTOR_BACKEND == "ivf" and os.path.isdir(VECTOR_IVF_PATH):
+        from app.recsys.ivf import IVFIndex
+
+        index = IVFIndex.load(VECTOR_IVF_PATH, nprobe=VECTOR_IVF_NPROBE)
+    else:
+        from app.recsys.vectors import is_artifact, load_artifact_codes, load_embeddings
+
+        ids, matrix = load_embeddings()
+        codes, key = None, codes_key(VECTOR_BACKEND)
+        if key is not None and is_artifact(EMBEDDING_ARTIFACT):
+            codes = load_artifact_codes(EMBEDDING_ARTIFACT, key)
+        if key is not None and codes is None:
+            logger.warning(
+                "No %s codes in the embedding artifact: each worker encodes its own copy "
+                "(build_embedding_artifact --codes %s writes shared ones)", key, VECTOR_BACKEND,
+            )
+        index = build_index(VECTOR_BACKEND, ids, matrix, codes=codes)
+
+    index.bitmaps = load_filter_bitmaps(index.ids)
+    _loaded = (files, index)
+    return index
+
+
+def _files_version():
+    """Changes when any file the index may be loaded from is replaced."""
+    from app.recsys.vectors import ARTIFACT_HEADER
+
+    return file_version(
+        os.path.join(EMBEDDING_ARTIFACT, ARTIFACT_HEADER),
+        EMBEDDINGS_PATH,
+        os.path.join(VECTOR_IVF_PATH, "meta.json"),
+    )
+
+
+def _index_version():
+    from app.db.data_version import graph_version
+
+    # The graph version covers the bitmaps built with the index
+    return _files_version(), graph_version()
+
+
+# Arrays a search reads, first-pass ones first: quantized codes / matryoshka
+# prefix / IVF centroids and cell lists, then the float32 rescoring matrix
+WARM_ARRAYS = (
+    "codes", "scale", "prefix", "centroids", "offsets", "main_ids",
+    "delta_vectors", "delta_lists", "vectors", "matrix",
+)
+
+
+def _warm_index(index) -> None:
+    # Read every row once so memory-mapped arrays are paged in before traffic;
+    # reused arrays (graph-only reloads) are already resident
+    if not VECTOR_WARM_ENABLED or getattr(index, "warmed", False):
+        return
+    for name in WARM_ARRAYS:
+        array = getattr(index, name, None)
+        if not isinstance(array, np.ndarray) or not array.size:
+            continue
+        for start in range(0, array.shape[0], SCORE_BLOCK_ROWS):
+            array[start:start + SCORE_BLOCK_ROWS].sum()
+    index.warmed = True
+
+
+_index = SnapshotManager("vector_index", _load_index, version=_index_version, warm=_warm_index, order=0)
+
+
+def get_vector_index():
+    """
+    The process-wide index for VECTOR_BACKEND, built on first use and
+    hot-reloaded when its embedding artifact / parquet / IVF files change
+    or the graph data version moves. `index.bitmaps` holds the filter
+    bitmaps aligned with its rows.
+
+    Returns None for the "neo4j" backend: recall stays in the database.
+    The "ivf" backend memory-maps VECTOR_IVF_PATH when it exists.
+    """
+    if VECTOR_BACKEND == "neo4j":
+        return None
+    return _index.get()
+
+
+def vector_index_generation() -> int:
+    """Bumped on every (re)load; structures aligned with the index rows key on it."""
+    return _index.generation
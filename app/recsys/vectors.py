@@ -0,0 +1,196 @@
+"""
+In-process access to the film embedding matrix.
+
+Rows are L2-normalized float32, so a dot product is cosine similarity;
+db.index.vector.queryNodes reports the same similarity as (1 + cos) / 2.
+
+Two on-disk sources:
+- films_embeddings.parquet → decoded into private memory per process
+- the artifact directory → normalized float32 .npy memory-mapped read-only,
+  so every uvicorn worker shares one copy through the OS page cache
+
+The artifact can also carry the derived arrays of the quantized and
+matryoshka backends ("codes", listed in the header), memory-mapped the
+same way; without them those backends encode private per-worker copies.
+"""
+
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from app.config import EMBEDDING_ARTIFACT, EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, EMBEDDINGS_PATH
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_MATRIX = "embeddings.npy"
+ARTIFACT_IDS = "tmdb_ids.npy"
+ARTIFACT_HEADER = "header.json"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def truncate_rows(matrix: np.ndarray, dims: int) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the first `dims` components and renormalize.
+
+    text-embedding-3 models are trained so that prefixes remain usable
+    embeddings; this is what the API's `dimensions` parameter returns.
+    """
+    return normalize_rows(np.ascontiguousarray(matrix[:, :dims], dtype=np.float32))
+
+
+def normalize_query(vector) -> np.ndarray:
+    q = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    return q / norm if norm else q
+
+
+# -------------------------
+# PARQUET
+# -------------------------
+
+def load_parquet(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Load (tmdb_ids, matrix) from the films_embeddings parquet.
+
+    The list column is flattened with pyarrow instead of going through
+    Python lists, so loading stays proportional to the raw float bytes.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path, columns=["tmdb_id", "embedding"])
+    ids = table.column("tmdb_id").to_numpy().astype(np.int64)
+
+    embeddings = table.column("embedding").combine_chunks()
+    flat = embeddings.flatten().to_numpy(zero_copy_only=False)
+    matrix = flat.reshape(len(ids), -1).astype(np.float32, copy=False)
+
+    return ids, normalize_rows(matrix)
+
+
+# -------------------------
+# MEMORY-MAPPED ARTIFACT
+# -------------------------
+
+def write_artifact(
+    path: str,
+    ids: np.ndarray,
+    matrix: np.ndarray,
+    model: str = EMBEDDING_MODEL,
+    codes: tuple[str, ...] = (),
+) -> dict:
+    """
+    Write the serving artifact: normalized float32 rows, int64 tmdb_ids, JSON header.
+
+    `codes` are vector backends whose derived arrays are encoded and stored
+    too (backends without any are ignored).
+
+    Files are written under temporary names and renamed into place, so a
+    running server that maps the old files keeps a consistent view.
+    """
+    from app.recsys.vector_index import codes_key, encode_codes
+
+    os.makedirs(path, exist_ok=True)
+    matrix = normalize_rows(np.ascontiguousarray(matrix, dtype=np.float32))
+
+    header = {
+        "model": model,
+        "dims": int(matrix.shape[1]),
+        "count": int(matrix.shape[0]),
+        "dtype": "float32",
+        "normalized": True,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "codes": {},
+    }
+
+    arrays = [(ARTIFACT_MATRIX, matrix), (ARTIFACT_IDS, np.asarray(ids, dtype=np.int64))]
+    for backend in codes:
+        key = codes_key(backend)
+        if key is None or key in header["codes"]:
+            continue
+        try:
+            encoded = encode_codes(backend, matrix)
+        except ValueError as exc:
+            logger.warning("Embedding artifact %s: no %s codes (%s)", path, key, exc)
+            continue
+        header["codes"][key] = sorted(encoded)
+        arrays += [(f"{key}.{name}.npy", array) for name, array in encoded.items()]
+
+    for name, array in arrays:
+        tmp = os.path.join(path, f".{name}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, os.path.join(path, name))
+
+    tmp = os.path.join(path, f".{ARTIFACT_HEADER}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp, os.path.join(path, ARTIFACT_HEADER))
+
+    return header
+
+
+def read_header(path: str) -> dict:
+    with open(os.path.join(path, ARTIFACT_HEADER)) as f:
+        return json.load(f)
+
+
+def load_artifact(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Memory-map the artifact read-only: O(1) startup, pages fault in on first use.
+
+    The header is checked against the query-side embedding settings, since
+    film and query vectors from different models or widths are not comparable.
+    """
+    header = read_header(path)
+    expected_dims = EMBEDDING_DIMENSIONS or header["dims"]
+    if header["model"] != EMBEDDING_MODEL or header["dims"] != expected_dims:
+        logger.warning(
+            "Embedding artifact %s is %s/%d dims but queries use %s/%d dims",
+            path, header["model"], header["dims"], EMBEDDING_MODEL, expected_dims,
+        )
+
+    matrix = np.load(os.path.join(path, ARTIFACT_MATRIX), mmap_mode="r")
+    ids = np.load(os.path.join(path, ARTIFACT_IDS))
+    if matrix.shape != (header["count"], header["dims"]) or ids.shape[0] != header["count"]:
+        raise ValueError(f"Embedding artifact {path} does not match its header")
+
+    return ids, matrix
+
+
+def load_artifact_codes(path: str, key: str) -> dict[str, np.ndarray] | None:
+    """Memory-map the derived arrays stored under `key` (see codes_key); None if the artifact has none."""
+    header = read_header(path)
+    names = header.get("codes", {}).get(key)
+    if names is None:
+        return None
+    codes = {name: np.load(os.path.join(path, f"{key}.{name}.npy"), mmap_mode="r") for name in names}
+    if any(array.ndim == 2 and array.shape[0] != header["count"] for array in codes.values()):
+        raise ValueError(f"Embedding artifact {path}: {key} codes do not match its header")
+    return codes
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, ARTIFACT_HEADER))
+
+
+def load_embeddings(path: str | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Load (tmdb_ids, matrix) from an artifact directory or a parquet file.
+
+    Without a path, the serving default: EMBEDDING_ARTIFACT when it has
+    been built, EMBEDDINGS_PATH otherwise.
+    """
+    if path is None:
+        path = EMBEDDING_ARTIFACT if is_artifact(EMBEDDING_ARTIFACT) else EMBEDDINGS_PATH
+
+    if is_artifact(path):
+        return load_artifact(path)
+    return load_parquet(path)
@@ -1,17 +1,142 @@
-from openai import OpenAI
-from app.config import OPENAI_API_KEY, EMBEDDING_MODEL
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from app.config import (
+    OPENAI_API_KEY,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSIONS,
+    EMBED_HEDGE_ENABLED,
+    EMBED_HEDGE_DEFAULT_MS,
+    EMBED_POOL_SIZE,
+)
+from app.metrics import EMBEDDING_HEDGES
+
+logger = logging.getLogger(__name__)
+
+# Calls run on their own threads so the request thread can stop waiting;
+# a late call finishes in the background (bounded by its API timeout).
+# Sized for every request thread plus its hedge: time spent queued here
+# counts against the embed budget
+_pool = ThreadPoolExecutor(max_workers=EMBED_POOL_SIZE, thread_name_prefix="embed")
+
+# Recent successful call latencies → p95 hedge delay
+HEDGE_MIN_SAMPLES = 20
+_latencies = deque(maxlen=500)
+_latencies_lock = threading.Lock()
+
+
+def hedge_delay() -> float:
+    """Seconds to wait before a duplicate request: observed p95, or the default until warmed up."""
+    with _latencies_lock:
+        samples = sorted(_latencies)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return EMBED_HEDGE_DEFAULT_MS / 1000
+    return samples[int(0.95 * (len(samples) - 1))]
+
 
 class EmbeddingService:
     def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
         self.model = EMBEDDING_MODEL or "text-embedding-3-large"
+        self.dimensions = EMBEDDING_DIMENSIONS
+        self._client = None
+        self._client_lock = threading.Lock()
 
-    def embed_text(self, text: str) -> list[float]:
+    @property
+    def client(self):
+        """OpenAI client (with its connection pool), created on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    self._client = OpenAI(api_key=OPENAI_API_KEY)
+        return self._client
+
+    def embed_text(self, text: str, timeout: float | None = None) -> list[float]:
         """
         Converts text into a vector using OpenAI.
+
+        With EMBEDDING_DIMENSIONS set, the API returns the shortened
+        (truncated + renormalized) vector, matching the stored corpus.
+        With a timeout, the call is not retried past it.
         """
-        response = self.client.embeddings.create(
+        options = {"dimensions": self.dimensions} if self.dimensions else {}
+        client = self.client if timeout is None else self.client.with_options(timeout=timeout, max_retries=0)
+        response = client.embeddings.create(
             input=[text],
-            model=self.model
+            model=self.model,
+            **options
         )
         return response.data[0].embedding
+
+    def embed_batch(self, texts: list[str], timeout: float | None = None) -> list[list[float]]:
+        """Vectors for many texts in one embeddings.create call, in input order."""
+        options = {"dimensions": self.dimensions} if self.dimensions else {}
+        client = self.client if timeout is None else self.client.with_options(timeout=timeout, max_retries=0)
+        response = client.embeddings.create(
+            input=texts,
+            model=self.model,
+            **options
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _timed_embed(self, text: str, timeout: float | None) -> list[float]:
+        start = time.perf_counter()
+        vector = self.embed_text(text, timeout=timeout)
+        with _latencies_lock:
+            _latencies.append(time.perf_counter() - start)
+        return vector
+
+    def embed_within(self, text: str, timeout: float | None) -> list[float] | None:
+        """
+        embed_text bounded by `timeout` seconds; None when it runs out or fails.
+
+        With EMBED_HEDGE_ENABLED, a second identical request is sent once the
+        first has been pending for the p95 delay, and the first answer wins.
+        """
+        if timeout is not None and timeout <= 0:
+            return None
+
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        pending = {_pool.submit(self._timed_embed, text, timeout)}
+
+        if EMBED_HEDGE_ENABLED:
+            delay = hedge_delay()
+            if timeout is None or delay < timeout:
+                done, _ = wait(pending, timeout=delay)
+                if not done:
+                    EMBEDDING_HEDGES.inc()
+                    left = None if deadline is None else deadline - time.perf_counter()
+                    pending.add(_pool.submit(self._timed_embed, text, left))
+
+        while pending:
+            left = None if deadline is None else deadline - time.perf_counter()
+            if left is not None and left <= 0:
+                break
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                logger.warning("Embedding request failed: %s", future.exception())
+
+        if pending:
+            logger.warning("Embedding request exceeded its %.0f ms budget", timeout * 1000)
+        return None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """One service per process, so requests share the client's HTTP connection pool."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
@@ -1,32 +1,95 @@
-from app.db.neo4j import run
+import numpy as np
+from app.db.neo4j import read
 from app.services.embeddings import EmbeddingService
 from app.models.response import MovieRecommendation, ParsedQuery
+from app.budget import budget_exhausted, mark_degraded, stage_timeout
+from app.config import EMBED_BUDGET_MS, LEXICAL_K, LEXICAL_WEIGHT, MMR_ENABLED, MMR_LAMBDA, MMR_POOL, RRF_K
+from app.metrics import span
+from app.recsys.diversity import diversify
+from app.recsys.fallback import get_popular_list
+from app.recsys.lexical import LexicalMatch, get_lexical_index
+from app.recsys.query_cache import CandidateCache, get_candidate_cache, get_query_cache
+from app.recsys.retrieve import candidate_source, vector_candidates
+from app.recsys.vector_index import get_vector_index
+from app.recsys.vectors import normalize_query
+
+# Candidate pool size (for filtering depth)
+K_POOL = 100
 
 class RecommenderService:
     def __init__(self, embedding_service: EmbeddingService):
         self.embedding_service = embedding_service
 
-    def recommend(self, parsed_query: ParsedQuery, limit: int = 5, debug: bool = False) -> tuple[list[MovieRecommendation], dict | None]:
-        # 1. Embed the semantic query
-        vector = self.embedding_service.embed_text(parsed_query.semantic_query)
-        
-        # Candidate pool size (for filtering depth)
-        K_POOL = 100
+    def recommend(
+        self,
+        parsed_query: ParsedQuery,
+        limit: int = 5,
+        debug: bool = False,
+        diversity: float | None = None,
+        candidates: list[dict] | None = None,
+        query: str | None = None,
+    ) -> tuple[list[MovieRecommendation], dict | None]:
+        """
+        Ranked recommendations (and debug counts when asked).
+
+        `query` is the raw request text, matched against titles and names
+        (semantic_query has lost their stopwords and years); the semantic
+        query is still what gets embedded.
+
+        `candidates` ([{tmdb_id, score}] on the queryNodes scale) replace
+        vector recall, e.g. to rank another backend's hits in a benchmark.
+        """
+        # MMR λ: explicit per call, else the configured default (None = off)
+        if diversity is None and MMR_ENABLED:
+            diversity = MMR_LAMBDA
+
+        # 1. Lexical matches (titles, people, keywords) — sub-millisecond, in-process
+        lexical = None
+        lexical_index = get_lexical_index()
+        if lexical_index is not None:
+            with span("lexical"):
+                lexical = lexical_index.search(query or parsed_query.semantic_query, k=LEXICAL_K)
+
+        # 2. Embed the semantic query; entity-only queries ("movies like Parasite")
+        #    use the matched films' stored embeddings and skip the API call
+        vector, exact = None, False
+        if lexical is not None and lexical.entity_only:
+            with span("entity_vector"):
+                vector = self._entity_vector(lexical.seed_ids)
+        if vector is None:
+            vector, exact = self._query_vector(parsed_query.semantic_query, lexical)
+        if vector is None:
+            # No vector within budget: popular-and-awarded films for the filters
+            mark_degraded("popular")
+            return self._popular(parsed_query, limit), None
         
         from datetime import datetime
         current_year = datetime.now().year
 
         # 2. Build Hybrid Cypher Query with Recency, Award, and Comedy Boosts
-        # Final Score = similarity + recency_boost + award_boost + comedy_boost
-        cypher = """
-        CALL db.index.vector.queryNodes("movie_embedding_index", $k, $embedding)
-        YIELD node, score as similarity
-        """
+        # Final Score = similarity + recency_boost + award_boost + comedy_boost + lexical_boost
+        # Candidates come from the Neo4j vector index or the in-process backend;
+        # in-process search is pre-filtered so selective filters keep K_POOL hits
+        # Mask and search from one index generation, whose bitmaps follow its rows
+        index = get_vector_index()
+        mask = index.bitmaps.for_query(parsed_query.filters) if index is not None else None
+        lexical_ids = lexical.tmdb_ids.tolist() if lexical is not None else []
+        # The vector hits of an exactly embedded query are reused across
+        # requests (and precomputed at warm-up); approximate vectors are not.
+        # Only in-process search is cached: on the neo4j backend a miss would
+        # cost a separate queryNodes round trip before the ranking query
+        if candidates is None and exact and index is not None:
+            candidates = self.candidates(parsed_query, vector, mask, index)
+        source, source_params = candidate_source(
+            vector, K_POOL, score_alias="similarity", mask=mask, lexical_ids=lexical_ids,
+            candidates=candidates, index=index,
+        )
+        cypher = source
         
         params = {
-            "embedding": vector,
-            "k": K_POOL,
-            "current_year": current_year
+            **source_params,
+            "current_year": current_year,
+            "lexical_boosts": self._lexical_boosts(lexical),
         }
         
         # Example Augmented Ranking Query:
@@ -43,6 +106,11 @@ class RecommenderService:
         # RETURN node, similarity, (similarity + recency_boost + award_boost + comedy_boost) AS final_score
         
         conditions = []
+
+        # "movies like X": X itself is not a recommendation
+        if lexical is not None and lexical.exclude_ids:
+            conditions.append("NOT node.tmdb_id IN $exclude_ids")
+            params["exclude_ids"] = lexical.exclude_ids
         
         # Temporal Filter
         if parsed_query.filters and parsed_query.filters.year_from:
@@ -69,8 +137,10 @@ class RecommenderService:
              toInteger(substring(node.release_date, 0, 4)) AS rel_year,
              // Genre Boost: Soft preference for intent alignment (e.g. "funny" -> Comedy)
              CASE WHEN EXISTS { (node)-[:HAS_GENRE]->(:Genre {name: "Comedy"}) } THEN 0.05 ELSE 0 END AS cb,
-             CASE WHEN EXISTS { (node)-[:RECEIVED]->() } THEN 0.05 ELSE 0 END AS ab
-        WITH node, similarity, cb, ab,
+             CASE WHEN EXISTS { (node)-[:RECEIVED]->() } THEN 0.05 ELSE 0 END AS ab,
+             // Lexical Boost: reciprocal rank of exact title / name matches
+             coalesce($lexical_boosts[toString(node.tmdb_id)], 0.0) AS lb
+        WITH node, similarity, cb, ab, lb,
              // Saturating Recency: Boost modern films, but plateau after 2018 
              // to avoid newer sequels always outranking slightly older originals.
              CASE 
@@ -78,27 +148,56 @@ class RecommenderService:
                WHEN rel_year >= 2018 THEN 0.05
                ELSE (rel_year - 2000.0) / (2018 - 2000) * 0.05
              END AS rb
-        RETURN node, similarity, rb as recency_boost, ab as award_boost, cb as comedy_boost,
-               (similarity + rb + ab + cb) AS final_score
+        RETURN node, similarity, rb as recency_boost, ab as award_boost, cb as comedy_boost, lb as lexical_boost,
+               (similarity + rb + ab + cb + lb) AS final_score
         ORDER BY final_score DESC
         LIMIT $limit
         """
-        params["limit"] = limit
+        # MMR picks `limit` films out of a wider ranked pool
+        params["limit"] = max(limit, MMR_POOL) if diversity is not None else limit
         
-        results = run(cypher, params)
+        if budget_exhausted():
+            mark_degraded("popular")
+            return self._popular(parsed_query, limit), None
+        try:
+            with span("rank_query"):
+                results = read(cypher, params)
+        except Exception:
+            # The transaction was cut off at the request deadline
+            if not budget_exhausted():
+                raise
+            mark_degraded("popular")
+            return self._popular(parsed_query, limit), None
+
+        if diversity is not None:
+            results = diversify(
+                results,
+                [r["node"].get("embedding") for r in results],
+                [r["final_score"] for r in results],
+                k=limit,
+                lambda_=diversity,
+            )
         
         # 3. Handle Debugging (Counts)
         debug_info = None
         if debug:
-            debug_info = self._get_debug_counts(vector, K_POOL, parsed_query)
+            with span("debug_counts"):
+                debug_info = self._get_debug_counts(source, source_params, K_POOL, parsed_query)
+                if mask is not None:
+                    debug_info["prefilter_matches"] = int(mask.sum())
+                if lexical is not None:
+                    debug_info["lexical"] = lexical.summary()
         
         # 4. Format Recommendations
         recommendations = []
         for row in results:
             node = row["node"]
             
-            # Extract awards for display
-            award_names = self._get_node_awards(node["tmdb_id"])
+            # Extract awards for display (skipped once the budget is spent)
+            award_names = []
+            if not budget_exhausted():
+                with span("award_lookup"):
+                    award_names = self._get_node_awards(node["tmdb_id"])
             
             recommendations.append(MovieRecommendation(
                 tmdb_id=node["tmdb_id"],
@@ -110,16 +209,110 @@ class RecommenderService:
                 recency_boost=round(row["recency_boost"], 4),
                 award_boost=round(row["award_boost"], 4),
                 comedy_boost=round(row["comedy_boost"], 4),
+                lexical_boost=round(row["lexical_boost"], 4),
                 awards=award_names
             ))
             
         return recommendations, debug_info
 
-    def _get_debug_counts(self, vector: list[float], k: int, parsed_query: ParsedQuery) -> dict:
+    def candidates(self, parsed_query: ParsedQuery, vector: list[float], mask=None, index=None) -> list[dict]:
+        """
+        Top-K_POOL vector hits for the query's exact embedding, from the
+        candidate cache or searched (and cached) on a miss. Meant for the
+        in-process backends; recommend() recalls inline on the neo4j one.
+        """
+        cache = get_candidate_cache()
+        key = CandidateCache.key(parsed_query.semantic_query, parsed_query.filters, K_POOL)
+        candidates = cache.get(key)
+        if candidates is None:
+            candidates = vector_candidates(vector, K_POOL, mask, index)
+            cache.put(key, candidates)
+        return candidates
+
+    def _query_vector(self, text: str, lexical: LexicalMatch | None) -> tuple[list[float] | None, bool]:
+        """
+        Embedding for the semantic query within EMBED_BUDGET_MS, and whether
+        it is the query's own embedding.
+
+        Falls back to the nearest cached query, then to the lexical matches'
+        stored embeddings; None when neither is available.
+        """
+        cache = get_query_cache()
+        vector = cache.get(text)
+        if vector is not None:
+            return vector, True
+
+        with span("embed"):
+            vector = self.embedding_service.embed_within(text, stage_timeout(EMBED_BUDGET_MS / 1000))
+        if vector is not None:
+            cache.put(text, vector)
+            return vector, True
+
+        vector = cache.nearest(text)
+        if vector is not None:
+            mark_degraded("cached_query")
+            return vector, False
+
+        if lexical is not None and lexical.seed_ids:
+            with span("entity_vector"):
+                vector = self._entity_vector(lexical.seed_ids)
+            if vector is not None:
+                mark_degraded("lexical")
+                return vector, False
+        return None, False
+
+    @staticmethod
+    def _popular(parsed_query: ParsedQuery, limit: int) -> list[MovieRecommendation]:
+        popular = get_popular_list()
+        if popular is None:
+            return []
+        return [
+            MovieRecommendation(
+                tmdb_id=row["tmdb_id"],
+                title=row["title"],
+                original_title=row["original_title"],
+                release_year=int(row["release_date"][:4]) if row.get("release_date") else None,
+                final_score=round(row["popular_score"], 4),
+                similarity_score=0.0,
+                recency_boost=0.0,
+                award_boost=0.0,
+                comedy_boost=0.0,
+                awards=sorted({event for event, _ in row["awards"]}),
+            )
+            for row in popular.for_filters(parsed_query.filters, limit)
+        ]
+
+    def _entity_vector(self, tmdb_ids: list[int]) -> list[float] | None:
+        """Centroid of the stored embeddings of the matched films (None if none stored)."""
+        if not tmdb_ids:
+            return None
+        rows = read(
+            """
+            MATCH (m:Movie) WHERE m.tmdb_id IN $ids AND m.embedding IS NOT NULL
+            RETURN m.embedding AS embedding
+            """,
+            {"ids": tmdb_ids},
+        )
+        if not rows:
+            return None
+        centroid = np.mean([normalize_query(r["embedding"]) for r in rows], axis=0)
+        return normalize_query(centroid).tolist()
+
+    @staticmethod
+    def _lexical_boosts(lexical: LexicalMatch | None) -> dict[str, float]:
+        """Reciprocal-rank fusion term per lexical hit, scaled so rank 1 gets LEXICAL_WEIGHT."""
+        if lexical is None:
+            return {}
+        return {
+            str(tmdb_id): LEXICAL_WEIGHT * (RRF_K + 1) / (RRF_K + rank)
+            for rank, tmdb_id in enumerate(lexical.tmdb_ids.tolist(), start=1)
+        }
+
+    def _get_debug_counts(self, source: str, source_params: dict, k: int, parsed_query: ParsedQuery) -> dict:
         """Runs explicit COUNT(*) queries to track candidate reduction."""
         debug = {"vector_candidates": k}
         
-        params = {"embedding": vector, "k": k}
+        params = dict(source_params)
         
         # Base where we started
         running_conditions = []
@@ -128,13 +321,11 @@ class RecommenderService:
             running_conditions.append("toInteger(substring(node.release_date, 0, 4)) >= $year_from")
             params["year_from"] = parsed_query.filters.year_from
             
-            count_cypher = f"""
-            CALL db.index.vector.queryNodes("movie_embedding_index", $k, $embedding)
-            YIELD node
+            count_cypher = source + f"""
             WHERE {" AND ".join(running_conditions)}
             RETURN count(*) as count
             """
-            debug["after_year_filter"] = run(count_cypher, params)[0]["count"]
+            debug["after_year_filter"] = read(count_cypher, params)[0]["count"]
 
         if parsed_query.filters and parsed_query.filters.award_event:
             award_match = """EXISTS {
@@ -146,13 +337,11 @@ class RecommenderService:
             params["award_event"] = parsed_query.filters.award_event
             params["award_result"] = parsed_query.filters.award_result or "won"
             
-            count_cypher = f"""
-            CALL db.index.vector.queryNodes("movie_embedding_index", $k, $embedding)
-            YIELD node
+            count_cypher = source + f"""
             WHERE {" AND ".join(running_conditions)}
             RETURN count(*) as count
             """
-            debug["after_award_filter"] = run(count_cypher, params)[0]["count"]
+            debug["after_award_filter"] = read(count_cypher, params)[0]["count"]
             
         return debug
 
@@ -162,6 +351,6 @@ class RecommenderService:
         MATCH (m:Movie {tmdb_id: $tmdb_id})-[:RECEIVED]->(c:AwardCategory)<-[:HAS_CATEGORY]-(e:AwardEvent)
         RETURN DISTINCT e.name as name
         """
-        rows = run(query, {"tmdb_id": tmdb_id})
+        rows = read(query, {"tmdb_id": tmdb_id})
         return [r["name"] for r in rows]
 
@@ -0,0 +1,175 @@
+"""
+Cache warm-up from the most frequent queries of a query log.
+
+At startup, before /ready reports ready:
+1. count (semantic query, filters) pairs over WARMUP_QUERY_LOG and keep
+   the WARMUP_TOP_N most frequent
+2. embed the texts not already cached, WARMUP_BATCH_SIZE per
+   embeddings.create call, into the query embedding cache
+3. precompute their top-K candidate lists into the candidate cache, most
+   frequent first (in-process vector backends only: the neo4j backend
+   recalls inline with the ranking query)
+
+Entity-only queries ("movies like Parasite") skip both: they never call
+the embedding API. Everything stops at WARMUP_BUDGET_SECONDS; the report
+says how much of the logged traffic is covered.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from app.config import (
+    LEXICAL_K,
+    WARMUP_BATCH_SIZE,
+    WARMUP_BUDGET_SECONDS,
+    WARMUP_QUERY_LOG,
+    WARMUP_TOP_N,
+)
+from app.models.response import ParsedQuery
+from app.query_log import read_query_log
+from app.recsys.lexical import get_lexical_index, normalize_text
+from app.recsys.query_cache import get_query_cache
+from app.recsys.vector_index import get_vector_index
+from app.services.embeddings import EmbeddingService
+from app.services.query_understanding import QueryUnderstandingService
+from app.services.recommender import RecommenderService
+
+logger = logging.getLogger(__name__)
+
+
+def top_queries(path: str, n: int) -> tuple[list[tuple[ParsedQuery, str, int]], int]:
+    """
+    The n most frequent parsed queries of a log with a raw query text of
+    each and their counts, and the number of records read.
+    """
+    counts = Counter()
+    parsed_by_key = {}
+    records = 0
+    for record in read_query_log(path):
+        if "parsed" in record:
+            parsed = ParsedQuery.model_validate(record["parsed"])
+        elif record.get("query"):
+            parsed = QueryUnderstandingService.parse(record["query"])
+        else:
+            continue
+        records += 1
+        filters = parsed.filters.model_dump_json(exclude_none=True) if parsed.filters is not None else None
+        key = (normalize_text(parsed.semantic_query), filters)
+        counts[key] += 1
+        parsed_by_key.setdefault(key, (parsed, record.get("query") or parsed.semantic_query))
+    return [(*parsed_by_key[key], count) for key, count in counts.most_common(n)], records
+
+
+def warm_up_caches(
+    embedding_service: EmbeddingService,
+    path: str = WARMUP_QUERY_LOG,
+    top_n: int = WARMUP_TOP_N,
+    budget_seconds: float = WARMUP_BUDGET_SECONDS,
+    batch_size: int = WARMUP_BATCH_SIZE,
+) -> dict:
+    start = time.perf_counter()
+    deadline = start + budget_seconds
+    queries, records = top_queries(path, top_n)
+
+    # Entity-only queries never embed, so there is nothing to warm for them
+    # (matched on the raw text, as RecommenderService does)
+    lexical_index = get_lexical_index()
+    if lexical_index is not None:
+        queries = [
+            (parsed, count) for parsed, raw, count in queries
+            if not lexical_index.search(raw, k=LEXICAL_K).entity_only
+        ]
+    else:
+        queries = [(parsed, count) for parsed, _, count in queries]
+
+    # 1. Embeddings, a few large calls
+    query_cache = get_query_cache()
+    missing = list(dict.fromkeys(
+        parsed.semantic_query for parsed, _ in queries if parsed.semantic_query not in query_cache
+    ))
+    embedded = 0
+    for offset in range(0, len(missing), batch_size):
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            break
+        batch = missing[offset:offset + batch_size]
+        try:
+            vectors = embedding_service.embed_batch(batch, timeout=left)
+        except Exception as exc:
+            logger.warning("Warm-up embedding batch failed: %s", exc)
+            break
+        for text, vector in zip(batch, vectors):
+            query_cache.put(text, vector)
+        embedded += len(batch)
+
+    # 2. Candidate lists, most frequent first
+    recommender = RecommenderService(embedding_service)
+    index = get_vector_index()
+    warmed, covered = 0, 0
+    for parsed, count in queries:
+        if time.perf_counter() >= deadline:
+            break
+        vector = query_cache.get(parsed.semantic_query)
+        if vector is None:
+            continue
+        if index is None:
+            covered += count
+            continue
+        mask = index.bitmaps.for_query(parsed.filters)
+        try:
+            recommender.candidates(parsed, vector, mask, index)
+        except Exception as exc:
+            logger.warning("Warm-up candidate search failed: %s", exc)
+            break
+        warmed += 1
+        covered += count
+
+    return {
+        "records": records,
+        "queries": len(queries),
+        "embedded": embedded,
+        "candidates": warmed,
+        # Share of the logged requests whose query is now fully cached
+        "coverage": round(covered / records, 4) if records else 0.0,
+        "seconds": round(time.perf_counter() - start, 3),
+        "budget_exhausted": time.perf_counter() >= deadline,
+    }
+
+
+# -------------------------
+# READINESS
+# -------------------------
+
+_report = None
+_ready = threading.Event()
+
+
+def start_warmup(embedding_service: EmbeddingService) -> None:
+    """Warm the caches on a background thread; is_ready() turns true when done (at once without a log)."""
+    if not WARMUP_QUERY_LOG:
+        _ready.set()
+        return
+
+    def run():
+        global _report
+        try:
+            _report = warm_up_caches(embedding_service)
+            logger.info("Cache warm-up: %s", _report)
+        except Exception as exc:
+            # A missing or unreadable log must not keep the instance out of rotation
+            logger.warning("Cache warm-up failed: %s", exc)
+            _report = {"error": str(exc)}
+        finally:
+            _ready.set()
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def warmup_report() -> dict | None:
+    return _report
@@ -0,0 +1,128 @@
+"""
+Deterministic, OpenAI-compatible embedding server for benchmarks.
+
+Vectors are a normalized bag of hashed token vectors, so texts that
+share words land close together and the same text always gets the
+same vector. No network, no API key.
+
+Usage:
+    python -m scripts.bench.fake_embeddings --port 8765 --dims 3072
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@lru_cache(maxsize=100_000)
+def _token_vector(token: str, dims: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dims).astype(np.float32)
+
+
+def fake_embedding(text: str, dims: int) -> np.ndarray:
+    tokens = TOKEN_RE.findall(text.lower()) or [text]
+    vector = np.zeros(dims, dtype=np.float32)
+    for token in tokens:
+        vector += _token_vector(token, dims)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class FakeEmbeddingServer:
+    """Threaded HTTP server answering POST /v1/embeddings."""
+
+    def __init__(self, dims: int = 3072, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.dims = dims
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                body = server.handle(payload)
+
+                raw = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle(self, payload: dict) -> dict:
+        self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        inputs = payload.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dims = payload.get("dimensions") or self.dims
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text, self.dims)[:dims]
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            if payload.get("encoding_format") == "base64":
+                encoded = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                encoded = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": encoded})
+
+        return {
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "fake"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    def start(self) -> "FakeEmbeddingServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeEmbeddingServer(args.dims, args.latency_ms, args.host, args.port)
+    print(f"Fake embeddings serving on {server.base_url}")
+    server._httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+In-memory stand-in for the Neo4j driver behind app.db.neo4j.run.
+
+It answers the statements the serving path issues (vector candidates,
+debug counts, award lookups, rerank co-occurrence, the filter bitmap
+scan, the bulk scoring feature export) over a synthetic
+catalog whose embeddings come from the fake embedding server, so
+benchmark results are deterministic and need no database.
+
+Install with install_fake_driver(); app.db.neo4j keeps doing its own
+bookkeeping (query counts, PROFILE capture) on top.
+"""
+
+import time
+
+import numpy as np
+
+from scripts.bench.fake_embeddings import fake_embedding
+
+GENRES = ["Drama", "Comedy", "Thriller", "Romance", "Horror", "Animation", "Documentary", "Science Fiction", "Crime"]
+LANGUAGES = ["en"] * 6 + ["es"] * 3 + ["fr", "ko", "ja", "it"]
+AWARDS = [
+    ("Academy Awards", "Best Picture"),
+    ("Premios Goya", "Best Film"),
+    ("Cannes Film Festival", "Palme d’Or"),
+    ("Golden Globe Awards", "Best Motion Picture – Non-English Language"),
+]
+# Directors are assigned round-robin (no RNG draws) so catalogs stay reproducible
+DIRECTORS = ["Pedro Almodóvar", "Bong Joon-ho", "Céline Sciamma", "Alejandro González Iñárritu", "Greta Gerwig", "Denis Villeneuve"]
+VOCABULARY = (
+    "love war family heist space robot ghost city night summer island detective "
+    "revenge friendship comedy road trip music dance crime murder secret dream "
+    "school prison king queen zombie alien ocean mountain desert train hotel"
+).split()
+
+
+def build_catalog(size: int, dims: int, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+
+    movies = []
+    texts = []
+    for i in range(size):
+        words = rng.choice(VOCABULARY, size=3, replace=False)
+        genres = list(rng.choice(GENRES, size=rng.integers(1, 3), replace=False))
+        awards = []
+        if rng.random() < 0.08:
+            event, category = AWARDS[rng.integers(len(AWARDS))]
+            awards.append({"event": event, "category": category, "result": "won" if rng.random() < 0.4 else "nominated"})
+
+        title = " ".join(w.capitalize() for w in words)
+        movies.append(
+            {
+                "tmdb_id": 100_000 + i,
+                "title": title,
+                "original_title": title,
+                "release_date": f"{int(rng.integers(1960, 2026))}-0{int(rng.integers(1, 10))}-15",
+                "original_language": str(rng.choice(LANGUAGES)),
+                "popularity": float(rng.gamma(2.0, 12.0)),
+                "genres": genres,
+                "awards": awards,
+                "directors": [DIRECTORS[i % len(DIRECTORS)]],
+                "keywords": [str(w) for w in words],
+            }
+        )
+        texts.append(f"{title} {' '.join(genres)} {' '.join(words)}")
+
+    matrix = np.stack([fake_embedding(t, dims) for t in texts]).astype(np.float32)
+    return {"movies": movies, "matrix": matrix, "by_id": {m["tmdb_id"]: i for i, m in enumerate(movies)}}
+
+
+def write_embeddings_parquet(catalog_ids: list[int], matrix: np.ndarray, path: str) -> str:
+    """Persist the fake catalog in films_embeddings.parquet layout for in-process backends."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    embeddings = pa.FixedSizeListArray.from_arrays(pa.array(matrix.reshape(-1)), matrix.shape[1])
+    table = pa.table({"tmdb_id": pa.array(catalog_ids, type=pa.int64()), "embedding": embeddings})
+    pq.write_table(table, path)
+    return path
+
+
+class FakeGraph:
+    def __init__(self, size: int = 5000, dims: int = 3072, latency_ms: float = 0.0, seed: int = 7):
+        catalog = build_catalog(size, dims, seed)
+        self.movies = catalog["movies"]
+        self.matrix = catalog["matrix"]
+        self.by_id = catalog["by_id"]
+        self.latency_ms = latency_ms
+
+    def write_embeddings(self, path: str) -> str:
+        return write_embeddings_parquet([m["tmdb_id"] for m in self.movies], self.matrix, path)
+
+    def write_films_core(self, path: str) -> str:
+        """Persist the catalog in films_core.parquet layout for the lexical index."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fields = ["tmdb_id", "title", "original_title", "release_date", "genres", "directors"]
+        table = pa.Table.from_pylist([{f: m[f] for f in fields} | {"actors": [], "keywords": []} for m in self.movies])
+        pq.write_table(table, path)
+        return path
+
+    # -------------------------
+    # NODE HELPERS
+    # -------------------------
+
+    def _node(self, row: int) -> dict:
+        m = self.movies[row]
+        return {
+            "tmdb_id": m["tmdb_id"],
+            "title": m["title"],
+            "original_title": m["original_title"],
+            "release_date": m["release_date"],
+            "original_language": m["original_language"],
+            "popularity": m["popularity"],
+            "embedding": self.matrix[row].tolist(),
+        }
+
+    def _year(self, row: int) -> int | None:
+        date = self.movies[row]["release_date"]
+        return int(date[:4]) if date and len(date) >= 4 else None
+
+    def _passes(self, row: int, params: dict, query: str) -> bool:
+        m = self.movies[row]
+        year = self._year(row)
+
+        if m["tmdb_id"] in params.get("exclude_ids", ()):
+            return False
+
+        year_from = params.get("year_from")
+        if year_from is not None and (year is None or year < year_from):
+            return False
+        if params.get("min_year") is not None and (year is None or year < params["min_year"]):
+            return False
+        if params.get("max_year") is not None and (year is None or year > params["max_year"]):
+            return False
+        if params.get("language") and m["original_language"] != params["language"]:
+            return False
+        if params.get("genre") and params["genre"] not in m["genres"]:
+            return False
+        if params.get("award_event"):
+            wanted = (params["award_event"], params.get("award_result") or "won")
+            if not any((a["event"], a["result"]) == wanted for a in m["awards"]):
+                return False
+        if "Best Picture" in query:
+            if not any(a["category"] == "Best Picture" and a["result"] == "won" for a in m["awards"]):
+                return False
+        return True
+
+    # -------------------------
+    # STATEMENT HANDLERS
+    # -------------------------
+
+    def _vector_hits(self, params: dict) -> list[tuple[int, float]]:
+        if "source_ids" in params:
+            return self._lexical_hits({**params, "lexical_ids": params["source_ids"]}, set())
+        if "candidates" in params:
+            # In-process backends hand over (tmdb_id, score) pairs to UNWIND
+            return [(self.by_id[c["tmdb_id"]], c["score"]) for c in params["candidates"] if c["tmdb_id"] in self.by_id]
+
+        embedding = np.asarray(params["embedding"], dtype=np.float32)
+        scores = self.matrix[:, : embedding.shape[0]] @ embedding
+        k = min(int(params["k"]), len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        # queryNodes reports cosine as (1 + cos) / 2
+        return [(int(row), (1.0 + float(scores[row])) / 2) for row in top]
+
+    def _lexical_hits(self, params: dict, seen: set[int]) -> list[tuple[int, float]]:
+        embedding = np.asarray(params["embedding"], dtype=np.float32)
+        rows = [self.by_id[i] for i in params["lexical_ids"] if i in self.by_id and self.by_id[i] not in seen]
+        return [(row, (1.0 + float(self.matrix[row, : embedding.shape[0]] @ embedding)) / 2) for row in rows]
+
+    def _vector_query(self, query: str, params: dict) -> list[dict]:
+        hits = self._vector_hits(params)
+        if params.get("lexical_ids"):
+            hits += self._lexical_hits(params, {row for row, _ in hits})
+        hits = [(row, score) for row, score in hits if self._passes(row, params, query)]
+
+        if "count(*)" in query:
+            return [{"count": len(hits)}]
+
+        if "final_score" in query:
+            rows = []
+            for row, similarity in hits:
+                m = self.movies[row]
+                year = self._year(row)
+                cb = 0.05 if "Comedy" in m["genres"] else 0
+                ab = 0.05 if m["awards"] else 0
+                if year is None or year < 2000:
+                    rb = 0
+                elif year >= 2018:
+                    rb = 0.05
+                else:
+                    rb = (year - 2000.0) / (2018 - 2000) * 0.05
+                lb = params.get("lexical_boosts", {}).get(str(m["tmdb_id"]), 0.0)
+                rows.append(
+                    {
+                        "node": self._node(row),
+                        "similarity": similarity,
+                        "recency_boost": rb,
+                        "award_boost": ab,
+                        "comedy_boost": cb,
+                        "lexical_boost": lb,
+                        "final_score": similarity + rb + ab + cb + lb,
+                    }
+                )
+            rows.sort(key=lambda r: r["final_score"], reverse=True)
+            return rows[: params.get("limit", len(rows))]
+
+        if "AS tmdb_id" in query:
+            return [{"tmdb_id": self.movies[row]["tmdb_id"], "score": score} for row, score in hits]
+        return [{"node": self._node(row), "score": score} for row, score in hits]
+
+    def _awards(self, params: dict) -> list[dict]:
+        row = self.by_id.get(params["tmdb_id"])
+        if row is None:
+            return []
+        return [{"name": e} for e in sorted({a["event"] for a in self.movies[row]["awards"]})]
+
+    def _rerank_signals(self, params: dict) -> list[dict]:
+        rows = [self.by_id[i] for i in params["movie_ids"] if i in self.by_id]
+        out = []
+        for row in rows:
+            genres = set(self.movies[row]["genres"])
+            shared = set()
+            for other in rows:
+                if other != row:
+                    shared |= genres & set(self.movies[other]["genres"])
+            out.append(
+                {
+                    "id": self.movies[row]["tmdb_id"],
+                    "shared_actors": 0,
+                    "director_cluster": 0,
+                    "shared_genres": len(shared),
+                    "popularity": self.movies[row]["popularity"],
+                }
+            )
+        return out
+
+    def _pair_signals(self, params: dict) -> list[dict]:
+        out = []
+        for pair in params["pairs"]:
+            a, b = self.by_id.get(pair["source"]), self.by_id.get(pair["target"])
+            if a is None or b is None:
+                continue
+            shared = set(self.movies[a]["genres"]) & set(self.movies[b]["genres"])
+            out.append({**pair, "shared_actors": 0, "director_cluster": 0, "shared_genres": len(shared)})
+        return out
+
+    def _embeddings(self, params: dict) -> list[dict]:
+        return [{"embedding": self.matrix[self.by_id[i]].tolist()} for i in params["ids"] if i in self.by_id]
+
+    def _nodes(self, params: dict) -> list[dict]:
+        return [self._node(self.by_id[i]) for i in params["ids"] if i in self.by_id]
+
+    def _filter_attributes(self) -> list[dict]:
+        return [
+            {
+                "tmdb_id": m["tmdb_id"],
+                "release_date": m["release_date"],
+                "language": m["original_language"],
+                "genres": m["genres"],
+                "awards": [[a["event"], a["result"]] for a in m["awards"]],
+                "best_picture": any(a["category"] == "Best Picture" and a["result"] == "won" for a in m["awards"]),
+            }
+            for m in self.movies
+        ]
+
+    def _film_features(self) -> list[dict]:
+        return [
+            {
+                "tmdb_id": m["tmdb_id"],
+                "release_date": m["release_date"],
+                "language": m["original_language"],
+                "popularity": m["popularity"],
+                "genres": m["genres"],
+                "awards": [[a["event"], a["result"]] for a in m["awards"]],
+                "actor_ids": [],
+                "director_ids": m["directors"],
+            }
+            for m in self.movies
+        ]
+
+    def _graph_edges(self) -> list[dict]:
+        edges = []
+        for m in self.movies:
+            edges.extend({"tmdb_id": m["tmdb_id"], "kind": "person", "entity": d} for d in m["directors"])
+            edges.extend({"tmdb_id": m["tmdb_id"], "kind": "keyword", "entity": k} for k in m["keywords"])
+        return edges
+
+    def _popular(self, params: dict) -> list[dict]:
+        rows = []
+        for m in self.movies:
+            wins = sum(a["result"] == "won" for a in m["awards"])
+            rows.append(
+                {
+                    "tmdb_id": m["tmdb_id"],
+                    "title": m["title"],
+                    "original_title": m["original_title"],
+                    "release_date": m["release_date"],
+                    "awards": [[a["event"], a["result"]] for a in m["awards"]],
+                    "popular_score": float(np.log(1 + m["popularity"]) + 0.5 * wins),
+                }
+            )
+        rows.sort(key=lambda r: -r["popular_score"])
+        return rows[: params["limit"]]
+
+    def execute(self, query: str, params: dict | None = None) -> list[dict]:
+        params = params or {}
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        if "db.index.vector.queryNodes" in query or "UNWIND $candidates" in query or "$source_ids" in query:
+            return self._vector_query(query, params)
+        if "RETURN DISTINCT e.name" in query:
+            return self._awards(params)
+        if "UNWIND $pairs" in query:
+            return self._pair_signals(params)
+        if "shared_actors" in query:
+            return self._rerank_signals(params)
+        if "RETURN m.embedding AS embedding" in query:
+            return self._embeddings(params)
+        if "n.tmdb_id IN $ids" in query:
+            return self._nodes(params)
+        if "AS director_ids" in query:
+            return self._film_features()
+        if "AS best_picture" in query:
+            return self._filter_attributes()
+        if "AS entity" in query:
+            return self._graph_edges()
+        if "AS popular_score" in query:
+            return self._popular(params)
+        return []
+
+
+# -------------------------
+# DRIVER SURFACE
+# -------------------------
+
+class FakeRecord(dict):
+    def data(self) -> dict:
+        return dict(self)
+
+
+class FakeSummary:
+    profile = None
+    plan = None
+
+
+class FakeResult:
+    def __init__(self, rows: list[dict]):
+        self._rows = rows
+
+    def data(self) -> list[dict]:
+        return self._rows
+
+    def __iter__(self):
+        return (FakeRecord(r) for r in self._rows)
+
+    def consume(self) -> FakeSummary:
+        return FakeSummary()
+
+
+class FakeTransaction:
+    def __init__(self, graph: FakeGraph):
+        self._graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, params: dict | None = None, **kwargs) -> FakeResult:
+        if query.lstrip().upper().startswith("PROFILE "):
+            query = query.lstrip()[len("PROFILE "):]
+        return FakeResult(self._graph.execute(query, {**(params or {}), **kwargs}))
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+
+class FakeSession(FakeTransaction):
+    def close(self) -> None:
+        pass
+
+    def begin_transaction(self, **kwargs) -> FakeTransaction:
+        return FakeTransaction(self._graph)
+
+    def execute_read(self, work, *args, **kwargs):
+        return work(FakeTransaction(self._graph), *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(FakeTransaction(self._graph), *args, **kwargs)
+
+
+class FakeDriver:
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    def session(self, **kwargs) -> FakeSession:
+        return FakeSession(self.graph)
+
+    def verify_connectivity(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def install_fake_driver(graph: FakeGraph) -> FakeDriver:
+    import app.db.neo4j as neo4j_module
+
+    driver = FakeDriver(graph)
+    neo4j_module._driver = driver
+    return driver
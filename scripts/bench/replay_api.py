@@ -0,0 +1,293 @@
+"""
+Replay a recorded query log against the API and report latency.
+
+Runs the FastAPI app in-process (or against --url) at a fixed
+concurrency, with local stand-ins by default:
+- fake embedding server (deterministic, OpenAI-compatible)
+- in-memory fake of the Neo4j driver behind app.db.neo4j.run
+
+Reports throughput, p50/p95/p99 latency and a per-stage breakdown
+taken from the Server-Timing headers, and writes everything to a JSON
+file tagged with the current commit so runs can be compared.
+
+Usage:
+    python -m scripts.bench.replay_api --log scripts/bench/queries.sample.jsonl
+    python -m scripts.bench.replay_api --graph neo4j --concurrency 16
+    python -m scripts.bench.replay_api --compare data/benchmarks/replay_<old>.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_LOG = "scripts/bench/queries.sample.jsonl"
+DEFAULT_OUT_DIR = "data/benchmarks"
+
+
+# -------------------------
+# QUERY LOG
+# -------------------------
+
+def load_query_log(path: str) -> list[dict]:
+    """
+    Read a JSONL (optionally gzip'd) query log, or a QUERY_LOG_DIR of rotated files.
+
+    Only "query" is required; "limit" and "debug" are replayed when present.
+    """
+    from app.query_log import read_query_log
+
+    entries = []
+    for record in read_query_log(path):
+        if record.get("query"):
+            entries.append(
+                {
+                    "query": record["query"],
+                    "limit": int(record.get("limit", 5)),
+                    "debug": bool(record.get("debug", False)),
+                }
+            )
+    return entries
+
+
+def parse_server_timing(header: str | None) -> dict[str, float]:
+    stages = {}
+    if not header:
+        return stages
+    for entry in header.split(","):
+        parts = [p.strip() for p in entry.split(";")]
+        for p in parts[1:]:
+            if p.startswith("dur="):
+                stages[parts[0]] = float(p[4:])
+    return stages
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+# -------------------------
+# TARGETS
+# -------------------------
+
+def _in_process_client(args):
+    """Build a TestClient for app.main, wiring in the local stand-ins first."""
+    stand_ins = {}
+
+    if args.graph == "fake":
+        from scripts.bench.fake_graph import FakeGraph
+
+        graph = FakeGraph(size=args.catalog_size, dims=args.dims, latency_ms=args.graph_latency_ms)
+        stand_ins["graph"] = graph
+        os.environ["LEXICAL_INDEX_PATH"] = graph.write_films_core(
+            os.path.join(tempfile.mkdtemp(prefix="promptcorn-bench-"), "films_core.parquet")
+        )
+        if args.vector_backend and args.vector_backend != "neo4j":
+            os.environ["EMBEDDINGS_PATH"] = graph.write_embeddings(
+                os.path.join(tempfile.mkdtemp(prefix="promptcorn-bench-"), "films_embeddings.parquet")
+            )
+            # Never pick up the real artifact or IVF index directory
+            bench_dir = os.path.dirname(os.environ["EMBEDDINGS_PATH"])
+            os.environ["EMBEDDING_ARTIFACT"] = os.path.join(bench_dir, "films_embeddings")
+            os.environ["VECTOR_IVF_PATH"] = os.path.join(bench_dir, "ivf")
+
+    if args.vector_backend:
+        os.environ["VECTOR_BACKEND"] = args.vector_backend
+
+    if args.embeddings == "fake":
+        from scripts.bench.fake_embeddings import FakeEmbeddingServer
+
+        server = FakeEmbeddingServer(dims=args.dims, latency_ms=args.embedding_latency_ms).start()
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        stand_ins["embedding_server"] = server
+
+    # Import after the environment is in place: app.config reads it at import
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    if args.graph == "fake":
+        from scripts.bench.fake_graph import install_fake_driver
+
+        install_fake_driver(stand_ins["graph"])
+
+    return TestClient(app), stand_ins
+
+
+def _remote_client(url: str):
+    import httpx
+
+    return httpx.Client(base_url=url, timeout=60.0)
+
+
+# -------------------------
+# REPLAY
+# -------------------------
+
+def replay(client, entries: list[dict], concurrency: int) -> list[dict]:
+    def send(entry: dict) -> dict:
+        start = time.perf_counter()
+        response = client.post("/recommend", json=entry)
+        latency_ms = (time.perf_counter() - start) * 1000
+        return {
+            "status": response.status_code,
+            "latency_ms": latency_ms,
+            "stages": parse_server_timing(response.headers.get("server-timing")),
+            "neo4j_queries": _neo4j_queries(response.headers.get("server-timing")),
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(send, entries))
+
+
+def _neo4j_queries(header: str | None) -> int | None:
+    if not header:
+        return None
+    for entry in header.split(","):
+        if entry.strip().startswith("neo4j;"):
+            desc = entry.split('desc="', 1)[-1].split(" ", 1)[0]
+            return int(desc) if desc.isdigit() else None
+    return None
+
+
+def summarize(samples: list[dict], wall_seconds: float) -> dict:
+    ok = [s for s in samples if s["status"] == 200]
+    stages = defaultdict(list)
+    for s in ok:
+        for name, ms in s["stages"].items():
+            stages[name].append(ms)
+    queries = [s["neo4j_queries"] for s in ok if s["neo4j_queries"] is not None]
+
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": _percentiles([s["latency_ms"] for s in ok]),
+        "stages_ms": {name: _percentiles(values) for name, values in sorted(stages.items())},
+        "neo4j_queries_per_request": _percentiles(queries),
+    }
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    s = report["summary"]
+    print(f"\nRequests: {s['requests']}  errors: {s['errors']}  throughput: {s['throughput_rps']} req/s")
+
+    def line(name: str, current: dict, previous: dict | None) -> None:
+        row = f"  {name:<22} p50 {current['p50']:>9.2f}  p95 {current['p95']:>9.2f}  p99 {current['p99']:>9.2f} ms"
+        if previous:
+            delta = (current["p95"] - previous["p95"]) / previous["p95"] * 100 if previous["p95"] else 0.0
+            row += f"   p95 {delta:+.1f}% vs baseline"
+        print(row)
+
+    base = baseline["summary"] if baseline else None
+    if s["latency_ms"]:
+        line("end-to-end", s["latency_ms"], base["latency_ms"] if base else None)
+    for name, stats in s["stages_ms"].items():
+        line(name, stats, base["stages_ms"].get(name) if base else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=DEFAULT_LOG, help="JSONL query log to replay")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=1, help="replay the log N times")
+    parser.add_argument("--warmup", type=int, default=5, help="requests sent before measuring")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--graph", choices=["fake", "neo4j"], default="fake")
+    parser.add_argument("--embeddings", choices=["fake", "openai"], default="fake")
+    parser.add_argument(
+        "--vector-backend",
+        choices=["neo4j", "exact", "float16", "int8", "binary", "matryoshka", "ivf"],
+        help="override VECTOR_BACKEND (in-process backends read the fake catalog's embeddings)",
+    )
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--graph-latency-ms", type=float, default=0.0)
+    parser.add_argument("--out", help="result JSON path (default: data/benchmarks/replay_<timestamp>.json)")
+    parser.add_argument("--compare", help="previous result JSON to diff against")
+    args = parser.parse_args()
+
+    stand_ins = {}
+    if args.url:
+        client = _remote_client(args.url)
+    else:
+        client, stand_ins = _in_process_client(args)
+
+    # Read after the stand-ins set their environment: the reader imports
+    # app.config, which reads it once at import
+    entries = load_query_log(args.log) * args.repeat
+    if not entries:
+        raise SystemExit(f"No queries found in {args.log}")
+
+    with client:
+        # Startup cache warm-up (WARMUP_QUERY_LOG) runs before traffic, as behind a readiness probe
+        while client.get("/ready").status_code == 503:
+            time.sleep(0.05)
+        if args.warmup:
+            replay(client, entries[: args.warmup], concurrency=1)
+
+        start = time.perf_counter()
+        samples = replay(client, entries, args.concurrency)
+        wall_seconds = time.perf_counter() - start
+
+    if "embedding_server" in stand_ins:
+        stand_ins["embedding_server"].stop()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "log": args.log,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "target": args.url or "in-process",
+            "graph": args.graph,
+            "embeddings": args.embeddings,
+            "vector_backend": args.vector_backend or os.getenv("VECTOR_BACKEND", "neo4j"),
+            "catalog_size": args.catalog_size,
+            "dims": args.dims,
+            "embedding_latency_ms": args.embedding_latency_ms,
+            "graph_latency_ms": args.graph_latency_ms,
+        },
+        "summary": summarize(samples, wall_seconds),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    out = args.out or os.path.join(DEFAULT_OUT_DIR, f"replay_{time.strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Profile API cold start: import-time breakdown and time-to-first-ready.
+
+Two measurements, each in fresh interpreters:
+- `python -X importtime -c "import app.main"` → self time summed per
+  top-level package, plus the cumulative time of each app module
+- time-to-ready: interpreter start → `import app.main` → lifespan done
+  (pool warm-up, in-memory snapshots, API client) → first /recommend
+  answered, with the same local stand-ins as replay_api (fake graph,
+  fake embeddings); building the stand-ins is not counted
+
+Writes a JSON report tagged with the current commit, like replay_api.
+
+Usage:
+    python -m scripts.bench.startup_profile
+    python -m scripts.bench.startup_profile --runs 5 --vector-backend exact
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+FIRST_QUERY = {"query": "feel-good road trip comedies", "limit": 5}
+
+
+# -------------------------
+# IMPORT TIME
+# -------------------------
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every line of -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append((name, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_profile(top: int) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True,
+    )
+    modules = parse_importtime(proc.stderr)
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in modules:
+        by_package[name.split(".")[0]] += self_us
+    app_modules = sorted(
+        ((name, cumulative) for name, _, cumulative in modules if name.split(".")[0] in ("app", "scripts")),
+        key=lambda item: -item[1],
+    )
+
+    return {
+        "total_ms": sum(by_package.values()) / 1000,
+        "modules": len(modules),
+        "packages_ms": {k: v / 1000 for k, v in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]},
+        "app_modules_cumulative_ms": {k: v / 1000 for k, v in app_modules[:top]},
+    }
+
+
+# -------------------------
+# TIME TO READY
+# -------------------------
+
+def _child(args) -> None:
+    """Runs in a fresh interpreter with the stand-ins' environment; prints phase timings as JSON."""
+    interpreter_ms = (time.time() - args.spawned_at) * 1000
+
+    phases = {"interpreter_ms": interpreter_ms}
+    t = time.perf_counter()
+    import app.main
+
+    phases["import_ms"] = (time.perf_counter() - t) * 1000
+
+    # The fake graph is rebuilt here (same seed) and not counted
+    from scripts.bench.fake_graph import FakeGraph, install_fake_driver
+
+    install_fake_driver(FakeGraph(size=args.catalog_size, dims=args.dims))
+
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app.main.app)
+    t = time.perf_counter()
+    client.__enter__()
+    phases["lifespan_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    client.post("/recommend", json=FIRST_QUERY).raise_for_status()
+    phases["first_request_ms"] = (time.perf_counter() - t) * 1000
+    client.__exit__(None, None, None)
+
+    phases["ready_ms"] = interpreter_ms + phases["import_ms"] + phases["lifespan_ms"]
+    phases["first_answer_ms"] = phases["ready_ms"] + phases["first_request_ms"]
+    print(json.dumps(phases))
+
+
+def ready_profile(args) -> dict:
+    """Median phase timings over args.runs fresh interpreters."""
+    from scripts.bench.fake_embeddings import FakeEmbeddingServer
+    from scripts.bench.fake_graph import FakeGraph
+
+    with tempfile.TemporaryDirectory(prefix="promptcorn-startup-") as tmp:
+        graph = FakeGraph(size=args.catalog_size, dims=args.dims)
+        server = FakeEmbeddingServer(dims=args.dims).start()
+        env = {
+            **os.environ,
+            "OPENAI_BASE_URL": server.base_url,
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "fake"),
+            "EMBEDDING_DIMENSIONS": str(args.dims),
+            "SNAPSHOT_POLL_SECONDS": "0",
+            "LEXICAL_INDEX_PATH": graph.write_films_core(os.path.join(tmp, "films_core.parquet")),
+        }
+        if args.vector_backend:
+            env.update(
+                VECTOR_BACKEND=args.vector_backend,
+                EMBEDDINGS_PATH=graph.write_embeddings(os.path.join(tmp, "films_embeddings.parquet")),
+                EMBEDDING_ARTIFACT=os.path.join(tmp, "films_embeddings"),
+                VECTOR_IVF_PATH=os.path.join(tmp, "ivf"),
+            )
+
+        runs = []
+        try:
+            for _ in range(args.runs):
+                cmd = [
+                    sys.executable, "-m", "scripts.bench.startup_profile", "--child",
+                    "--spawned-at", repr(time.time()),
+                    "--catalog-size", str(args.catalog_size), "--dims", str(args.dims),
+                ]
+                proc = subprocess.run(cmd, capture_output=True, text=True, check=True, env=env)
+                runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        finally:
+            server.stop()
+
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters for time-to-ready (median reported)")
+    parser.add_argument("--top", type=int, default=15, help="packages / modules listed")
+    parser.add_argument(
+        "--vector-backend",
+        choices=["neo4j", "exact", "float16", "int8", "binary", "matryoshka", "ivf"],
+        help="override VECTOR_BACKEND (in-process backends load at startup)",
+    )
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--out", help="result JSON path (default: data/benchmarks/startup_<timestamp>.json)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    # Imported here so a --child interpreter starts with nothing but the stdlib
+    from scripts.bench.replay_api import DEFAULT_OUT_DIR, _git_commit
+
+    imports = import_profile(args.top)
+    ready = ready_profile(args)
+
+    print(f"Import of app.main: {imports['total_ms']:.0f} ms over {imports['modules']} modules")
+    for package, ms in imports["packages_ms"].items():
+        print(f"  {package:<28} {ms:8.1f} ms")
+    print("App modules (cumulative):")
+    for module, ms in imports["app_modules_cumulative_ms"].items():
+        print(f"  {module:<40} {ms:8.1f} ms")
+    print(f"\nTime to ready (median of {args.runs}):")
+    for phase in ("interpreter_ms", "import_ms", "lifespan_ms", "ready_ms", "first_request_ms", "first_answer_ms"):
+        print(f"  {phase[:-3]:<28} {ready[phase]:8.1f} ms")
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "runs": args.runs,
+            "vector_backend": args.vector_backend or os.getenv("VECTOR_BACKEND", "neo4j"),
+            "catalog_size": args.catalog_size,
+            "dims": args.dims,
+        },
+        "imports": imports,
+        "ready": ready,
+    }
+    out = args.out or os.path.join(DEFAULT_OUT_DIR, f"startup_{time.strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+TMDB API stand-in serving recorded responses.
+
+Fixtures are a JSON object {request key: response body}, keyed like the
+TMDB response cache (endpoint + sorted params, credentials excluded),
+so a fixture file can be recorded from a real run's cache. Responses
+carry an ETag and honor If-None-Match; unknown requests get a 404.
+
+Usage:
+    python -m scripts.bench.tmdb_stub --record fixtures.json     # dump data/cache/tmdb.sqlite
+    python -m scripts.bench.tmdb_stub --fixtures fixtures.json --port 8766
+    TMDB_BASE_URL=http://127.0.0.1:8766 TMDB_CACHE_PATH= python -m scripts.refresh_tmdb --since 2025-01-01
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from app.config import TMDB_CACHE_PATH
+from app.ingestion.tmdb_cache import cache_key
+
+
+def record_fixtures(cache_path: str) -> dict:
+    """Every response in a TMDB response cache, as fixtures."""
+    conn = sqlite3.connect(cache_path)
+    try:
+        return {key: json.loads(zlib.decompress(body)) for key, body in conn.execute("SELECT key, body FROM responses")}
+    finally:
+        conn.close()
+
+
+class TMDBStubServer:
+    """Threaded HTTP server answering GET <endpoint> from fixtures."""
+
+    def __init__(self, fixtures: dict, host: str = "127.0.0.1", port: int = 0):
+        self.fixtures = fixtures
+        self.requests = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, raw = server.handle(self.path, self.headers.get("If-None-Match"))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, path: str, if_none_match: str | None) -> tuple[int, dict, bytes]:
+        url = urlsplit(path)
+        key = cache_key(url.path, dict(parse_qsl(url.query)))
+        self.requests.append(key)
+
+        body = self.fixtures.get(key)
+        if body is None:
+            raw = json.dumps({"success": False, "status_code": 34, "status_message": f"No fixture for {key}"})
+            return 404, {"Content-Type": "application/json"}, raw.encode("utf-8")
+
+        raw = json.dumps(body).encode("utf-8")
+        etag = '"' + hashlib.sha256(raw).hexdigest()[:16] + '"'
+        if if_none_match == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"Content-Type": "application/json", "ETag": etag}, raw
+
+    def start(self) -> "TMDBStubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="fixture JSON to serve")
+    parser.add_argument("--record", metavar="OUT", help="write the response cache as fixtures and exit")
+    parser.add_argument("--cache", default=TMDB_CACHE_PATH, help="response cache read by --record")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    if args.record:
+        fixtures = record_fixtures(args.cache)
+        with open(args.record, "w") as f:
+            json.dump(fixtures, f, indent=1, sort_keys=True)
+        print(f"Recorded {len(fixtures)} responses → {args.record}")
+        return
+
+    if not args.fixtures:
+        parser.error("--fixtures is required to serve")
+    with open(args.fixtures) as f:
+        server = TMDBStubServer(json.load(f), args.host, args.port)
+    print(f"TMDB stub serving {len(server.fixtures)} responses on {server.base_url}")
+    server._httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
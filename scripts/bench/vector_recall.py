@@ -0,0 +1,351 @@
+"""
+Recall@k, ranking quality, latency and memory of the vector backends.
+
+Ground truth is exact float32 search over the same matrix. Queries are
+catalog vectors with Gaussian noise, a .npy of real query embeddings, or
+the texts of a query log (embedded in batches), so they behave like
+prompts that land near, but not on, a film.
+
+Per backend and parameter setting:
+- recall@k of the top-k candidates against exact search
+- with --query-log, NDCG@limit of RecommenderService's final ranking
+  when it ranks the backend's candidates instead of the exact ones
+- p50 / p99 search latency, index size and peak memory while building
+- with --neo4j, the same numbers for db.index.vector.queryNodes on
+  movie_embedding_index (the catalog must be the graph's embeddings)
+
+Usage:
+    python -m scripts.bench.vector_recall
+    python -m scripts.bench.vector_recall --synthetic 100000 --dims 3072 --rescore 100,300,1000
+    python -m scripts.bench.vector_recall --queries data/benchmarks/query_embeddings.npy
+    python -m scripts.bench.vector_recall --modes exact,matryoshka --prefix-dims 256,512
+    python -m scripts.bench.vector_recall --modes exact,ivf --nprobe 4,16,64
+    python -m scripts.bench.vector_recall --query-log data/query_logs --neo4j --markdown
+    python -m scripts.bench.vector_recall --graph fake --catalog-size 20000 --dims 256 --query-log scripts/bench/queries.sample.jsonl --neo4j
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.recsys.retrieve import RECALL_QUERY
+from app.recsys.vector_index import ExactIndex, build_index
+from app.recsys.vectors import load_embeddings, normalize_query, normalize_rows
+
+EMBED_BATCH = 256
+
+
+def synthetic_matrix(n: int, dims: int, clusters: int = 64, seed: int = 11) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Clustered unit vectors: closer to real embeddings than uniform noise.
+
+    Per-dimension energy decays with the index, like Matryoshka-trained
+    models where leading dimensions carry most of the signal.
+    """
+    rng = np.random.default_rng(seed)
+    decay = (1.0 / np.sqrt(1.0 + np.arange(dims) / 64.0)).astype(np.float32)
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    assignment = rng.integers(clusters, size=n)
+    matrix = centers[assignment] + 0.8 * rng.standard_normal((n, dims)).astype(np.float32)
+    return np.arange(n, dtype=np.int64), normalize_rows(matrix * decay)
+
+
+def sample_queries(matrix: np.ndarray, n: int, noise: float, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(matrix.shape[0], size=min(n, matrix.shape[0]), replace=False)
+    queries = matrix[rows] + noise * rng.standard_normal((len(rows), matrix.shape[1])).astype(np.float32) / np.sqrt(matrix.shape[1])
+    return normalize_rows(queries)
+
+
+def log_queries(path: str, n: int) -> tuple[list, np.ndarray]:
+    """
+    The first n distinct semantic queries of a query log, parsed, and their
+    embeddings from the configured embedding service.
+    """
+    from app.models.response import ParsedQuery
+    from app.query_log import read_query_log
+    from app.services.embeddings import get_embedding_service
+    from app.services.query_understanding import QueryUnderstandingService
+
+    parsed = {}
+    for record in read_query_log(path):
+        if "parsed" in record:
+            query = ParsedQuery.model_validate(record["parsed"])
+        elif record.get("query"):
+            query = QueryUnderstandingService.parse(record["query"])
+        else:
+            continue
+        if query.semantic_query.strip():
+            parsed.setdefault(query.semantic_query, query)
+        if len(parsed) == n:
+            break
+
+    texts = list(parsed)
+    service = get_embedding_service()
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH):
+        vectors.extend(service.embed_batch(texts[start:start + EMBED_BATCH]))
+    return list(parsed.values()), normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+
+class Neo4jIndex:
+    """db.index.vector.queryNodes behind the in-process search() interface."""
+
+    name = "neo4j"
+
+    def search(self, query: np.ndarray, k: int, mask: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        from app.db.neo4j import read
+
+        rows = read(RECALL_QUERY, {"k": k, "embedding": query.tolist()})
+        # Back from the queryNodes (1 + cos) / 2 scale to cosine
+        return (
+            np.array([r["tmdb_id"] for r in rows], dtype=np.int64),
+            np.array([2 * r["score"] - 1 for r in rows], dtype=np.float32),
+        )
+
+    def nbytes(self) -> int:
+        return 0
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    return len(np.intersect1d(found, truth)) / len(truth)
+
+
+def ndcg(found: list[int], reference: list[int]) -> float:
+    """NDCG of a ranking against the reference one; a film's gain falls linearly with its reference rank."""
+    gains = {tmdb_id: len(reference) - rank for rank, tmdb_id in enumerate(reference)}
+    dcg = sum(gains.get(tmdb_id, 0) / np.log2(rank + 2) for rank, tmdb_id in enumerate(found))
+    ideal = sum(gain / np.log2(rank + 2) for rank, gain in enumerate(sorted(gains.values(), reverse=True)))
+    return dcg / ideal if ideal else 1.0
+
+
+def final_ranking(service, parsed, vector: np.ndarray, hits: tuple[np.ndarray, np.ndarray], limit: int) -> list[int]:
+    """RecommenderService's top `limit` when it ranks the given vector hits."""
+    from app.recsys.query_cache import get_query_cache
+
+    # The query's own embedding, so the service never calls the API
+    get_query_cache().put(parsed.semantic_query, vector.tolist())
+    candidates = [{"tmdb_id": int(i), "score": (1.0 + float(s)) / 2} for i, s in zip(*hits)]
+    results, _ = service.recommend(parsed, limit=limit, candidates=candidates)
+    return [r.tmdb_id for r in results]
+
+
+def evaluate(index, queries: np.ndarray, truth: list[np.ndarray], k: int) -> tuple[dict, list]:
+    """Recall and latency, plus every query's hits for the ranking comparison."""
+    latencies = []
+    recalls = []
+    hits = []
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids, scores = index.search(q, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(recall_at_k(ids, expected))
+        hits.append((ids, scores))
+
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }, hits
+
+
+def backend_configs(
+    modes: list[str],
+    rescore_depths: list[int],
+    prefix_dims: list[int],
+    nprobes: list[int],
+    k: int,
+    nlist: int | None = None,
+) -> list[tuple[str, str, dict]]:
+    configs = []
+    for mode in modes:
+        if mode == "exact":
+            configs.append(("exact", "exact", {}))
+            continue
+        if mode == "ivf":
+            for nprobe in nprobes:
+                configs.append((f"ivf nprobe={nprobe}", mode, {"nprobe": nprobe, "nlist": nlist}))
+            continue
+        if mode == "matryoshka":
+            for dim in prefix_dims:
+                for depth in rescore_depths:
+                    depth = max(depth, k)
+                    configs.append((f"matryoshka-{dim} rescore={depth}", mode, {"prefix_dim": dim, "rescore_depth": depth}))
+            continue
+        for depth in rescore_depths:
+            depth = max(depth, k)
+            configs.append((f"{mode} rescore={depth}", mode, {"rescore_depth": depth}))
+    return configs
+
+
+def fake_catalog(size: int, dims: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The fake graph's catalog, with its driver installed and a fake embedding
+    server answering query embeddings, so every measurement runs offline.
+    """
+    from scripts.bench.fake_embeddings import FakeEmbeddingServer
+    from scripts.bench.fake_graph import FakeGraph, install_fake_driver
+
+    graph = FakeGraph(size=size, dims=dims)
+    install_fake_driver(graph)
+    server = FakeEmbeddingServer(dims=dims).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    ids = np.array([m["tmdb_id"] for m in graph.movies], dtype=np.int64)
+    return ids, normalize_rows(graph.matrix)
+
+
+def format_table(results: list[dict], columns: list[tuple[str, str, int]], markdown: bool) -> str:
+    """`columns` are (result key, header, width); missing values print as "-"."""
+    def cell(row, key):
+        value = row.get(key)
+        return "-" if value is None else str(value)
+
+    if markdown:
+        lines = ["| " + " | ".join(header for _, header, _ in columns) + " |"]
+        lines.append("|" + "|".join(":---" if i == 0 else "---:" for i in range(len(columns))) + "|")
+        lines += ["| " + " | ".join(cell(r, key) for key, _, _ in columns) + " |" for r in results]
+        return "\n".join(lines)
+
+    first, *rest = columns
+    lines = [f"{first[1]:<{first[2]}}" + "".join(f"{header:>{width}}" for _, header, width in rest)]
+    for r in results:
+        lines.append(f"{cell(r, first[0]):<{first[2]}}" + "".join(f"{cell(r, key):>{width}}" for key, _, width in rest))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", help="artifact directory or parquet (default: serving embeddings)")
+    parser.add_argument("--synthetic", type=int, help="use N synthetic vectors instead of --embeddings")
+    parser.add_argument("--graph", choices=["neo4j", "fake"], default="neo4j", help="graph behind --neo4j and the ranking")
+    parser.add_argument("--catalog-size", type=int, default=5000, help="films in the fake graph")
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--queries", help=".npy of query embeddings (default: noisy catalog rows)")
+    parser.add_argument("--query-log", help="JSONL query log (file or directory): embeds its queries and compares final rankings")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=8.0)
+    parser.add_argument("-k", type=int, default=100, help="candidate pool size (K_POOL)")
+    parser.add_argument("--limit", type=int, default=10, help="final ranking depth for NDCG")
+    parser.add_argument("--modes", default="exact,float16,int8,binary,matryoshka")
+    parser.add_argument("--rescore", default="100,300,1000", help="comma-separated rescore depths")
+    parser.add_argument("--prefix-dims", default="256,512", help="comma-separated Matryoshka prefix widths")
+    parser.add_argument("--nprobe", default="4,16,64", help="comma-separated IVF probe counts")
+    parser.add_argument("--nlist", type=int, help="IVF cell count (default: 4·√N)")
+    parser.add_argument("--neo4j", action="store_true", help="also measure db.index.vector.queryNodes")
+    parser.add_argument("--markdown", action="store_true", help="print the comparison as a Markdown table")
+    parser.add_argument("--out", default="data/benchmarks/vector_recall.json")
+    args = parser.parse_args()
+
+    if args.graph == "fake":
+        ids, matrix = fake_catalog(args.catalog_size, args.dims)
+    elif args.synthetic:
+        ids, matrix = synthetic_matrix(args.synthetic, args.dims)
+    else:
+        ids, matrix = load_embeddings(args.embeddings)
+
+    parsed = None
+    if args.query_log:
+        parsed, queries = log_queries(args.query_log, args.num_queries)
+        if queries.shape[1] != matrix.shape[1]:
+            raise SystemExit(f"Query embeddings have {queries.shape[1]} dims, the catalog {matrix.shape[1]}")
+    elif args.queries:
+        queries = np.stack([normalize_query(q) for q in np.load(args.queries)])
+    else:
+        queries = sample_queries(matrix, args.num_queries, args.noise)
+
+    print(f"Catalog: {matrix.shape[0]} × {matrix.shape[1]}  queries: {len(queries)}  k={args.k}")
+
+    exact = ExactIndex(ids, matrix)
+    truth = [exact.search(q, args.k)[0] for q in queries]
+
+    service = reference = None
+    if parsed is not None:
+        from app.services.embeddings import get_embedding_service
+        from app.services.recommender import RecommenderService
+
+        # Reference: the service's final ranking over the exact candidates
+        service = RecommenderService(get_embedding_service())
+        reference = [
+            final_ranking(service, p, q, exact.search(q, args.k), args.limit) for p, q in zip(parsed, queries)
+        ]
+
+    modes = args.modes.split(",")
+    depths = [int(d) for d in args.rescore.split(",")]
+    prefix_dims = [int(d) for d in args.prefix_dims.split(",") if int(d) < matrix.shape[1]]
+    nprobes = [int(p) for p in args.nprobe.split(",")]
+    configs = backend_configs(modes, depths, prefix_dims, nprobes, args.k, args.nlist)
+    if args.neo4j:
+        configs.append(("neo4j queryNodes", "neo4j", {}))
+    results = []
+    ivf = None
+
+    for label, backend, options in configs:
+        tracemalloc.start()
+        start = time.perf_counter()
+        built = backend != "neo4j"
+        if backend == "neo4j":
+            index = Neo4jIndex()
+        elif backend == "ivf" and ivf is not None:
+            # nprobe is a query-time knob: cluster once, sweep the probes
+            ivf.nprobe = options["nprobe"]
+            index = ivf
+            built = False
+        else:
+            index = build_index(backend, ids, matrix, **options)
+            if backend == "ivf":
+                ivf = index
+        build_seconds = time.perf_counter() - start
+        build_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        metrics, hits = evaluate(index, queries, truth, args.k)
+        row = {
+            "backend": label,
+            "build_s": round(build_seconds, 3) if built else None,
+            "index_mb": round(index.nbytes() / 1e6, 2) if backend != "neo4j" else None,
+            "build_peak_mb": round(build_peak / 1e6, 2) if built else None,
+            **metrics,
+        }
+        if reference is not None:
+            row[f"ndcg@{args.limit}"] = round(float(np.mean([
+                ndcg(final_ranking(service, p, q, h, args.limit), r)
+                for p, q, h, r in zip(parsed, queries, hits, reference)
+            ])), 4)
+        results.append(row)
+
+    columns = [
+        ("backend", "backend", 26),
+        ("index_mb", "index MB", 10),
+        ("build_peak_mb", "build peak MB", 15),
+        ("build_s", "build s", 9),
+        (f"recall@{args.k}", f"recall@{args.k}", 12),
+    ]
+    if reference is not None:
+        columns.append((f"ndcg@{args.limit}", f"ndcg@{args.limit}", 10))
+    columns += [("p50_ms", "p50 ms", 9), ("p99_ms", "p99 ms", 9)]
+    print("\n" + format_table(results, columns, args.markdown))
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(
+            {
+                "catalog": list(matrix.shape),
+                "queries": len(queries),
+                "query_source": args.query_log or args.queries or f"catalog rows + noise {args.noise}",
+                "k": args.k,
+                "limit": args.limit if reference is not None else None,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nResults → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
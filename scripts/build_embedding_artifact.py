@@ -0,0 +1,40 @@
+import argparse
+
+from app.config import EMBEDDING_ARTIFACT, EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, EMBEDDINGS_PATH, VECTOR_BACKEND
+from app.recsys.vectors import load_parquet, truncate_rows, write_artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert films_embeddings.parquet into the memory-mapped serving artifact")
+    parser.add_argument("--embeddings", default=EMBEDDINGS_PATH)
+    parser.add_argument("--out", default=EMBEDDING_ARTIFACT)
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="model recorded in the header")
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=EMBEDDING_DIMENSIONS,
+        help="truncate + renormalize to this Matryoshka width (must match query embeddings)",
+    )
+    parser.add_argument(
+        "--codes",
+        nargs="*",
+        default=[VECTOR_BACKEND],
+        help="backends (float16 / int8 / binary / matryoshka) whose compressed arrays to store for memory-mapping",
+    )
+    args = parser.parse_args()
+
+    ids, matrix = load_parquet(args.embeddings)
+    if args.dimensions and args.dimensions < matrix.shape[1]:
+        matrix = truncate_rows(matrix, args.dimensions)
+
+    header = write_artifact(args.out, ids, matrix, model=args.model, codes=tuple(args.codes))
+    size_mb = matrix.nbytes / 1e6
+    codes = ", ".join(header["codes"]) or "none"
+    print(
+        f"Embedding artifact → {args.out}: {header['count']} × {header['dims']} "
+        f"({header['model']}, {size_mb:.1f} MB, codes: {codes})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
+import argparse
+import json
+import os
+
 import pandas as pd
 
 FILMS = "data/normalized/films_core.parquet"
+# Partitioned films_core written by export_films_core (see its --since mode)
+FILMS_DATASET = "data/normalized/films_core"
 AWARDS = "data/normalized/awards.csv"
 OUT = "data/normalized/embedding_input.parquet"
 
@@ -53,8 +59,56 @@ def build_embedding_text(film: dict, awards: list[dict]) -> str:
     return "\n".join(lines)
 
 
+MANIFEST = os.path.join(FILMS_DATASET, "_manifest.json")
+
+
+def read_manifest() -> dict:
+    with open(MANIFEST) as f:
+        return json.load(f)
+
+
+def changed_partition_films() -> tuple[pd.DataFrame, list[int], int]:
+    """
+    Films in the partitions rewritten since the last successful build, those
+    partitions, and the partition size. A partition a full export dropped
+    has no file; its rows leave the output.
+    """
+    manifest = read_manifest()
+    changed = manifest.get("pending_partitions", manifest["last_export"]["changed_partitions"])
+    parts = [os.path.join(FILMS_DATASET, f"part-{bucket:05d}.parquet") for bucket in changed]
+    parts = [p for p in parts if os.path.exists(p)]
+    films = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True) if parts else pd.DataFrame(columns=["tmdb_id", "title"])
+    return films, changed, manifest["partition_size"]
+
+
+def clear_pending(built: list[int] | None) -> None:
+    """Drop rebuilt partitions (all, for a full build) from the manifest's pending list."""
+    if not os.path.exists(MANIFEST):
+        return
+    # Re-read: an export may have added partitions while this build ran
+    manifest = read_manifest()
+    pending = manifest.get("pending_partitions", [])
+    manifest["pending_partitions"] = [] if built is None else sorted(set(pending) - set(built))
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST)
+
+
 def main():
-    films_df = pd.read_parquet(FILMS)
+    parser = argparse.ArgumentParser(description="Build the text embedded for each film")
+    parser.add_argument(
+        "--changed-partitions",
+        action="store_true",
+        help="rebuild only films in the partitions exported since the last build, merged into the existing output",
+    )
+    args = parser.parse_args()
+
+    if args.changed_partitions:
+        films_df, changed, partition_size = changed_partition_films()
+        print(f"Rebuilding {len(films_df)} films from partitions {changed}")
+    else:
+        films_df = pd.read_parquet(FILMS)
     awards_df = pd.read_csv(AWARDS)
 
     awards_by_tmdb = {
@@ -78,8 +132,14 @@ def main():
             }
         )
 
-    out_df = pd.DataFrame(rows)
+    out_df = pd.DataFrame(rows, columns=["tmdb_id", "title", "embedding_text"])
+    if args.changed_partitions and os.path.exists(OUT):
+        # Rows of the rewritten partitions are replaced wholesale (films removed there drop out)
+        existing = pd.read_parquet(OUT)
+        kept = existing[~(existing["tmdb_id"] // partition_size).isin(changed)]
+        out_df = pd.concat([kept, out_df]).sort_values("tmdb_id", ignore_index=True)
     out_df.to_parquet(OUT, index=False)
+    clear_pending(changed if args.changed_partitions else None)
 
     print(f"Embedding input built: {len(out_df)} rows → {OUT}")
 
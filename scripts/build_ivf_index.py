@@ -0,0 +1,64 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from app.config import VECTOR_IVF_LISTS, VECTOR_IVF_NPROBE, VECTOR_IVF_PATH
+from app.recsys.ivf import IVFIndex
+from app.recsys.vector_index import SCORE_BLOCK_ROWS
+from app.recsys.vectors import load_embeddings, normalize_rows
+
+
+def changed_ids(index: IVFIndex, ids: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Films in both the index and the embeddings whose vector differs."""
+    order = np.argsort(ids)
+    at = np.searchsorted(ids[order], index.main_ids)
+    at[at == ids.shape[0]] = 0
+    present = np.flatnonzero(ids[order][at] == index.main_ids)
+
+    changed = []
+    for start in range(0, present.shape[0], SCORE_BLOCK_ROWS):
+        rows = present[start:start + SCORE_BLOCK_ROWS]
+        stored = np.asarray(index.vectors[rows])
+        fresh = normalize_rows(np.asarray(matrix[order[at[rows]]], dtype=np.float32))
+        differs = np.abs(stored - fresh).max(axis=1) > 1e-6
+        changed.append(index.main_ids[rows[differs]])
+    return np.concatenate(changed) if changed else np.empty(0, dtype=np.int64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build (or extend) the IVF vector index for VECTOR_BACKEND=ivf")
+    parser.add_argument("--embeddings", help="artifact directory or parquet (default: serving embeddings)")
+    parser.add_argument("--out", default=VECTOR_IVF_PATH)
+    parser.add_argument("--nlist", type=int, default=VECTOR_IVF_LISTS or None, help="cell count (default: 4·√N)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep the existing centroids: insert new films, re-insert changed ones, drop deleted ones",
+    )
+    args = parser.parse_args()
+
+    ids, matrix = load_embeddings(args.embeddings)
+    start = time.perf_counter()
+
+    if args.incremental and os.path.isdir(args.out):
+        index = IVFIndex.load(args.out, nprobe=VECTOR_IVF_NPROBE, mmap=False).compact()
+        deleted = index.ids[~np.isin(index.ids, ids)]
+        changed = changed_ids(index, ids, matrix)
+        index = index.remove(np.concatenate([deleted, changed]))
+        new = ~np.isin(ids, index.ids)
+        index.add(ids[new], matrix[new])
+        print(
+            f"Inserting {int(new.sum())} films ({changed.size} with changed vectors), "
+            f"dropping {deleted.size} deleted, into {index.nlist} existing cells"
+        )
+    else:
+        index = IVFIndex.build(ids, matrix, nlist=args.nlist, nprobe=VECTOR_IVF_NPROBE)
+        print(f"Clustered {len(ids)} films into {index.nlist} cells")
+
+    index.save(args.out)
+    print(f"IVF index saved → {args.out} ({len(index)} films, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from app.config import EMBEDDING_ARTIFACT, EMBEDDINGS_PATH, SIMILAR_K, SIMILAR_PATH
+from app.recsys.similar import (
+    MAX_BOOST,
+    SimilarIndex,
+    blend,
+    display_fields,
+    fingerprints,
+    save_neighbors,
+    vector_candidates,
+    write_similar_to,
+)
+from app.recsys.vector_index import top_k
+from app.recsys.vectors import is_artifact, load_embeddings
+
+
+def merge(old: tuple, new: tuple, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Row-wise union of two (neighbors, scores, similarity) lists, top k by score."""
+    neighbors = np.concatenate([old[0], new[0]], axis=1)
+    scores = np.concatenate([old[1], new[1]], axis=1)
+    similarity = np.concatenate([old[2], new[2]], axis=1)
+
+    out = tuple(np.empty((len(neighbors), k), dtype=a.dtype) for a in (neighbors, scores, similarity))
+    for i in range(len(neighbors)):
+        best = top_k(np.nan_to_num(scores[i], nan=-np.inf), k)
+        out[0][i], out[1][i], out[2][i] = neighbors[i, best], scores[i, best], similarity[i, best]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute 'more like this' neighbors (npz + SIMILAR_TO)")
+    parser.add_argument("--embeddings", help="artifact directory or parquet (default: serving embeddings)")
+    parser.add_argument("--out", default=SIMILAR_PATH)
+    parser.add_argument("-k", type=int, default=SIMILAR_K, help="neighbors kept per film")
+    parser.add_argument("--depth", type=int, help="cosine candidates blended per film (default: 3·k)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes for the blocked matmul")
+    parser.add_argument("--block-rows", type=int, default=1024)
+    parser.add_argument("--incremental", action="store_true", help="recompute only the lists new, re-embedded or deleted films affect")
+    parser.add_argument("--no-graph", action="store_true", help="cosine only: skip cast/director/genre signals")
+    parser.add_argument("--no-write", action="store_true", help="skip SIMILAR_TO relationships")
+    args = parser.parse_args()
+
+    path = args.embeddings or (EMBEDDING_ARTIFACT if is_artifact(EMBEDDING_ARTIFACT) else EMBEDDINGS_PATH)
+    ids, matrix = load_embeddings(path)
+    # Workers memory-map an artifact themselves; a parquet matrix is shipped once per worker
+    source = path if is_artifact(path) else matrix
+    k = min(args.k, len(ids) - 1)
+    depth = max(args.depth or 3 * k, k)
+    use_graph = not args.no_graph
+    start = time.perf_counter()
+
+    fingerprint = fingerprints(matrix)
+    display = display_fields(ids)
+
+    old = SimilarIndex.load(args.out) if args.incremental and os.path.exists(args.out) else None
+    if old is not None and old.fingerprints is None:
+        print(f"{args.out} has no vector fingerprints to diff against; rebuilding in full")
+        old = None
+
+    if old is None:
+        rows = np.arange(len(ids))
+        cand_rows, cand_scores = vector_candidates(source, rows, depth, workers=args.workers, block_rows=args.block_rows)
+        print(f"Vector candidates: {len(ids)} films × {depth} in {time.perf_counter() - start:.1f}s")
+
+        neighbors, scores, similarity = blend(ids, rows, cand_rows, cand_scores, k, use_graph)
+        save_neighbors(args.out, ids, neighbors, scores, similarity, fingerprint, display)
+        if not args.no_write:
+            write_similar_to(ids, neighbors, scores, similarity)
+
+        print(f"Neighbors stored: {len(ids)} films × {k} → {args.out} ({time.perf_counter() - start:.1f}s)")
+        return
+
+    if old.neighbors.shape[1] < k:
+        print(f"{args.out} keeps {old.neighbors.shape[1]} neighbors per film; rebuild without --incremental for k={k}")
+        k = old.neighbors.shape[1]
+
+    # Diff against the stored lists: new films, re-embedded films (vector
+    # fingerprint changed), films deleted from the catalog
+    old_pos = np.array([old.row_of.get(int(i), -1) for i in ids], dtype=np.int64)
+    is_new = old_pos < 0
+    is_changed = ~is_new & (old.fingerprints[np.maximum(old_pos, 0)] != fingerprint)
+    deleted = old.ids[~np.isin(old.ids, ids)]
+    # Lists holding a deleted or re-embedded film carry stale entries: recompute them
+    moved = np.concatenate([deleted, ids[is_changed]])
+    is_stale = ~is_new & ~is_changed & np.isin(old.neighbors[np.maximum(old_pos, 0), :k], moved).any(axis=1)
+
+    recompute = np.flatnonzero(is_new | is_changed | is_stale)
+    targets = np.flatnonzero(is_new | is_changed)
+    if not recompute.size and not deleted.size:
+        print("No new, re-embedded or deleted films; neighbors are up to date")
+        return
+
+    # 1. New, re-embedded and stale films: full candidate search over the catalog
+    cand_rows, cand_scores = vector_candidates(source, recompute, depth, workers=args.workers, block_rows=args.block_rows)
+    new_lists = blend(ids, recompute, cand_rows, cand_scores, k, use_graph)
+
+    # 2. Other films: only a new or re-embedded film can enter their lists,
+    #    and only if its cosine plus the largest possible boost beats their K-th score
+    kept = np.setdiff1d(np.arange(len(ids)), recompute)
+    old_lists = tuple(a[old_pos[kept], :k].copy() for a in (old.neighbors, old.scores, old.similarity))
+
+    affected = np.empty(0, dtype=np.int64)
+    if targets.size and kept.size:
+        cand_rows, cand_scores = vector_candidates(
+            source, kept, min(depth, targets.size), targets=targets, workers=args.workers, block_rows=args.block_rows
+        )
+        kth = np.nan_to_num(old_lists[1][:, -1], nan=-np.inf)
+        affected = np.flatnonzero(cand_scores[:, 0] + MAX_BOOST > kth)
+
+    if affected.size:
+        entering = blend(ids, kept[affected], cand_rows[affected], cand_scores[affected], k, use_graph)
+        merged = merge(tuple(a[affected] for a in old_lists), entering, k)
+        # Keep only the lists a new film actually entered
+        entered = (merged[0] != old_lists[0][affected]).any(axis=1)
+        affected = affected[entered]
+        for full, part in zip(old_lists, merged):
+            full[affected] = part[entered]
+
+    neighbors = np.empty((len(ids), k), dtype=np.int64)
+    scores = np.empty((len(ids), k), dtype=np.float32)
+    similarity = np.empty((len(ids), k), dtype=np.float32)
+    for full, new_part, old_part in zip((neighbors, scores, similarity), new_lists, old_lists):
+        full[recompute] = new_part
+        full[kept] = old_part
+
+    save_neighbors(args.out, ids, neighbors, scores, similarity, fingerprint, display)
+    changed = np.concatenate([recompute, kept[affected]])
+    if not args.no_write:
+        write_similar_to(ids[changed], neighbors[changed], scores[changed], similarity[changed])
+
+    print(
+        f"Incremental: {int(is_new.sum())} new, {int(is_changed.sum())} re-embedded, {deleted.size} deleted films; "
+        f"{int(is_stale.sum())} stale and {affected.size} other existing lists updated "
+        f"→ {args.out} ({time.perf_counter() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Recommendations for a whole file of prompts (campaigns, evaluation sets).
+
+1. read prompts from JSONL (a query log works too) or parquet: a `query`
+   field, and an optional `id` carried to the output
+2. parse each with the query understanding service
+3. embed the distinct semantic queries, --embed-batch per API call
+4. score chunks of prompts on a process pool against the embedding matrix
+   (app.recsys.bulk: blocked matmul, filter masks, rerank boosts)
+5. stream one row group per chunk to the output parquet
+   (prompt_id, query, rank, tmdb_id, score, similarity)
+
+Usage:
+    python -m scripts.bulk_recommend prompts.jsonl --out data/bulk/recommendations.parquet
+    python -m scripts.bulk_recommend prompts.parquet --limit 10 --workers 8
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.config import EMBEDDING_ARTIFACT, EMBEDDINGS_PATH
+from app.query_log import read_query_log
+from app.recsys import bulk
+from app.recsys.bulk import FilmFeatures, score_chunk
+from app.recsys.vector_index import SCORE_BLOCK_ROWS
+from app.recsys.vectors import is_artifact, load_embeddings, normalize_rows
+from app.services.embeddings import EmbeddingService
+from app.services.query_understanding import QueryUnderstandingService
+
+DEFAULT_OUT = "data/bulk/recommendations.parquet"
+
+SCHEMA = pa.schema([
+    ("prompt_id", pa.string()),
+    ("query", pa.string()),
+    ("rank", pa.int16()),
+    ("tmdb_id", pa.int64()),
+    ("score", pa.float32()),
+    ("similarity", pa.float32()),
+])
+
+
+def read_prompts(path: str):
+    """(prompt_id, query) pairs; ids default to the prompt's position in the input."""
+    if path.endswith(".parquet"):
+        parquet = pq.ParquetFile(path)
+        columns = ["query"] + (["id"] if "id" in parquet.schema_arrow.names else [])
+        records = (record for batch in parquet.iter_batches(columns=columns) for record in batch.to_pylist())
+    else:
+        records = read_query_log(path)
+
+    for position, record in enumerate(records):
+        if record.get("query"):
+            yield str(record.get("id", position)), record["query"]
+
+
+def chunked(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def embed_chunk(service: EmbeddingService, texts: list[str], batch_size: int) -> np.ndarray:
+    """Normalized vectors for texts, each distinct text embedded once."""
+    distinct = list(dict.fromkeys(texts))
+    vectors = []
+    for start in range(0, len(distinct), batch_size):
+        vectors.extend(service.embed_batch(distinct[start:start + batch_size]))
+    row_of = {text: i for i, text in enumerate(distinct)}
+    matrix = normalize_rows(np.asarray(vectors, dtype=np.float32))
+    return matrix[[row_of[text] for text in texts]]
+
+
+def to_table(prompts: list[tuple[str, str]], tmdb_ids: np.ndarray, scores: np.ndarray, similarity: np.ndarray) -> pa.Table:
+    """Long format, one row per recommendation; unfilled slots are dropped."""
+    filled = tmdb_ids >= 0
+    prompt_rows, ranks = np.nonzero(filled)
+    return pa.table(
+        {
+            "prompt_id": [prompts[i][0] for i in prompt_rows],
+            "query": [prompts[i][1] for i in prompt_rows],
+            "rank": (ranks + 1).astype(np.int16),
+            "tmdb_id": tmdb_ids[filled],
+            "score": scores[filled].astype(np.float32),
+            "similarity": similarity[filled].astype(np.float32),
+        },
+        schema=SCHEMA,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prompts", help="JSONL (optionally gzip'd, or a query log directory) or parquet")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--embeddings", help="artifact directory or parquet (default: serving embeddings)")
+    parser.add_argument("--limit", type=int, default=5, help="recommendations per prompt")
+    parser.add_argument("--pool", type=int, default=50, help="vector candidates reranked per prompt")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="prompts per scoring task / row group")
+    parser.add_argument("--embed-batch", type=int, default=512, help="texts per embeddings.create call")
+    parser.add_argument("--block-rows", type=int, default=SCORE_BLOCK_ROWS, help="matrix rows per matmul block")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="scoring processes")
+    args = parser.parse_args()
+
+    path = args.embeddings or (EMBEDDING_ARTIFACT if is_artifact(EMBEDDING_ARTIFACT) else EMBEDDINGS_PATH)
+    ids, matrix = load_embeddings(path)
+    features = FilmFeatures.load(ids)
+    print(f"Loaded {len(ids)} films ({matrix.shape[1]} dims) and their features ({features.nbytes() / 1e6:.1f} MB)")
+    # Workers memory-map an artifact themselves; a parquet matrix is shipped once per worker
+    source = path if is_artifact(path) else matrix
+
+    service = EmbeddingService()
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    writer = pq.ParquetWriter(args.out, SCHEMA)
+    counts = {"prompts": 0, "skipped": 0, "recommendations": 0}
+    timings = {"embed": 0.0}
+    start = time.perf_counter()
+
+    def write(prompts, result) -> None:
+        table = to_table(prompts, *result)
+        writer.write_table(table)
+        counts["recommendations"] += table.num_rows
+
+    def prepare(chunk):
+        parsed = [QueryUnderstandingService.parse(query) for _, query in chunk]
+        # Prompts that are all filter ("recent oscar winners") have no text to embed
+        kept = [(prompt, p) for prompt, p in zip(chunk, parsed) if p.semantic_query.strip()]
+        counts["skipped"] += len(chunk) - len(kept)
+        embed_start = time.perf_counter()
+        queries = embed_chunk(service, [p.semantic_query for _, p in kept], args.embed_batch) if kept else None
+        timings["embed"] += time.perf_counter() - embed_start
+        if queries is not None and queries.shape[1] != matrix.shape[1]:
+            raise SystemExit(f"Query embeddings have {queries.shape[1]} dims, the film matrix {matrix.shape[1]}")
+        filters = [p.filters.model_dump(exclude_none=True) if p.filters else None for _, p in kept]
+        return [prompt for prompt, _ in kept], queries, filters
+
+    try:
+        if args.workers <= 1:
+            bulk.init_worker(ids, source, features)
+            for chunk in chunked(read_prompts(args.prompts), args.chunk_size):
+                counts["prompts"] += len(chunk)
+                prompts, queries, filters = prepare(chunk)
+                if prompts:
+                    write(prompts, score_chunk(queries, filters, args.limit, args.pool, args.block_rows))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=args.workers, initializer=bulk.init_worker, initargs=(ids, source, features)
+            ) as executor:
+                # Embedding the next chunk overlaps with scoring the previous ones;
+                # results are written in input order
+                pending = deque()
+                for chunk in chunked(read_prompts(args.prompts), args.chunk_size):
+                    counts["prompts"] += len(chunk)
+                    prompts, queries, filters = prepare(chunk)
+                    if prompts:
+                        pending.append((prompts, executor.submit(
+                            score_chunk, queries, filters, args.limit, args.pool, args.block_rows
+                        )))
+                    while len(pending) > 2 * args.workers:
+                        prompts, future = pending.popleft()
+                        write(prompts, future.result())
+                while pending:
+                    prompts, future = pending.popleft()
+                    write(prompts, future.result())
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    rate = counts["prompts"] / seconds if seconds else 0.0
+    print(
+        f"Bulk recommendations: {counts} in {seconds:.1f}s "
+        f"({rate:.0f} prompts/s, embedding {timings['embed']:.1f}s) → {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
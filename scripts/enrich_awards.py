@@ -1,4 +1,5 @@
-from app.db.neo4j import run
+from app.db.data_version import bump_graph_version
+from app.db.neo4j import run, stream
 from app.ingestion.wikidata_client import fetch_award_rows
 from app.ingestion.wikidata_normalizer import normalize_awards
 
@@ -10,7 +11,7 @@ def get_all_movies() -> list[dict]:
     Movies without a valid release year are skipped,
     because award eligibility year cannot be determined.
     """
-    result = run(
+    result = stream(
         """
         MATCH (m:Movie)
         WHERE m.tmdb_id IS NOT NULL
@@ -72,6 +73,7 @@ def ingest_awards(movie: dict, normalized: dict) -> None:
               result: $result,
               year: $year
             }]->(c)
+            ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
             """,
             {
                 "tmdb_id": tmdb_id,
@@ -107,6 +109,7 @@ def main() -> None:
         if idx % 50 == 0:
             print(f"Processed {idx}/{len(movies)} movies")
 
+    bump_graph_version("enrich_awards")
     print("Award ingestion complete")
 
 
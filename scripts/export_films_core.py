@@ -1,3 +1,7 @@
+import argparse
+import json
+import os
+
 from neo4j import GraphDatabase
 import pandas as pd
 from collections import defaultdict
@@ -7,19 +11,36 @@ from app.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
 OUTPUT_PATH = "data/normalized/films_core.parquet"
 TOP_ACTORS = 10
 
+# Partitioned copy: part-<bucket>.parquet per tmdb_id range, so an
+# incremental export rewrites only the ranges its films fall in.
+# The leading underscore keeps the manifest out of pd.read_parquet(DATASET_PATH).
+DATASET_PATH = "data/normalized/films_core"
+MANIFEST = "_manifest.json"
+PARTITION_SIZE = 50_000
+
 
-def export_films() -> None:
+def export_films(since: str | None = None) -> tuple[pd.DataFrame, str]:
+    """
+    Films as films_core rows, plus the database time the export started
+    (the next --since watermark). With `since`, only films whose
+    updated_at is later.
+    """
     driver = GraphDatabase.driver(
         NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)
     )
 
     movies = {}
+    # Later queries only visit the exported films
+    scope = "WHERE m.tmdb_id IN $ids" if since else ""
 
     with driver.session() as session:
+        started_at = session.run("RETURN toString(datetime()) AS now").single()["now"]
+
         # --- Base movie data ---
         result = session.run(
-            """
+            f"""
             MATCH (m:Movie)
+            {"WHERE m.updated_at > datetime($since)" if since else ""}
             RETURN
               m.tmdb_id        AS tmdb_id,
               m.title          AS title,
@@ -27,7 +48,8 @@ def export_films() -> None:
               m.overview       AS overview,
               m.release_date   AS release_date,
               m.poster_path    AS poster_path
-            """
+            """,
+            since=since,
         )
 
         for row in result:
@@ -43,33 +65,43 @@ def export_films() -> None:
                 "actors": [],
                 "keywords": [],
             }
+        ids = list(movies)
 
         # --- Genres ---
         result = session.run(
-            """
+            f"""
             MATCH (m:Movie)-[:HAS_GENRE]->(g:Genre)
+            {scope}
             RETURN m.tmdb_id AS tmdb_id, g.name AS name
-            """
+            ORDER BY tmdb_id, name
+            """,
+            ids=ids,
         )
         for row in result:
             movies[row["tmdb_id"]]["genres"].append(row["name"])
 
         # --- Directors ---
         result = session.run(
-            """
+            f"""
             MATCH (p:Person)-[:DIRECTED]->(m:Movie)
+            {scope}
             RETURN m.tmdb_id AS tmdb_id, p.name AS name
-            """
+            ORDER BY tmdb_id, name
+            """,
+            ids=ids,
         )
         for row in result:
             movies[row["tmdb_id"]]["directors"].append(row["name"])
 
         # --- Actors (top N per movie) ---
         result = session.run(
-            """
+            f"""
             MATCH (p:Person)-[:ACTED_IN]->(m:Movie)
+            {scope}
             RETURN m.tmdb_id AS tmdb_id, p.name AS name
-            """
+            ORDER BY tmdb_id, name
+            """,
+            ids=ids,
         )
 
         actor_counter = defaultdict(int)
@@ -80,21 +112,117 @@ def export_films() -> None:
 
         # --- Keywords ---
         result = session.run(
-            """
+            f"""
             MATCH (m:Movie)-[:HAS_KEYWORD]->(k:Keyword)
+            {scope}
             RETURN m.tmdb_id AS tmdb_id, k.name AS name
-            """
+            ORDER BY tmdb_id, name
+            """,
+            ids=ids,
         )
         for row in result:
             movies[row["tmdb_id"]]["keywords"].append(row["name"])
 
     driver.close()
 
-    df = pd.DataFrame(movies.values())
-    df.to_parquet(OUTPUT_PATH, index=False)
+    # Stable row and list order: an unchanged graph exports identical bytes,
+    # so the pipeline runner skips everything downstream
+    df = pd.DataFrame(movies.values(), columns=[
+        "tmdb_id", "title", "original_title", "overview", "release_date",
+        "poster_path", "genres", "directors", "actors", "keywords",
+    ]).sort_values("tmdb_id", ignore_index=True)
+    return df, started_at
+
+
+# -------------------------
+# PARTITIONED DATASET
+# -------------------------
+
+def partition_path(bucket: int) -> str:
+    return os.path.join(DATASET_PATH, f"part-{bucket:05d}.parquet")
+
+
+def read_manifest() -> dict:
+    try:
+        with open(os.path.join(DATASET_PATH, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"partitions": {}}
+
+
+def _write_parquet(df: pd.DataFrame, path: str) -> None:
+    # Dot-prefixed while being written, so dataset readers skip it
+    tmp = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def write_partitions(df: pd.DataFrame, manifest: dict, full: bool) -> list[int]:
+    """
+    Merge exported rows into their tmdb_id-range partitions; returns the
+    partitions rewritten. A full export also drops partitions it no longer covers.
+    """
+    os.makedirs(DATASET_PATH, exist_ok=True)
+    buckets = df["tmdb_id"] // PARTITION_SIZE
+    changed = []
+
+    for bucket, rows in df.groupby(buckets):
+        path = partition_path(bucket)
+        if not full and os.path.exists(path):
+            existing = pd.read_parquet(path)
+            rows = pd.concat([existing[~existing["tmdb_id"].isin(rows["tmdb_id"])], rows])
+        rows = rows.sort_values("tmdb_id", ignore_index=True)
+        _write_parquet(rows, path)
+        manifest["partitions"][str(bucket)] = {"rows": len(rows)}
+        changed.append(int(bucket))
+
+    if full:
+        for name in os.listdir(DATASET_PATH):
+            if name.startswith("part-") and name.endswith(".parquet") and int(name[5:10]) not in changed:
+                os.remove(os.path.join(DATASET_PATH, name))
+                manifest["partitions"].pop(str(int(name[5:10])), None)
+
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Movie nodes to films_core (monolithic file + tmdb_id-range partitions)")
+    parser.add_argument(
+        "--since",
+        nargs="?",
+        const="watermark",
+        help="only films updated after this ISO datetime (default: the last export's watermark)",
+    )
+    args = parser.parse_args()
+
+    manifest = read_manifest()
+    since = manifest.get("watermark") if args.since == "watermark" else args.since
+    if args.since and not since:
+        raise SystemExit(f"No watermark in {DATASET_PATH}/{MANIFEST}: run a full export first")
+
+    df, started_at = export_films(since)
+    changed = write_partitions(df, manifest, full=since is None)
+
+    manifest.update(
+        partition_size=PARTITION_SIZE,
+        watermark=started_at,
+        last_export={"since": since, "rows": len(df), "changed_partitions": changed},
+        # Accumulated until build_embedding_input has rebuilt them, so an
+        # export run twice in a row does not hide the first one's partitions
+        pending_partitions=sorted(set(manifest.get("pending_partitions", [])) | set(changed)),
+    )
+    with open(os.path.join(DATASET_PATH, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
 
-    print(f"Exported {len(df)} movies → {OUTPUT_PATH}")
+    # Monolithic file for readers of films_core.parquet, rebuilt from local partitions
+    if changed or since is None:
+        parts = sorted(p for p in os.listdir(DATASET_PATH) if p.startswith("part-") and p.endswith(".parquet"))
+        full_df = pd.concat([pd.read_parquet(os.path.join(DATASET_PATH, p)) for p in parts], ignore_index=True) if parts else df
+        _write_parquet(full_df, OUTPUT_PATH)
+        print(f"Exported {len(df)} movies ({len(changed)} partitions) → {DATASET_PATH}, {len(full_df)} total → {OUTPUT_PATH}")
+    else:
+        print(f"No movies updated since {since}")
 
 
 if __name__ == "__main__":
-    export_films()
+    main()
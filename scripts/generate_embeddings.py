@@ -1,26 +1,58 @@
+import hashlib
+import os
 import time
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from openai import OpenAI
 from dotenv import load_dotenv
 load_dotenv()
 
+from app.config import EMBEDDING_ARTIFACT, VECTOR_BACKEND
+from app.recsys.vectors import write_artifact
+
 INPUT = "data/normalized/embedding_input.parquet"
 OUTPUT = "data/embeddings/films_embeddings.parquet"
 
 MODEL = "text-embedding-3-large"
+# Optional Matryoshka width requested from the API (unset = full 3072 dims)
+DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS")) if os.getenv("EMBEDDING_DIMENSIONS") else None
 BATCH_SIZE = 100
 SLEEP_SECONDS = 1.0  # safety margin
 
 
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def main():
     client = OpenAI()
+    options = {"dimensions": DIMENSIONS} if DIMENSIONS else {}
 
     df = pd.read_parquet(INPUT)
+    df["text_sha256"] = df["embedding_text"].map(text_hash)
+    current = dict(zip(df["tmdb_id"], df["text_sha256"]))
 
     # Resume support: if output exists, skip done rows
     try:
         existing = pd.read_parquet(OUTPUT)
+        width = len(existing["embedding"].iloc[0]) if len(existing) else None
+        if DIMENSIONS and width and width != DIMENSIONS:
+            raise SystemExit(
+                f"{OUTPUT} holds {width}-dim embeddings but EMBEDDING_DIMENSIONS={DIMENSIONS}; "
+                "move it aside to regenerate"
+            )
+        if "text_sha256" in existing:
+            # Films whose embedding text changed (e.g. after refresh_tmdb) are re-embedded
+            stale = existing["tmdb_id"].isin(current.keys()) & (
+                existing["text_sha256"] != existing["tmdb_id"].map(current)
+            )
+            if stale.any():
+                print(f"Re-embedding {int(stale.sum())} films whose text changed")
+            existing = existing[~stale]
+        else:
+            # Written before text hashes were stored: assume current
+            existing["text_sha256"] = existing["tmdb_id"].map(current)
         done_ids = set(existing["tmdb_id"])
         print(f"Resuming: {len(done_ids)} embeddings already generated")
     except FileNotFoundError:
@@ -30,30 +62,35 @@ def main():
     rows = []
     texts = []
     ids = []
+    hashes = []
 
     for row in df.itertuples(index=False):
         if row.tmdb_id in done_ids:
             continue
         ids.append(row.tmdb_id)
         texts.append(row.embedding_text)
+        hashes.append(row.text_sha256)
 
         if len(texts) == BATCH_SIZE:
             embeddings = client.embeddings.create(
                 model=MODEL,
                 input=texts,
+                **options,
             )
 
-            for tmdb_id, emb in zip(ids, embeddings.data):
+            for tmdb_id, sha, emb in zip(ids, hashes, embeddings.data):
                 rows.append(
                     {
                         "tmdb_id": tmdb_id,
                         "embedding": emb.embedding,
                         "model": MODEL,
+                        "text_sha256": sha,
                     }
                 )
 
             texts.clear()
             ids.clear()
+            hashes.clear()
             time.sleep(SLEEP_SECONDS)
 
     # Final partial batch
@@ -61,13 +98,15 @@ def main():
         embeddings = client.embeddings.create(
             model=MODEL,
             input=texts,
+            **options,
         )
-        for tmdb_id, emb in zip(ids, embeddings.data):
+        for tmdb_id, sha, emb in zip(ids, hashes, embeddings.data):
             rows.append(
                 {
                     "tmdb_id": tmdb_id,
                     "embedding": emb.embedding,
                     "model": MODEL,
+                    "text_sha256": sha,
                 }
             )
 
@@ -82,6 +121,11 @@ def main():
 
     print(f"Embeddings stored: {len(final_df)} → {OUTPUT}")
 
+    # Serving artifact: memory-mapped by every API worker
+    matrix = np.stack(final_df["embedding"].to_numpy()).astype(np.float32)
+    write_artifact(EMBEDDING_ARTIFACT, final_df["tmdb_id"].to_numpy(), matrix, model=MODEL, codes=(VECTOR_BACKEND,))
+    print(f"Embedding artifact → {EMBEDDING_ARTIFACT}")
+
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,5 @@
 import csv
+from app.db.data_version import bump_graph_version
 from app.db.neo4j import run
 
 INPUT = "data/normalized/awards.csv"
@@ -20,10 +21,11 @@ def main():
                 })
                 MERGE (e)-[:HAS_CATEGORY]->(c)
 
-                MERGE (m)-[:RECEIVED {
+                MERGE (m)-[r:RECEIVED {
                   result: $result,
                   year: $year
                 }]->(c)
+                ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
                 """,
                 {
                     "tmdb_id": int(row["tmdb_id"]),
@@ -34,6 +36,7 @@ def main():
                 },
             )
 
+    bump_graph_version("ingest_awards_from_csv")
     print("Awards ingested from CSV")
 
 
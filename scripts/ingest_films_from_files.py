@@ -1,4 +1,5 @@
 import pandas as pd
+from app.db.data_version import bump_graph_version
 from app.db.neo4j import run
 
 INPUT = "data/normalized/films_core.parquet"
@@ -19,7 +20,8 @@ def main():
               m.original_title = $original_title,
               m.overview = $overview,
               m.release_date = $release_date,
-              m.poster_path = $poster_path
+              m.poster_path = $poster_path,
+              m.updated_at = datetime()
             """,
             {
                 "tmdb_id": tmdb_id,
@@ -39,7 +41,8 @@ def main():
                     MERGE (g:Genre {name: $name})
                     WITH g
                     MATCH (m:Movie {tmdb_id: $tmdb_id})
-                    MERGE (m)-[:HAS_GENRE]->(g)
+                    MERGE (m)-[r:HAS_GENRE]->(g)
+                    ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
                     """,
                     {"name": genre, "tmdb_id": tmdb_id},
                 )
@@ -52,7 +55,8 @@ def main():
                     MERGE (p:Person {name: $name})
                     WITH p
                     MATCH (m:Movie {tmdb_id: $tmdb_id})
-                    MERGE (p)-[:DIRECTED]->(m)
+                    MERGE (p)-[r:DIRECTED]->(m)
+                    ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
                     """,
                     {"name": director, "tmdb_id": tmdb_id},
                 )
@@ -65,7 +69,8 @@ def main():
                     MERGE (p:Person {name: $name})
                     WITH p
                     MATCH (m:Movie {tmdb_id: $tmdb_id})
-                    MERGE (p)-[:ACTED_IN]->(m)
+                    MERGE (p)-[r:ACTED_IN]->(m)
+                    ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
                     """,
                     {"name": actor, "tmdb_id": tmdb_id},
                 )
@@ -78,11 +83,13 @@ def main():
                     MERGE (k:Keyword {name: $name})
                     WITH k
                     MATCH (m:Movie {tmdb_id: $tmdb_id})
-                    MERGE (m)-[:HAS_KEYWORD]->(k)
+                    MERGE (m)-[r:HAS_KEYWORD]->(k)
+                    ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
                     """,
                     {"name": keyword, "tmdb_id": tmdb_id},
                 )
 
+    bump_graph_version("ingest_films_from_files")
     print(f"Ingested {len(df)} movies from films_core.parquet")
 
 
@@ -1,7 +1,8 @@
 import asyncio
 from typing import Set
 
-from app.db.neo4j import run
+from app.db.data_version import bump_graph_version
+from app.db.neo4j import run, stream
 from app.ingestion.tmdb import TMDBClient
 
 
@@ -25,8 +26,10 @@ def get_existing_tmdb_ids() -> Set[int]:
     This is the ONLY mechanism used to:
     - avoid duplicate ingestion
     - avoid re-fetching TMDB data
+
+    Streamed, so the scan never holds more than one fetch batch of records.
     """
-    rows = run(
+    rows = stream(
         """
         MATCH (m:Movie)
         RETURN m.tmdb_id AS tmdb_id
@@ -56,7 +59,8 @@ async def ingest_movie(movie: dict) -> None:
             m.overview = $overview,
             m.release_date = $release_date,
             m.vote_average = $vote_average,
-            m.popularity = $popularity
+            m.popularity = $popularity,
+            m.updated_at = datetime()
         """,
         {
             "tmdb_id": movie["id"],
@@ -75,7 +79,8 @@ async def ingest_movie(movie: dict) -> None:
             MERGE (g:Genre {name: $name})
             WITH g
             MATCH (m:Movie {tmdb_id: $tmdb_id})
-            MERGE (m)-[:HAS_GENRE]->(g)
+            MERGE (m)-[r:HAS_GENRE]->(g)
+            ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
             """,
             {
                 "name": genre["name"],
@@ -90,10 +95,16 @@ async def ingest_credits(movie_id: int, credits: dict) -> None:
         run(
             """
             MERGE (p:Person {tmdb_id: $id})
+            WITH p, p.name IS NOT NULL AND p.name <> $name AS renamed
             SET p.name = $name
-            WITH p
+            WITH p, renamed
             MATCH (m:Movie {tmdb_id: $movie_id})
-            MERGE (p)-[:ACTED_IN]->(m)
+            MERGE (p)-[r:ACTED_IN]->(m)
+            ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
+            // A rename changes the embedding text of the person's other films too
+            WITH p, renamed WHERE renamed
+            MATCH (p)-[:ACTED_IN|DIRECTED]->(other:Movie)
+            SET other.updated_at = datetime()
             """,
             {
                 "id": cast["id"],
@@ -107,10 +118,15 @@ async def ingest_credits(movie_id: int, credits: dict) -> None:
             run(
                 """
                 MERGE (p:Person {tmdb_id: $id})
+                WITH p, p.name IS NOT NULL AND p.name <> $name AS renamed
                 SET p.name = $name
-                WITH p
+                WITH p, renamed
                 MATCH (m:Movie {tmdb_id: $movie_id})
-                MERGE (p)-[:DIRECTED]->(m)
+                MERGE (p)-[r:DIRECTED]->(m)
+                ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
+                WITH p, renamed WHERE renamed
+                MATCH (p)-[:ACTED_IN|DIRECTED]->(other:Movie)
+                SET other.updated_at = datetime()
                 """,
                 {
                     "id": crew["id"],
@@ -128,7 +144,8 @@ async def ingest_keywords(movie_id: int, keywords_payload: dict) -> None:
             MERGE (k:Keyword {name: $name})
             WITH k
             MATCH (m:Movie {tmdb_id: $movie_id})
-            MERGE (m)-[:HAS_KEYWORD]->(k)
+            MERGE (m)-[r:HAS_KEYWORD]->(k)
+            ON CREATE SET r.updated_at = datetime(), m.updated_at = datetime()
             """,
             {
                 "name": kw["name"],
@@ -238,7 +255,9 @@ async def main() -> None:
         quota=remaining,
     )
 
-    print("TMDB ingestion complete")
+    await client.aclose()
+    bump_graph_version("ingest_tmdb")
+    print(f"TMDB ingestion complete (responses: {dict(client.cache_stats)})")
 
 
 if __name__ == "__main__":
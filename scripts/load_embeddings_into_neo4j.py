@@ -1,25 +1,49 @@
+import argparse
+
+import numpy as np
 import pandas as pd
+from app.config import EMBEDDING_DIMENSIONS
+from app.db.data_version import bump_graph_version
 from app.db.neo4j import run
+from app.recsys.vectors import truncate_rows
 
 EMBEDDINGS = "data/embeddings/films_embeddings.parquet"
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Load film embeddings into Movie.embedding")
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=EMBEDDING_DIMENSIONS,
+        help="truncate + renormalize to this Matryoshka width before storing "
+             "(the vector index must be created with the same width)",
+    )
+    args = parser.parse_args()
+
     df = pd.read_parquet(EMBEDDINGS)
+    matrix = np.stack(df["embedding"].to_numpy()).astype(np.float32)
+
+    full_dims = matrix.shape[1]
+    if args.dimensions and args.dimensions < full_dims:
+        matrix = truncate_rows(matrix, args.dimensions)
+        print(f"Truncating embeddings {full_dims} → {args.dimensions} dims")
 
-    for row in df.itertuples(index=False):
+    for tmdb_id, embedding in zip(df["tmdb_id"], matrix):
         run(
             """
             MATCH (m:Movie {tmdb_id: $tmdb_id})
-            SET m.embedding = $embedding
+            SET m.embedding = $embedding,
+                m.needs_embedding = null
             """,
             {
-                "tmdb_id": int(row.tmdb_id),
-                "embedding": row.embedding,
+                "tmdb_id": int(tmdb_id),
+                "embedding": embedding.tolist(),
             },
         )
 
-    print(f"Loaded embeddings into Neo4j: {len(df)} movies")
+    bump_graph_version("load_embeddings_into_neo4j")
+    print(f"Loaded embeddings into Neo4j: {len(df)} movies ({matrix.shape[1]} dims)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,379 @@
+"""
+Offline pipeline runner: declared stages, content-addressed skipping.
+
+Each stage is one of the existing scripts, run in its own interpreter
+(`python -m <module>`), with the files it reads and writes declared below.
+A stage's fingerprint is the SHA-256 of its inputs' contents, its script
+source and — for stages that read Neo4j — the graph data version. A stage
+is skipped when its fingerprint matches the last successful run and its
+outputs are still the files that run produced. Unchanged content stops a
+re-run from cascading: if a stage rewrites identical bytes, the stages
+after it are skipped.
+
+Stages whose dependencies are done run concurrently (--workers).
+Every run writes a report to data/pipeline/runs/ with per-stage status,
+wall time, rows processed and peak RSS; child output goes to
+data/pipeline/logs/<run>/<stage>.log.
+
+Usage:
+    python -m scripts.pipeline
+    python -m scripts.pipeline --dry-run
+    python -m scripts.pipeline --only build_embedding_input generate_embeddings
+    python -m scripts.pipeline --force export_films_core
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE_DIR = "data/pipeline"
+STATE_PATH = os.path.join(PIPELINE_DIR, "state.json")
+
+# Pseudo-input: the (:DataVersion {name: "graph"}) counter
+GRAPH = "neo4j:graph"
+
+HASH_CHUNK = 1 << 20
+
+
+@dataclass
+class Stage:
+    name: str
+    module: str
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+    after: list[str] = field(default_factory=list)
+    # Artifact whose row count is reported (default: first output, else first input)
+    rows_from: str | None = None
+
+    @property
+    def source(self) -> str:
+        return self.module.replace(".", "/") + ".py"
+
+    @property
+    def rows_path(self) -> str | None:
+        return self.rows_from or next(iter(self.outputs or [p for p in self.inputs if p != GRAPH]), None)
+
+
+# -------------------------
+# STAGES
+# -------------------------
+
+STAGES = [
+    # Source stage: incremental by itself (skips known tmdb_ids), so it is
+    # only re-run when its code changes or it is forced
+    Stage("ingest_tmdb", "scripts.ingest_tmdb"),
+    Stage(
+        "export_films_core", "scripts.export_films_core",
+        inputs=[GRAPH],
+        outputs=["data/normalized/films_core.parquet"],
+        after=["ingest_tmdb"],
+    ),
+    Stage(
+        "extract_awards", "scripts.wikidata.extract_awards",
+        inputs=["data/normalized/films_core.parquet"],
+        outputs=["data/raw/wikidata_awards.jsonl"],
+        after=["export_films_core"],
+    ),
+    Stage(
+        "normalize_awards", "scripts.wikidata.normalize_awards",
+        inputs=["data/raw/wikidata_awards.jsonl", "data/normalized/films_core.parquet"],
+        outputs=["data/normalized/awards.csv"],
+        after=["extract_awards"],
+    ),
+    Stage(
+        "build_embedding_input", "scripts.build_embedding_input",
+        inputs=["data/normalized/films_core.parquet", "data/normalized/awards.csv"],
+        outputs=["data/normalized/embedding_input.parquet"],
+        after=["normalize_awards"],
+    ),
+    Stage(
+        "generate_embeddings", "scripts.generate_embeddings",
+        inputs=["data/normalized/embedding_input.parquet"],
+        outputs=["data/embeddings/films_embeddings.parquet"],
+        after=["build_embedding_input"],
+    ),
+    Stage(
+        "load_embeddings_into_neo4j", "scripts.load_embeddings_into_neo4j",
+        inputs=["data/embeddings/films_embeddings.parquet"],
+        after=["generate_embeddings"],
+    ),
+    Stage(
+        "ingest_awards_from_csv", "scripts.ingest_awards_from_csv",
+        inputs=["data/normalized/awards.csv"],
+        after=["normalize_awards"],
+    ),
+]
+
+
+# -------------------------
+# FINGERPRINTS
+# -------------------------
+
+class FileHashes:
+    """SHA-256 of file contents, memoized on (size, mtime) across runs."""
+
+    def __init__(self, known: dict):
+        self.known = known
+        self.lock = threading.Lock()
+
+    def __call__(self, path: str) -> str | None:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            entry = self.known.get(path)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+        with self.lock:
+            self.known[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+
+def _graph_version() -> str:
+    try:
+        from app.db.data_version import graph_version
+
+        return str(graph_version())
+    except Exception as exc:
+        # Never matches a stored fingerprint, so graph-reading stages re-run (and report the error)
+        return f"unavailable ({exc.__class__.__name__})"
+
+
+def fingerprint(stage: Stage, hashes: FileHashes) -> tuple[str, dict]:
+    parts = {stage.source: hashes(stage.source)}
+    for path in stage.inputs:
+        parts[path] = _graph_version() if path == GRAPH else hashes(path)
+    blob = json.dumps(parts, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest(), parts
+
+
+def count_rows(path: str | None) -> int | None:
+    """Rows in a parquet / CSV / JSONL artifact, read from metadata or by line count."""
+    if not path or not os.path.exists(path):
+        return None
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.read_metadata(path).num_rows
+    with open(path, "rb") as f:
+        lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(HASH_CHUNK), b""))
+    return lines - 1 if path.endswith(".csv") else lines
+
+
+# -------------------------
+# EXECUTION
+# -------------------------
+
+def run_stage(stage: Stage, log_path: str) -> dict:
+    """Run the stage's script in a child interpreter; wall time and the child's own peak RSS."""
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", stage.module],
+            cwd=ROOT,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        )
+        # wait4 reports this child's rusage, not the sum over all children
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    return {
+        "returncode": proc.returncode,
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        # Linux reports ru_maxrss in KiB
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def _tail(path: str, lines: int = 20) -> str:
+    with open(path, errors="replace") as f:
+        return "".join(f.readlines()[-lines:])
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage], state: dict, force: set[str], dry_run: bool, log_dir: str):
+        self.stages = {s.name: s for s in stages}
+        self.state = state
+        self.force = force
+        self.dry_run = dry_run
+        self.log_dir = log_dir
+        self.hashes = FileHashes(state.setdefault("files", {}))
+        self.results: dict[str, dict] = {}
+
+    def is_fresh(self, stage: Stage, digest: str) -> bool:
+        last = self.state.setdefault("stages", {}).get(stage.name)
+        if stage.name in self.force or not last or last["fingerprint"] != digest:
+            return False
+        return all(self.hashes(path) == sha for path, sha in last["outputs"].items())
+
+    def execute(self, stage: Stage) -> dict:
+        if self.dry_run and any(self.results.get(d, {}).get("status") == "would_run" for d in stage.after):
+            return {"status": "would_run"}
+
+        digest, parts = fingerprint(stage, self.hashes)
+        missing = [p for p, sha in parts.items() if sha is None]
+        if missing:
+            return {"status": "failed", "error": f"missing inputs: {', '.join(missing)}"}
+        if self.is_fresh(stage, digest):
+            return {"status": "skipped", "rows": count_rows(stage.rows_path)}
+        if self.dry_run:
+            return {"status": "would_run"}
+
+        log_path = os.path.join(self.log_dir, f"{stage.name}.log")
+        result = {"status": "ok", **run_stage(stage, log_path), "log": log_path}
+        if result["returncode"] != 0:
+            print(_tail(log_path), end="")
+            return {**result, "status": "failed"}
+
+        result["rows"] = count_rows(stage.rows_path)
+        self.state["stages"][stage.name] = {
+            "fingerprint": digest,
+            "inputs": parts,
+            "outputs": {path: self.hashes(path) for path in stage.outputs},
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        return result
+
+    def run(self, workers: int) -> dict[str, dict]:
+        """Topological execution: a stage starts once every stage it comes after is done."""
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as pool:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    deps = [d for d in stage.after if d in self.stages]
+                    if any(self.results.get(d, {}).get("status") in ("failed", "blocked") for d in deps):
+                        self.results[name] = {"status": "blocked"}
+                        del pending[name]
+                        self._report(name)
+                    elif all(d in self.results for d in deps):
+                        print(f"→ {name}")
+                        running[pool.submit(self.execute, stage)] = name
+                        del pending[name]
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as exc:
+                        self.results[name] = {"status": "failed", "error": repr(exc)}
+                    self._report(name)
+
+        return self.results
+
+    def _report(self, name: str) -> None:
+        r = self.results[name]
+        detail = []
+        if "wall_seconds" in r:
+            detail.append(f"{r['wall_seconds']:.1f}s")
+        if r.get("rows") is not None:
+            detail.append(f"{r['rows']} rows")
+        if "peak_rss_mb" in r:
+            detail.append(f"peak {r['peak_rss_mb']:.0f} MB")
+        if "error" in r:
+            detail.append(r["error"])
+        print(f"  {name:<28} {r['status']:<9} {', '.join(detail)}")
+
+
+def select(names: list[str] | None) -> list[Stage]:
+    if not names:
+        return STAGES
+    unknown = set(names) - {s.name for s in STAGES}
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    return [s for s in STAGES if s.name in names]
+
+
+def load_state() -> dict:
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(state: dict) -> None:
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, STATE_PATH)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", metavar="STAGE", help="run just these stages (ordering kept)")
+    parser.add_argument("--force", nargs="*", metavar="STAGE", help="re-run these stages (all when empty) even if fresh")
+    parser.add_argument("--dry-run", action="store_true", help="report what would run without running it")
+    parser.add_argument("--workers", type=int, default=4, help="stages run concurrently")
+    parser.add_argument("--list", action="store_true", help="print the stage graph and exit")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    stages = select(args.only)
+
+    if args.list:
+        for s in stages:
+            print(f"{s.name:<28} after={','.join(s.after) or '-'}  in={','.join(s.inputs) or '-'}  out={','.join(s.outputs) or '-'}")
+        return
+
+    force = {s.name for s in stages} if args.force == [] else set(args.force or [])
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    log_dir = os.path.join(PIPELINE_DIR, "logs", run_id)
+    os.makedirs(log_dir, exist_ok=True)
+
+    state = load_state()
+    pipeline = Pipeline(stages, state, force, args.dry_run, log_dir)
+    start = time.perf_counter()
+    results = pipeline.run(args.workers)
+    wall = time.perf_counter() - start
+
+    if not args.dry_run:
+        save_state(state)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dry_run": args.dry_run,
+        "wall_seconds": round(wall, 3),
+        "stages": {s.name: results[s.name] for s in stages},
+    }
+    out = os.path.join(PIPELINE_DIR, "runs", f"{run_id}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    failed = [name for name, r in results.items() if r["status"] in ("failed", "blocked")]
+    print(f"\nPipeline {'failed' if failed else 'done'} in {wall:.1f}s → {out}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
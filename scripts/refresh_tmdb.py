@@ -0,0 +1,310 @@
+"""
+Incremental TMDB refresh from the /movie/changes feed.
+
+1. read the changes feed from the stored watermark to today
+   (14-day windows, the API's limit)
+2. keep the ids already in the graph (new films are ingest_tmdb's job)
+3. refetch details / credits / keywords concurrently, revalidating the
+   response cache
+4. diff against the stored properties and relationships, and write only
+   real deltas; changed films get `updated_at` (re-export) and, when
+   their embedding text changed, `needs_embedding = true`
+5. bump the graph version and advance the watermark; films whose fetch
+   failed transiently (anything but a 404) are stored and retried by the
+   next run
+
+Usage:
+    python -m scripts.refresh_tmdb
+    python -m scripts.refresh_tmdb --since 2025-01-01 --dry-run
+    TMDB_BASE_URL=http://127.0.0.1:8766 python -m scripts.refresh_tmdb --since 2025-01-01 --until 2025-01-07
+"""
+
+import argparse
+import asyncio
+import json
+from datetime import date, timedelta
+
+from app.db.data_version import bump_graph_version, get_watermark, set_watermark
+from app.db.neo4j import read, run
+from app.ingestion.tmdb import TMDBClient, TMDBClientError
+
+WATERMARK = "tmdb_changes"
+# JSON list of tmdb_ids to retry, kept in the same SyncState store
+FAILED = "tmdb_changes_failed"
+CHANGES_WINDOW_DAYS = 14
+DEFAULT_LOOKBACK_DAYS = 1
+BATCH_SIZE = 100
+
+# Movie properties written by ingest_tmdb.ingest_movie
+PROPERTIES = ["title", "original_title", "overview", "release_date", "vote_average", "popularity"]
+# Changes here alter build_embedding_input's text
+EMBEDDED_FIELDS = {"title", "original_title", "overview", "release_date", "genres", "keywords", "directors", "cast"}
+
+
+STORED_QUERY = """
+MATCH (m:Movie) WHERE m.tmdb_id IN $ids
+RETURN m.tmdb_id AS tmdb_id,
+       m {.title, .original_title, .overview, .release_date, .vote_average, .popularity} AS props,
+       [(m)-[:HAS_GENRE]->(g:Genre) | g.name] AS genres,
+       [(m)-[:HAS_KEYWORD]->(k:Keyword) | k.name] AS keywords,
+       [(p:Person)-[:DIRECTED]->(m) | p {.tmdb_id, .name}] AS directors,
+       [(p:Person)-[:ACTED_IN]->(m) | p {.tmdb_id, .name}] AS cast
+"""
+
+APPLY_QUERY = """
+MATCH (m:Movie {tmdb_id: $tmdb_id})
+SET m += $props,
+    m.updated_at = datetime(),
+    m.needs_embedding = CASE WHEN $reembed THEN true ELSE m.needs_embedding END
+WITH m
+CALL {
+  WITH m
+  UNWIND $genres_added AS name
+  MERGE (g:Genre {name: name})
+  MERGE (m)-[r:HAS_GENRE]->(g)
+  ON CREATE SET r.updated_at = datetime()
+}
+CALL {
+  WITH m
+  MATCH (m)-[r:HAS_GENRE]->(g:Genre) WHERE g.name IN $genres_removed.names
+  DELETE r
+}
+CALL {
+  WITH m
+  UNWIND $keywords_added AS name
+  MERGE (k:Keyword {name: name})
+  MERGE (m)-[r:HAS_KEYWORD]->(k)
+  ON CREATE SET r.updated_at = datetime()
+}
+CALL {
+  WITH m
+  MATCH (m)-[r:HAS_KEYWORD]->(k:Keyword) WHERE k.name IN $keywords_removed.names
+  DELETE r
+}
+CALL {
+  WITH m
+  UNWIND $directors_added AS person
+  MERGE (p:Person {tmdb_id: person.id})
+  WITH m, p, person, p.name IS NOT NULL AND p.name <> person.name AS renamed
+  SET p.name = person.name
+  MERGE (p)-[r:DIRECTED]->(m)
+  ON CREATE SET r.updated_at = datetime()
+  // A rename changes the embedding text of the person's other films too
+  WITH p, renamed WHERE renamed
+  MATCH (p)-[:ACTED_IN|DIRECTED]->(other:Movie)
+  SET other.updated_at = datetime()
+}
+CALL {
+  WITH m
+  MATCH (p:Person)-[r:DIRECTED]->(m)
+  WHERE p.tmdb_id IN $directors_removed.ids OR (p.tmdb_id IS NULL AND p.name IN $directors_removed.names)
+  DELETE r
+}
+CALL {
+  WITH m
+  UNWIND $cast_added AS person
+  MERGE (p:Person {tmdb_id: person.id})
+  WITH m, p, person, p.name IS NOT NULL AND p.name <> person.name AS renamed
+  SET p.name = person.name
+  MERGE (p)-[r:ACTED_IN]->(m)
+  ON CREATE SET r.updated_at = datetime()
+  // A rename changes the embedding text of the person's other films too
+  WITH p, renamed WHERE renamed
+  MATCH (p)-[:ACTED_IN|DIRECTED]->(other:Movie)
+  SET other.updated_at = datetime()
+}
+CALL {
+  WITH m
+  MATCH (p:Person)-[r:ACTED_IN]->(m)
+  WHERE p.tmdb_id IN $cast_removed.ids OR (p.tmdb_id IS NULL AND p.name IN $cast_removed.names)
+  DELETE r
+}
+"""
+
+
+# -------------------------
+# CHANGES FEED
+# -------------------------
+
+def windows(since: date, until: date):
+    """[start, end] date pairs covering since..until, each within the feed's limit."""
+    start = since
+    while start <= until:
+        end = min(start + timedelta(days=CHANGES_WINDOW_DAYS - 1), until)
+        yield start, end
+        start = end + timedelta(days=1)
+
+
+async def changed_ids(client: TMDBClient, since: date, until: date) -> set[int]:
+    ids = set()
+    for start, end in windows(since, until):
+        page, pages = 1, 1
+        while page <= pages:
+            data = await client.get_movie_changes(start.isoformat(), end.isoformat(), page)
+            ids.update(item["id"] for item in data.get("results", []) if not item.get("adult"))
+            pages = data.get("total_pages", 1)
+            page += 1
+    return ids
+
+
+# -------------------------
+# DIFF
+# -------------------------
+
+async def fetch_movie(client: TMDBClient, tmdb_id: int) -> dict | None:
+    """
+    Details, credits and keywords fetched concurrently; None if TMDB no
+    longer serves the film (404). Any other failure is raised.
+    """
+    try:
+        details, credits, keywords = await asyncio.gather(
+            client.get_movie_details(tmdb_id, refresh=True),
+            client.get_movie_credits(tmdb_id, refresh=True),
+            client.get_movie_keywords(tmdb_id, refresh=True),
+        )
+    except TMDBClientError as exc:
+        if exc.status_code != 404:
+            raise
+        print(f"Skipping {tmdb_id}: {exc}")
+        return None
+    return {"details": details, "credits": credits, "keywords": keywords}
+
+
+def _name_delta(stored: list[str], fresh: list[str]) -> tuple[list, dict]:
+    """(added names, removed {names})."""
+    return sorted(set(fresh) - set(stored)), {"names": sorted(set(stored) - set(fresh))}
+
+
+def _people_delta(stored: list[dict], fresh: list[dict]) -> tuple[list, dict]:
+    """
+    (added people, removed {ids, names}). Stored people are matched by
+    tmdb_id, or by name for those ingested from files without one.
+    """
+    stored_ids = {p["tmdb_id"] for p in stored if p["tmdb_id"] is not None}
+    stored_names = {p["name"] for p in stored if p["tmdb_id"] is None}
+    fresh_ids = {p["id"] for p in fresh}
+    fresh_names = {p["name"] for p in fresh}
+
+    added = [p for p in fresh if p["id"] not in stored_ids and p["name"] not in stored_names]
+    removed = {
+        "ids": sorted(stored_ids - fresh_ids),
+        "names": sorted(stored_names - fresh_names),
+    }
+    return added, removed
+
+
+def diff_movie(stored: dict, fetched: dict) -> dict | None:
+    """
+    Delta between a film's stored graph state and its fresh TMDB payloads,
+    as APPLY_QUERY parameters; None when nothing changed.
+    """
+    details = fetched["details"]
+    props = {
+        key: details.get(key)
+        for key in PROPERTIES
+        if details.get(key) != stored["props"].get(key)
+    }
+
+    credits = fetched["credits"]
+    deltas = {
+        "genres": _name_delta(stored["genres"], [g["name"] for g in details.get("genres", [])]),
+        "keywords": _name_delta(stored["keywords"], [k["name"] for k in fetched["keywords"].get("keywords", [])]),
+        "directors": _people_delta(
+            stored["directors"],
+            [{"id": c["id"], "name": c["name"]} for c in credits.get("crew", []) if c.get("job") == "Director"],
+        ),
+        "cast": _people_delta(stored["cast"], [{"id": c["id"], "name": c["name"]} for c in credits.get("cast", [])]),
+    }
+
+    delta = {"tmdb_id": stored["tmdb_id"], "props": props}
+    changed = set(props)
+    for field, (added, removed) in deltas.items():
+        delta[f"{field}_added"] = added
+        delta[f"{field}_removed"] = removed
+        if added or any(removed.values()):
+            changed.add(field)
+
+    if not changed:
+        return None
+    delta["reembed"] = bool(changed & EMBEDDED_FIELDS)
+    delta["changed"] = sorted(changed)
+    return delta
+
+
+# -------------------------
+# MAIN
+# -------------------------
+
+async def refresh(since: date, until: date, dry_run: bool, retry: list[int] = ()) -> dict:
+    """Apply the deltas; counts["failed"] lists the films to retry next run."""
+    client = TMDBClient()
+    counts = {"changed_upstream": 0, "in_graph": 0, "updated": 0, "reembed": 0, "failed": []}
+    try:
+        ids = await changed_ids(client, since, until)
+        counts["changed_upstream"] = len(ids)
+
+        ids = sorted(ids | set(retry))
+        for offset in range(0, len(ids), BATCH_SIZE):
+            batch = ids[offset:offset + BATCH_SIZE]
+            stored = {row["tmdb_id"]: row for row in read(STORED_QUERY, {"ids": batch})}
+            counts["in_graph"] += len(stored)
+
+            fetched = await asyncio.gather(
+                *(fetch_movie(client, tmdb_id) for tmdb_id in stored), return_exceptions=True
+            )
+            for tmdb_id, payload in zip(stored, fetched):
+                if isinstance(payload, TMDBClientError):
+                    print(f"Failed {tmdb_id}, retried next run: {payload}")
+                    counts["failed"].append(tmdb_id)
+                    continue
+                if isinstance(payload, BaseException):
+                    raise payload
+                if payload is None:
+                    continue
+                delta = diff_movie(stored[tmdb_id], payload)
+                if delta is None:
+                    continue
+                counts["updated"] += 1
+                counts["reembed"] += delta["reembed"]
+                print(f"{tmdb_id}: {', '.join(delta.pop('changed'))}")
+                if not dry_run:
+                    run(APPLY_QUERY, delta)
+
+            print(f"Checked {min(offset + BATCH_SIZE, len(ids))}/{len(ids)}")
+    finally:
+        await client.aclose()
+
+    counts["responses"] = dict(client.cache_stats)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=date.fromisoformat, help="first day (default: stored watermark)")
+    parser.add_argument("--until", type=date.fromisoformat, default=date.today(), help="last day (default: today)")
+    parser.add_argument("--dry-run", action="store_true", help="print deltas without writing (watermark kept)")
+    args = parser.parse_args()
+
+    watermark = get_watermark(WATERMARK)
+    since = args.since or (
+        date.fromisoformat(watermark) if watermark else args.until - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+    )
+
+    retry = json.loads(get_watermark(FAILED) or "[]")
+    print(f"Refreshing TMDB changes {since} → {args.until} (+{len(retry)} failed last run)")
+    counts = asyncio.run(refresh(since, args.until, args.dry_run, retry))
+
+    if not args.dry_run:
+        if counts["updated"]:
+            bump_graph_version("refresh_tmdb")
+        # The last day is re-read next time: the feed may still grow today.
+        # Films that failed are not lost with it: they are retried by id
+        set_watermark(FAILED, json.dumps(counts["failed"]))
+        set_watermark(WATERMARK, args.until.isoformat())
+
+    counts["failed"] = len(counts["failed"])
+    print(f"TMDB refresh complete: {counts}")
+
+
+if __name__ == "__main__":
+    main()
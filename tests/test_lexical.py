@@ -0,0 +1,156 @@
+from app.recsys.lexical import LexicalIndex
+
+FILMS = [
+    {
+        "tmdb_id": 1,
+        "title": "Blade Runner",
+        "original_title": "Blade Runner",
+        "directors": ["Ridley Scott"],
+        "actors": ["Harrison Ford", "Sean Young"],
+        "keywords": ["dystopia", "android"],
+        "genres": ["Science Fiction"],
+    },
+    {
+        "tmdb_id": 2,
+        "title": "Before Sunrise",
+        "original_title": "Before Sunrise",
+        "directors": ["Richard Linklater"],
+        "actors": ["Ethan Hawke", "Julie Delpy"],
+        "keywords": ["love", "train"],
+        "genres": ["Romance", "Drama"],
+    },
+    {
+        "tmdb_id": 3,
+        "title": "Parasite",
+        "original_title": "기생충",
+        "directors": ["Bong Joon-ho"],
+        "actors": ["Song Kang-ho"],
+        "keywords": ["class"],
+        "genres": ["Thriller"],
+    },
+]
+
+# Titles made of stopwords, years and other titles' words
+TITLED = [
+    {
+        "tmdb_id": 4,
+        "title": "The Godfather",
+        "original_title": "The Godfather",
+        "directors": ["Francis Ford Coppola"],
+        "actors": ["Marlon Brando", "Al Pacino"],
+        "keywords": ["mafia"],
+        "genres": ["Crime", "Drama"],
+    },
+    {
+        "tmdb_id": 5,
+        "title": "Blade Runner 2049",
+        "original_title": "Blade Runner 2049",
+        "directors": ["Denis Villeneuve"],
+        "actors": ["Ryan Gosling", "Harrison Ford"],
+        "keywords": ["dystopia"],
+        "genres": ["Science Fiction"],
+    },
+    {
+        "tmdb_id": 6,
+        "title": "In the Mood for Love",
+        "original_title": "花樣年華",
+        "directors": ["Wong Kar-wai"],
+        "actors": ["Tony Leung Chiu-wai", "Maggie Cheung"],
+        "keywords": ["unrequited love"],
+        "genres": ["Romance", "Drama"],
+    },
+]
+
+# One-word titles that are also everyday words
+GENERIC_TITLES = [
+    {"tmdb_id": 100 + i, "title": title, "original_title": title, "genres": genres}
+    for i, (title, genres) in enumerate([
+        ("Heist", ["Thriller", "Crime"]),
+        ("Love", ["Romance", "Drama"]),
+        ("Zombies", ["Horror"]),
+        ("Space", ["Documentary"]),
+    ])
+]
+
+
+def index() -> LexicalIndex:
+    return LexicalIndex.from_films(FILMS)
+
+
+def catalog() -> LexicalIndex:
+    return LexicalIndex.from_films(FILMS + TITLED + GENERIC_TITLES)
+
+
+def test_surname_and_keyword_matches_are_not_entity_only():
+    match = index().search("young love")
+    assert ("surname", "young") in match.entities
+    assert ("keyword", "love") in match.entities
+    assert not match.entity_only
+    assert match.seed_ids == []
+    # Still fused as lexical signals
+    assert set(match.tmdb_ids.tolist()) == {1, 2}
+
+
+def test_keyword_query_is_not_entity_only():
+    match = index().search("dystopia")
+    assert not match.entity_only
+    assert match.seed_ids == []
+    assert match.tmdb_ids.tolist() == [1]
+
+
+def test_titles_and_full_names_are_entity_only():
+    match = index().search("movies like Parasite")
+    assert match.entity_only
+    assert match.seed_ids == [3]
+    assert match.exclude_ids == [3]
+
+    match = index().search("Richard Linklater dramas")
+    assert match.entity_only
+    assert match.seed_ids == [2]
+
+
+def test_full_name_with_keyword_is_not_entity_only():
+    match = index().search("Harrison Ford dystopia")
+    assert not match.entity_only
+    assert match.seed_ids == [1]
+
+
+def test_one_word_titles_do_not_claim_generic_queries():
+    for query in ("heist thriller", "heist movies", "love", "zombies", "space movies"):
+        match = catalog().search(query)
+        assert ("title", query.split()[0]) in match.entities
+        assert not match.entity_only, query
+
+
+def test_one_word_title_after_like_is_entity_only():
+    match = catalog().search("movies like Heist")
+    assert match.entity_only
+    assert match.seed_ids == [100]
+    assert match.exclude_ids == [100]
+
+
+def test_titles_keep_their_stopwords_and_years():
+    match = catalog().search("movies like The Godfather")
+    assert match.entity_only
+    assert match.seed_ids == [4]
+
+    match = catalog().search("Blade Runner 2049")
+    assert match.entities == [("title", "blade runner 2049")]
+    assert match.entity_only
+    assert match.seed_ids == [5]
+
+    match = catalog().search("movies like In the Mood for Love")
+    assert match.entity_only
+    assert match.seed_ids == [6]
+    assert match.exclude_ids == [6]
+    assert 101 not in match.exclude_ids
+
+
+def test_filter_words_are_not_residual():
+    match = catalog().search("Richard Linklater dramas from the 90s")
+    assert match.residual == []
+    assert match.entity_only
+
+    match = catalog().search("recent oscar winners like The Godfather")
+    assert match.residual == []
+    assert match.seed_ids == [4]